@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: worker-side FireMeasurement construction and serialization
+
+Compares, on a worker's data partition (default: process C):
+  per-row    - one FireMeasurement(...) with 13 keyword arguments per row,
+               extended into the response (the original server_c.py path)
+  batch      - MeasurementEncoder: rows encoded column-wise from the columnar
+               store and merged into the response in one call (execute_into)
+  row cache  - SerializedRowCache (warm): cached per-row bytes joined and merged
+
+Each variant builds an InternalQueryResponse and serializes it, as the worker
+does before gRPC sends it. test_encoders.py checks that all three produce the
+same bytes.
+
+Usage: python3 benchmark_proto_build.py [process_id] [repeat]
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'proto'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'common'))
+
+import fire_service_pb2
+from fire_column_model import FireColumnModel
+from measurement_encoder import MeasurementEncoder
+from row_cache import SerializedRowCache
+
+
+def load_partition(process_id: str) -> FireColumnModel:
+    """Load the data partition configured for a process"""
+    with open(os.path.join(os.path.dirname(__file__), 'configs', f'process_{process_id.lower()}.json')) as f:
+        config = json.load(f)
+    allowed_dirs = None
+    if config.get('data_partition', {}).get('enabled'):
+        allowed_dirs = config['data_partition'].get('directories', [])
+
+    data_model = FireColumnModel()
+    with contextlib.redirect_stdout(io.StringIO()):
+        data_model.read_from_directory(os.path.join(os.path.dirname(__file__), 'data'), allowed_dirs)
+    return data_model
+
+
+def build_measurement(data_model: FireColumnModel, idx: int):
+    """One FireMeasurement with 13 keyword arguments"""
+    return fire_service_pb2.FireMeasurement(
+        latitude=data_model.latitudes[idx],
+        longitude=data_model.longitudes[idx],
+        datetime=data_model.datetimes[idx],
+        parameter=data_model.parameters[idx],
+        concentration=data_model.concentrations[idx],
+        unit=data_model.units[idx],
+        raw_concentration=data_model.raw_concentrations[idx],
+        aqi=data_model.aqis[idx],
+        category=data_model.categories[idx],
+        site_name=data_model.site_names[idx],
+        agency_name=data_model.agency_names[idx],
+        aqs_code=data_model.aqs_codes[idx],
+        full_aqs_code=data_model.full_aqs_codes[idx]
+    )
+
+
+def per_row_response(data_model: FireColumnModel, rows):
+    """Original worker path: one keyword-argument constructor per row"""
+    measurements = [build_measurement(data_model, idx) for idx in rows]
+    response = fire_service_pb2.InternalQueryResponse(responding_process="C", is_complete=True)
+    response.measurements.extend(measurements)
+    return response.SerializeToString()
+
+
+def encoded_response(encode, rows):
+    """Batch path: merge the encoded rows into the response in one call"""
+    response = fire_service_pb2.InternalQueryResponse(responding_process="C", is_complete=True)
+    response.MergeFromString(encode(rows))
+    return response.SerializeToString()
+
+
+def best_time(function, repeat: int) -> float:
+    """Fastest of repeat runs, in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    process_id = sys.argv[1] if len(sys.argv) > 1 else "C"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+
+    print("=" * 60)
+    print(f"Worker Proto Construction Benchmark (process {process_id})")
+    print("=" * 60)
+
+    data_model = load_partition(process_id)
+    encoder = MeasurementEncoder(data_model)
+    row_cache = SerializedRowCache(data_model.measurement_count, lambda idx: build_measurement(data_model, idx))
+    row_cache.preload()
+
+    all_rows = list(range(data_model.measurement_count()))
+    pm25_rows = data_model.get_indices_by_parameter("PM2.5")
+    print(f"Partition: {len(all_rows):,} rows")
+
+    for label, rows in (("all rows", all_rows), ("PM2.5 rows", pm25_rows)):
+        size = len(per_row_response(data_model, rows))
+        print(f"\n{label}: {len(rows):,} measurements, {size / 1024:.0f} KiB serialized")
+        baseline = None
+        for name, function in (
+            ("per-row", lambda: per_row_response(data_model, rows)),
+            ("batch", lambda: encoded_response(encoder.encode, rows)),
+            ("row cache", lambda: encoded_response(row_cache.encode, rows)),
+        ):
+            seconds = best_time(function, repeat)
+            baseline = baseline or seconds
+            print(f"  {name:<10} {seconds * 1000:8.1f} ms  {len(rows) / seconds:>12,.0f} rows/s  "
+                  f"{size / seconds / (1024 * 1024):7.1f} MiB/s  {baseline / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -302,6 +302,59 @@ def test_small_chunks(stub):
         print(f"\n✗ Error: {e.code()}: {e.details()}")
 
 
+def test_resume(stub, break_after_chunks=3):
+    """Test resuming a broken stream from the next chunk"""
+    print("\n" + "="*80)
+    print("TEST 5: Resumable Streams")
+    print("="*80)
+    
+    request_id = random.randint(1000, 9999)
+    
+    request = fire_service_pb2.QueryRequest(
+        request_id=request_id,
+        filter=fire_service_pb2.QueryFilter(),  # No filters = all data
+        query_type="filter",
+        require_chunked=True,
+        max_results_per_chunk=500
+    )
+    
+    print(f"\nSending query (request_id={request_id})")
+    print(f"  Will drop the stream after {break_after_chunks} chunks, then resume it")
+    print()
+    
+    tracker = ProgressTracker(request_id)
+    
+    try:
+        # Simulate a broken link: abandon the call mid-stream
+        call = stub.Query(request)
+        for chunk in call:
+            tracker.update(chunk)
+            tracker.display()
+            if tracker.chunks_received >= break_after_chunks:
+                call.cancel()
+                break
+        print(f"\n\n🔌 Stream dropped after {tracker.chunks_received} chunks, resuming from chunk {tracker.chunks_received}...")
+        
+        # Resume from the first chunk not received; the gateway replays retained results
+        resume_request = fire_service_pb2.QueryRequest(
+            request_id=request_id,
+            resume=True,
+            resume_from_chunk=tracker.chunks_received,
+            max_results_per_chunk=500
+        )
+        for chunk in stub.Query(resume_request):
+            tracker.update(chunk)
+            tracker.display()
+        
+        tracker.finish()
+        print(f"\n✓ Resume test completed!")
+        print(f"  Received {tracker.measurements_received:,} of {tracker.total_measurements:,} measurements")
+        
+    except grpc.RpcError as e:
+        tracker.finish()
+        print(f"\n✗ Error: {e.code()}: {e.details()}")
+
+
 def main():
     """Run all advanced tests"""
     # Server address (Gateway A)
@@ -329,6 +382,9 @@ def main():
     time.sleep(1)
     
     test_small_chunks(stub)
+    time.sleep(1)
+    
+    test_resume(stub)
     
     # Close channel
     channel.close()
@@ -342,6 +398,7 @@ def main():
     print("  ✓ Request cancellation")
     print("  ✓ Status tracking")
     print("  ✓ Client disconnect handling")
+    print("  ✓ Resumable streams")
     print()
 
 
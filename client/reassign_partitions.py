@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Partition Reassignment Client
+Moves or splits partitions between running processes and adds or removes
+neighbor links through the gateway, e.g. to spread a hot day during an active fire
+
+Usage:
+  python3 client/reassign_partitions.py                                   # show assignment
+  python3 client/reassign_partitions.py --move 20200816 B F              # move a day
+  python3 client/reassign_partitions.py --move 20200816/20200816-01.csv B F   # split a day by hour
+  python3 client/reassign_partitions.py --link E G localhost 50057 --move 20200910 E G
+  python3 client/reassign_partitions.py --unlink E G                     # once G serves nothing
+"""
+
+import argparse
+import grpc
+import sys
+import os
+
+# Add proto directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'proto'))
+
+import fire_service_pb2
+import fire_service_pb2_grpc
+
+
+def print_assignment(response):
+    """Print each process's partitions and row count"""
+    print(f"Partition assignment epoch {response.epoch}:")
+    for assignment in sorted(response.assignments, key=lambda a: a.process_id):
+        print(f"  {assignment.process_id}: {assignment.measurement_count:>8,} rows  "
+              f"{', '.join(assignment.partitions) or '(none)'}")
+    if response.unavailable_processes:
+        print(f"  Unreachable: {', '.join(response.unavailable_processes)}")
+
+
+def main():
+    """Parse the changes, send them to the gateway and print the resulting assignment"""
+    parser = argparse.ArgumentParser(description="Reassign partitions between running processes")
+    parser.add_argument('--gateway', default="localhost:50051", help="Gateway address (default: localhost:50051)")
+    parser.add_argument('--move', nargs=3, action='append', default=[], metavar=('PARTITION', 'FROM', 'TO'),
+                        help="Move a day directory, or one file of a day to split it")
+    parser.add_argument('--link', nargs=4, action='append', default=[], metavar=('PARENT', 'PROCESS', 'HOST', 'PORT'),
+                        help="Open a link from PARENT to a (new) process")
+    parser.add_argument('--unlink', nargs=2, action='append', default=[], metavar=('PARENT', 'PROCESS'),
+                        help="Close a link (after the process's partitions moved away)")
+    args = parser.parse_args()
+
+    request = fire_service_pb2.PartitionChangeRequest(requesting_process="client")
+    for partition, from_process, to_process in args.move:
+        request.moves.add(partition=partition, from_process=from_process, to_process=to_process)
+    for parent, process_id, hostname, port in args.link:
+        request.add_links.add(parent_process=parent, process_id=process_id, hostname=hostname, port=int(port))
+    for parent, process_id in args.unlink:
+        request.remove_links.add(parent_process=parent, process_id=process_id)
+
+    channel = grpc.insecure_channel(args.gateway)
+    stub = fire_service_pb2_grpc.FireQueryServiceStub(channel)
+
+    response = stub.ReassignPartitions(request)
+    if not response.success:
+        print(f"✗ Reassignment failed: {response.message}\n")
+    elif request.moves or request.add_links or request.remove_links:
+        print(f"✓ Reassigned (old assignment keeps serving in-flight queries until they drain)\n")
+    print_assignment(response)
+
+    channel.close()
+    sys.exit(0 if response.success else 1)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except grpc.RpcError as e:
+        print(f"\n✗ Failed: {e.code()}: {e.details()}")
+        sys.exit(1)
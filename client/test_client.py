@@ -8,11 +8,13 @@ import grpc
 import sys
 import os
 
-# Add proto directory to path
+# Add proto and common directories to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'proto'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'common'))
 
 import fire_service_pb2
 import fire_service_pb2_grpc
+from query_profile import format_profile
 
 
 def test_query(stub):
@@ -31,13 +33,15 @@ def test_query(stub):
         filter=query_filter,
         query_type="filter",
         require_chunked=True,
-        max_results_per_chunk=1000
+        max_results_per_chunk=1000,
+        priority=fire_service_pb2.INTERACTIVE
     )
     
     print(f"Sending query request_id={request.request_id}")
     print(f"  Parameters: {list(request.filter.parameters)}")
     print(f"  AQI range: {request.filter.min_aqi} - {request.filter.max_aqi}")
     print(f"  Chunk size: {request.max_results_per_chunk}")
+    print(f"  Priority: {fire_service_pb2.QueryPriority.Name(request.priority)}")
     print()
     
     # Send request and receive streaming response
@@ -45,7 +49,8 @@ def test_query(stub):
     chunks_received = 0
     
     try:
-        for chunk in stub.Query(request):
+        # Identify ourselves for per-client quotas at the gateway
+        for chunk in stub.Query(request, metadata=(('client-id', 'test-client'),)):
             chunks_received += 1
             total_measurements += len(chunk.measurements)
             
@@ -65,6 +70,8 @@ def test_query(stub):
                 print(f"\n✓ Query completed!")
                 print(f"  Total measurements received: {total_measurements:,}")
                 print(f"  Total chunks received: {chunks_received}")
+                if chunk.is_partial:
+                    print(f"  ⚠️ Partial result - no data from: {', '.join(chunk.unavailable_processes)}")
                 
                 # Show sample measurements from last chunk
                 if len(chunk.measurements) > 0:
@@ -76,6 +83,28 @@ def test_query(stub):
         print(f"\n✗ Error: {e.code()}: {e.details()}")
 
 
+def test_profile(stub):
+    """Run the test query in profile-only mode and print the per-process timing tree"""
+    print("\n=== Testing Query Profile ===")
+    
+    request = fire_service_pb2.QueryRequest(
+        request_id=12346,
+        filter=fire_service_pb2.QueryFilter(parameters=["PM2.5", "PM10"], min_aqi=0, max_aqi=100),
+        query_type="filter",
+        require_chunked=True,
+        max_results_per_chunk=1000,
+        profile_only=True
+    )
+    
+    try:
+        for chunk in stub.Query(request, metadata=(('client-id', 'test-client'),)):
+            if chunk.HasField('profile'):
+                print(f"  {chunk.total_results:,} results (not transferred)")
+                print(format_profile(chunk.profile, indent=1))
+    except grpc.RpcError as e:
+        print(f"✗ Error: {e.code()}: {e.details()}")
+
+
 def test_get_status(stub):
     """Test the GetStatus RPC method"""
     print("\n=== Testing GetStatus RPC ===")
@@ -134,6 +163,7 @@ def main():
     
     # Run tests
     test_query(stub)
+    test_profile(stub)
     test_get_status(stub)
     test_cancel_request(stub)
     
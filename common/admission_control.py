@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Admission control for client queries
+Bounds concurrent queries with an adaptive (AIMD) limit and bounded per-priority
+wait queues, rejecting fast with a retry-after hint instead of queueing invisibly
+inside gRPC
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+# Priority classes, indexed by the QueryPriority enum value in fire_service.proto
+PRIORITY_CLASSES = ('interactive', 'batch', 'background')
+
+
+def priority_class(priority: int) -> str:
+    """Class name for a QueryPriority value (unknown values count as the least important class)"""
+    return PRIORITY_CLASSES[min(max(int(priority), 0), len(PRIORITY_CLASSES) - 1)]
+
+
+class AdmissionRejectedError(Exception):
+    """Exception raised when a request cannot be admitted (queue full or queue timeout)"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with bounded per-priority FIFO queues and AIMD limit
+
+    - Up to `limit` requests run at once; each priority class may hold at most
+      its share of the limit (its executor share), and up to max_queue more
+      requests per class wait in FIFO order
+    - A free slot goes to the most important class that has a runnable waiter
+    - A waiting request gives up after queue_timeout (queue-time deadline)
+    - When a class's queue is full, acquire() fails immediately
+    - Running lower-priority work can call yield_to_higher_priority() between
+      scan batches to pause while more important work is running or queued
+    - After each request the limit adapts: +1/limit on a fast success
+      (additive increase), *backoff_ratio when latency exceeds
+      latency_target or the request failed (multiplicative decrease)
+    """
+
+    def __init__(self, initial_limit: int = 8, min_limit: int = 1, max_limit: int = 32,
+                 max_queue: int = 16, queue_timeout: float = 2.0,
+                 latency_target: float = 5.0, backoff_ratio: float = 0.9,
+                 priority_shares: Optional[Dict[str, float]] = None,
+                 max_preempt_pause: float = 1.0, name: str = "unknown"):
+        """
+        Initialize admission controller
+
+        Args:
+            initial_limit: Starting concurrency limit (default: 8)
+            min_limit: Lower bound for the adaptive limit (default: 1)
+            max_limit: Upper bound for the adaptive limit (default: 32)
+            max_queue: Maximum requests waiting for a slot (default: 16)
+            queue_timeout: Seconds a request may wait in the queue (default: 2.0)
+            latency_target: Request latency in seconds above which the limit shrinks (default: 5.0)
+            backoff_ratio: Multiplicative decrease factor (default: 0.9)
+            priority_shares: Class name -> fraction of the limit it may occupy (default: all 1.0)
+            max_preempt_pause: Longest single pause of preempted work in seconds (default: 1.0)
+            name: Name identifier for logging (default: "unknown")
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.latency_target = latency_target
+        self.backoff_ratio = backoff_ratio
+        self.max_preempt_pause = max_preempt_pause
+        self.name = name
+
+        shares = priority_shares or {}
+        self.shares: List[float] = [min(max(shares.get(cls, 1.0), 0.0), 1.0) for cls in PRIORITY_CLASSES]
+
+        self.in_flight = 0
+        self.in_flight_by_priority: List[int] = [0] * len(PRIORITY_CLASSES)
+        self.queues: List[Deque[object]] = [deque() for _ in PRIORITY_CLASSES]
+
+        # Counters
+        self.admitted = 0
+        self.admitted_by_priority: List[int] = [0] * len(PRIORITY_CLASSES)
+        self.rejected_queue_full = 0
+        self.rejected_queue_timeout = 0
+        self.preemptions = 0
+        self.preempted_seconds = 0.0
+        self.avg_latency: Optional[float] = None
+
+        self.condition = threading.Condition()
+
+        share_str = ", ".join(f"{cls}={share:g}" for cls, share in zip(PRIORITY_CLASSES, self.shares))
+        print(f"[Admission-{name}] Initialized: limit={self.limit:.0f} ({min_limit}-{max_limit}), "
+              f"queue={max_queue}/class, queue_timeout={queue_timeout}s, latency_target={latency_target}s, "
+              f"shares: {share_str}")
+
+    @staticmethod
+    def _clamp_priority(priority: int) -> int:
+        """Map unknown priority values to the least important class"""
+        return min(max(int(priority), 0), len(PRIORITY_CLASSES) - 1)
+
+    def _class_limit(self, priority: int) -> int:
+        """Slots a priority class may occupy under the current limit (lock held)"""
+        return max(1, int(int(self.limit) * self.shares[priority]))
+
+    def _can_run(self, priority: int) -> bool:
+        """Whether a request of this class fits under the total and class limits (lock held)"""
+        return (self.in_flight < int(self.limit) and
+                self.in_flight_by_priority[priority] < self._class_limit(priority))
+
+    def _is_next(self, ticket: object, priority: int) -> bool:
+        """Whether a queued ticket should take the next free slot (lock held)"""
+        if self.queues[priority][0] is not ticket or not self._can_run(priority):
+            return False
+        # A more important class with a runnable waiter goes first
+        return not any(self.queues[p] and self._can_run(p) for p in range(priority))
+
+    def _admit(self, priority: int):
+        """Account for an admitted request (lock held)"""
+        self.in_flight += 1
+        self.in_flight_by_priority[priority] += 1
+        self.admitted += 1
+        self.admitted_by_priority[priority] += 1
+
+    def _retry_after(self) -> float:
+        """Estimate how long a rejected client should wait before retrying (lock held)"""
+        latency = self.avg_latency if self.avg_latency is not None else self.latency_target
+        # Roughly the time for the current backlog to drain through the limit
+        backlog = self.in_flight + sum(len(queue) for queue in self.queues)
+        return max(0.1, latency * backlog / max(self.limit, 1.0))
+
+    def acquire(self, priority: int = 0) -> float:
+        """
+        Wait for an execution slot
+
+        Args:
+            priority: QueryPriority value of the request (default: 0, interactive)
+
+        Returns:
+            Seconds spent waiting in the queue
+
+        Raises:
+            AdmissionRejectedError: If the class's queue is full or the queue timeout expires
+        """
+        priority = self._clamp_priority(priority)
+        queue = self.queues[priority]
+        start_time = time.time()
+        with self.condition:
+            if (not queue and self._can_run(priority) and
+                    not any(self.queues[p] and self._can_run(p) for p in range(priority))):
+                self._admit(priority)
+                return 0.0
+
+            if len(queue) >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise AdmissionRejectedError(
+                    f"{PRIORITY_CLASSES[priority]} admission queue full "
+                    f"({self.in_flight} running, {len(queue)} queued)",
+                    self._retry_after()
+                )
+
+            ticket = object()
+            queue.append(ticket)
+            deadline = start_time + self.queue_timeout
+            try:
+                while not self._is_next(ticket, priority):
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self.rejected_queue_timeout += 1
+                        raise AdmissionRejectedError(
+                            f"{PRIORITY_CLASSES[priority]} request queued for more than {self.queue_timeout}s",
+                            self._retry_after()
+                        )
+                    self.condition.wait(remaining)
+            finally:
+                queue.remove(ticket)
+                # The new queue heads may now be admissible
+                self.condition.notify_all()
+
+            self._admit(priority)
+            return time.time() - start_time
+
+    def yield_to_higher_priority(self, priority: int) -> float:
+        """
+        Preemption point for running work, called between scan batches
+
+        Blocks while any more important class has requests running or queued,
+        for at most max_preempt_pause so preempted work still makes progress.
+
+        Args:
+            priority: QueryPriority value of the running request
+
+        Returns:
+            Seconds spent paused
+        """
+        priority = self._clamp_priority(priority)
+        if priority == 0:
+            return 0.0
+
+        def higher_priority_active():
+            return any(self.in_flight_by_priority[p] or self.queues[p] for p in range(priority))
+
+        start_time = time.time()
+        with self.condition:
+            if not higher_priority_active():
+                return 0.0
+            self.preemptions += 1
+            self.condition.wait_for(lambda: not higher_priority_active(), self.max_preempt_pause)
+            paused = time.time() - start_time
+            self.preempted_seconds += paused
+            return paused
+
+    def release(self, latency: float, success: bool = True, priority: int = 0):
+        """
+        Return an execution slot and adapt the limit
+
+        Args:
+            latency: Seconds the request took once admitted
+            success: Whether the request completed normally
+            priority: QueryPriority value passed to acquire() (default: 0)
+        """
+        priority = self._clamp_priority(priority)
+        with self.condition:
+            self.in_flight -= 1
+            self.in_flight_by_priority[priority] -= 1
+            self.avg_latency = latency if self.avg_latency is None else 0.8 * self.avg_latency + 0.2 * latency
+
+            old_limit = int(self.limit)
+            if not success or latency > self.latency_target:
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+            if int(self.limit) != old_limit:
+                print(f"[Admission-{self.name}] Concurrency limit {old_limit} -> {int(self.limit)} "
+                      f"(latency={latency:.2f}s, target={self.latency_target}s)")
+            self.condition.notify_all()
+
+    def get_stats(self) -> dict:
+        """
+        Get admission statistics
+
+        Returns:
+            Dictionary with current limit, in-flight/queued counts, rejection and
+            preemption counters, and per-priority breakdown
+        """
+        with self.condition:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'queued': sum(len(queue) for queue in self.queues),
+                'admitted': self.admitted,
+                'rejected_queue_full': self.rejected_queue_full,
+                'rejected_queue_timeout': self.rejected_queue_timeout,
+                'preemptions': self.preemptions,
+                'preempted_seconds': self.preempted_seconds,
+                'avg_latency': self.avg_latency,
+                'priorities': {
+                    cls: {
+                        'share': self.shares[p],
+                        'class_limit': self._class_limit(p),
+                        'in_flight': self.in_flight_by_priority[p],
+                        'queued': len(self.queues[p]),
+                        'admitted': self.admitted_by_priority[p]
+                    }
+                    for p, cls in enumerate(PRIORITY_CLASSES)
+                }
+            }
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Bitmap indexes over categorical columns
+Each distinct value maps to a packed bitset of the rows holding it (bit i set
+for row i), so AND/OR combinations of categorical predicates are single
+bitwise operations over the whole partition instead of set/list merges
+"""
+
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+
+def bitmap_rows(bitmap: int) -> List[int]:
+    """
+    Expand a bitmap into its row indices
+
+    Args:
+        bitmap: Packed bitset (bit i set for row i)
+
+    Returns:
+        Row indices in ascending order
+    """
+    rows = []
+    if not bitmap:
+        return rows
+    # Walk 64-bit words so empty stretches of a sparse bitmap cost one check per word
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for offset in range(0, len(data), 8):
+        word = int.from_bytes(data[offset:offset + 8], 'little')
+        base = offset * 8
+        while word:
+            lowest = word & -word
+            rows.append(base + lowest.bit_length() - 1)
+            word ^= lowest
+    return rows
+
+
+def bitmap_from_ranges(ranges: Iterable[Tuple[int, int]]) -> int:
+    """Bitmap with the rows of [start, end) ranges set"""
+    bitmap = 0
+    for start, end in ranges:
+        bitmap |= ((1 << (end - start)) - 1) << start
+    return bitmap
+
+
+def bitmap_contains(bitmap: int, row_count: int):
+    """
+    Constant-time membership test for a bitmap
+
+    Shifting a large int to test one bit costs time proportional to its
+    size, so per-row checks go through the bitmap's bytes instead.
+
+    Args:
+        bitmap: Packed bitset
+        row_count: Rows in the partition (bound on the set bits)
+
+    Returns:
+        Callable returning whether a row is in the bitmap
+    """
+    data = bitmap.to_bytes((row_count + 7) // 8, 'little')
+    return lambda idx: data[idx >> 3] >> (idx & 7) & 1
+
+
+class BitmapIndex:
+    """
+    Value -> packed bitset of the rows holding it, for one column
+
+    Bits are set in a growable bytearray per value while loading; the int
+    form used for bitwise operations is built on first use and rebuilt only
+    if rows are added to that value later. Dense bitsets take n/8 bytes per
+    value, well below a list of row indices for any value on more than one
+    row in 64.
+    """
+
+    def __init__(self):
+        self._bits: Dict[Hashable, bytearray] = {}
+        self._bitmaps: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        """Number of distinct values"""
+        return len(self._bits)
+
+    def add(self, value: Hashable, row: int):
+        """Set a row's bit in its value's bitmap"""
+        bits = self._bits.get(value)
+        if bits is None:
+            bits = self._bits[value] = bytearray()
+        offset = row >> 3
+        if offset >= len(bits):
+            # Grow geometrically so appending rows stays amortized O(1)
+            bits.extend(bytes(max(offset + 1, 2 * len(bits)) - len(bits)))
+        bits[offset] |= 1 << (row & 7)
+        self._bitmaps.pop(value, None)
+
+    def values(self) -> List[Hashable]:
+        """Distinct values in the column"""
+        return list(self._bits)
+
+    def bitmap(self, value: Hashable) -> int:
+        """Bitmap of the rows holding a value (0 if none)"""
+        bitmap = self._bitmaps.get(value)
+        if bitmap is None:
+            bits = self._bits.get(value)
+            if bits is None:
+                return 0
+            bitmap = self._bitmaps[value] = int.from_bytes(bits, 'little')
+        return bitmap
+
+    def union(self, values: Iterable[Hashable]) -> int:
+        """Bitmap of the rows holding any of the values"""
+        bitmap = 0
+        for value in values:
+            bitmap |= self.bitmap(value)
+        return bitmap
+
+    def count(self, value: Hashable) -> int:
+        """Number of rows holding a value"""
+        return self.bitmap(value).bit_count()
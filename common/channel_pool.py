@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Channel pool for long-lived gRPC connections to neighbor servers
+Reuses one channel per neighbor address instead of opening a new one per call
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import grpc
+
+
+# Default channel options shared by all internal links
+DEFAULT_CHANNEL_OPTIONS = [
+    ('grpc.max_receive_message_length', 100 * 1024 * 1024),  # 100MB
+    ('grpc.max_send_message_length', 100 * 1024 * 1024),     # 100MB
+    # Reconnect quickly after a neighbor restarts (default backoff grows to 120s)
+    ('grpc.initial_reconnect_backoff_ms', 100),
+    ('grpc.min_reconnect_backoff_ms', 100),
+    ('grpc.max_reconnect_backoff_ms', 2000),
+]
+
+
+class ChannelPool:
+    """
+    Thread-safe pool of gRPC channels keyed by neighbor address
+
+    Channels are created lazily on first use and kept open for the lifetime
+    of the process, so health streams and queries share one HTTP/2 connection.
+    """
+
+    def __init__(self, options: Optional[List[Tuple[str, int]]] = None, name: str = "unknown"):
+        """
+        Initialize channel pool
+
+        Args:
+            options: gRPC channel options (default: DEFAULT_CHANNEL_OPTIONS)
+            name: Name identifier for logging (default: "unknown")
+        """
+        self.options = options if options is not None else DEFAULT_CHANNEL_OPTIONS
+        self.name = name
+        self.channels: Dict[str, grpc.Channel] = {}
+        self.lock = threading.Lock()
+
+    def get_channel(self, address: str) -> grpc.Channel:
+        """
+        Get (or create) the shared channel for an address
+
+        Args:
+            address: Neighbor address in "host:port" form
+
+        Returns:
+            grpc.Channel connected to the address
+        """
+        with self.lock:
+            channel = self.channels.get(address)
+            if channel is None:
+                channel = grpc.insecure_channel(address, options=self.options)
+                self.channels[address] = channel
+                print(f"[ChannelPool-{self.name}] Opened channel to {address}")
+            return channel
+
+    def close(self):
+        """Close all pooled channels"""
+        with self.lock:
+            for channel in self.channels.values():
+                channel.close()
+            self.channels.clear()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Fair chunk scheduler for concurrent result streams
+Interleaves chunk emission across active requests with weighted fair queuing by bytes,
+so a bulk export cannot starve small interactive queries
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class _Flow:
+    """Per-request scheduling state"""
+
+    def __init__(self, flow_id, client_id: str, weight: float):
+        self.flow_id = flow_id
+        self.client_id = client_id
+        self.weight = weight
+        self.finish_tag = 0.0
+        self.granted = False
+        self.granted_at = 0.0
+        self.bytes_sent = 0
+        self.chunks_sent = 0
+
+
+class ChunkScheduler:
+    """
+    Weighted fair queuing (start-time fair queuing) over chunk bytes
+
+    Each stream asks for permission before emitting a chunk of n bytes. The
+    request is tagged with finish = max(virtual_time, flow's last finish) +
+    n / weight, and the pending chunk with the smallest finish tag is sent
+    next. Up to max_concurrent_sends chunks are in flight at once. Over any
+    busy period every active flow receives bytes in proportion to its weight,
+    and a newly arrived small query is served within about one chunk of each
+    bulk flow instead of queueing behind them.
+
+    A slot is held until gRPC has taken the chunk, which blocks on flow
+    control when the client reads slowly. A slot held longer than
+    max_hold_seconds while other chunks wait is revoked, so clients that stop
+    reading cannot starve the other streams.
+    """
+
+    def __init__(self, max_concurrent_sends: int = 2, client_weights: Optional[Dict[str, float]] = None,
+                 default_weight: float = 1.0, max_hold_seconds: float = 1.0, name: str = "unknown"):
+        """
+        Initialize chunk scheduler
+
+        Args:
+            max_concurrent_sends: Chunks allowed to be in flight at once (default: 2)
+            client_weights: client_id -> weight (default: all clients equal)
+            default_weight: Weight of clients not listed in client_weights (default: 1.0)
+            max_hold_seconds: Longest a stream may hold a send slot while others wait (default: 1.0)
+            name: Name identifier for logging (default: "unknown")
+        """
+        self.max_concurrent_sends = max(1, max_concurrent_sends)
+        self.client_weights = dict(client_weights or {})
+        self.default_weight = default_weight
+        self.max_hold_seconds = max_hold_seconds
+        self.name = name
+
+        self.flows: Dict[object, _Flow] = {}
+        self.pending: List[Tuple[float, int, object, float]] = []  # heap of (finish_tag, seq, flow_id, start_tag)
+        self.sequence = itertools.count()
+        self.virtual_time = 0.0
+        self.in_flight = 0
+        self.revoked = 0
+
+        self.condition = threading.Condition()
+
+        print(f"[ChunkScheduler-{name}] Initialized: max_concurrent_sends={self.max_concurrent_sends}, "
+              f"max_hold_seconds={max_hold_seconds}, client_weights={self.client_weights}")
+
+    def register(self, flow_id, client_id: str) -> float:
+        """
+        Register an active stream
+
+        Args:
+            flow_id: Unique stream identifier (e.g. request_id)
+            client_id: Identity of the calling client (selects the weight)
+
+        Returns:
+            Weight assigned to the stream
+        """
+        weight = self.client_weights.get(client_id, self.default_weight)
+        with self.condition:
+            flow = _Flow(flow_id, client_id, weight)
+            # New flows start at the current virtual time (no credit for idle time)
+            flow.finish_tag = self.virtual_time
+            self.flows[flow_id] = flow
+        return weight
+
+    def unregister(self, flow_id):
+        """
+        Remove a finished or cancelled stream
+
+        Args:
+            flow_id: Stream identifier passed to register()
+        """
+        with self.condition:
+            flow = self.flows.pop(flow_id, None)
+            if flow is not None and flow.granted:
+                # Stream ended while holding a send slot
+                flow.granted = False
+                self.in_flight -= 1
+            self.pending = [entry for entry in self.pending if entry[2] != flow_id]
+            heapq.heapify(self.pending)
+            self._dispatch()
+
+    def acquire(self, flow_id, nbytes: int):
+        """
+        Block until the stream may emit its next chunk
+
+        Args:
+            flow_id: Stream identifier passed to register()
+            nbytes: Serialized size of the chunk about to be sent
+        """
+        with self.condition:
+            flow = self.flows[flow_id]
+            start_tag = max(self.virtual_time, flow.finish_tag)
+            flow.finish_tag = start_tag + max(nbytes, 1) / flow.weight
+            heapq.heappush(self.pending, (flow.finish_tag, next(self.sequence), flow_id, start_tag))
+            self._dispatch()
+            while not flow.granted:
+                self.condition.wait(self.max_hold_seconds)
+                if not flow.granted:
+                    self._revoke_stalled()
+            flow.bytes_sent += nbytes
+            flow.chunks_sent += 1
+
+    def release(self, flow_id):
+        """
+        Return the send slot after the chunk has been handed to the transport
+
+        Args:
+            flow_id: Stream identifier passed to register()
+        """
+        with self.condition:
+            flow = self.flows.get(flow_id)
+            if flow is not None and flow.granted:
+                flow.granted = False
+                self.in_flight -= 1
+                self._dispatch()
+
+    def _dispatch(self):
+        """Grant send slots to the pending chunks with the smallest finish tags (lock held)"""
+        granted_any = False
+        while self.in_flight < self.max_concurrent_sends and self.pending:
+            _, _, flow_id, start_tag = heapq.heappop(self.pending)
+            flow = self.flows.get(flow_id)
+            if flow is None:
+                continue
+            # Virtual time advances to the start tag of the chunk being served
+            self.virtual_time = max(self.virtual_time, start_tag)
+            flow.granted = True
+            flow.granted_at = time.time()
+            self.in_flight += 1
+            granted_any = True
+        if granted_any:
+            self.condition.notify_all()
+
+    def _revoke_stalled(self):
+        """Take back send slots held longer than max_hold_seconds, e.g. by a client that stopped reading (lock held)"""
+        now = time.time()
+        for flow in self.flows.values():
+            if flow.granted and now - flow.granted_at > self.max_hold_seconds:
+                # The stream's later release() is a no-op; it queues again for its next chunk
+                flow.granted = False
+                self.in_flight -= 1
+                self.revoked += 1
+                print(f"[ChunkScheduler-{self.name}] Stream {flow.flow_id} of {flow.client_id} held a send slot "
+                      f"for {now - flow.granted_at:.1f}s, giving it to a waiting stream")
+        self._dispatch()
+
+    def get_stats(self) -> dict:
+        """
+        Get scheduler statistics
+
+        Returns:
+            Dictionary with in-flight sends, pending chunks, revoked slots and per-stream bytes/weights
+        """
+        with self.condition:
+            return {
+                'in_flight': self.in_flight,
+                'pending': len(self.pending),
+                'revoked': self.revoked,
+                'active_streams': len(self.flows),
+                'streams': {
+                    str(flow_id): {
+                        'client_id': flow.client_id,
+                        'weight': flow.weight,
+                        'bytes_sent': flow.bytes_sent,
+                        'chunks_sent': flow.chunks_sent
+                    }
+                    for flow_id, flow in self.flows.items()
+                }
+            }
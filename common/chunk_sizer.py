@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Adaptive chunk sizing for result streams
+Picks rows per chunk from a target chunk size in bytes and a target time per
+chunk, learned from each stream's observed bytes per row, serialization cost
+and client consumption rate, so clients need not guess max_results_per_chunk
+"""
+
+import threading
+from typing import Optional
+
+
+class ChunkStream:
+    """
+    Rows-per-chunk state of one result stream
+
+    Keeps smoothed bytes per row and seconds per row (building the chunk plus
+    gRPC accepting it, which blocks on flow control when the client reads
+    slower than the gateway sends). The next chunk is the largest that stays
+    within both targets and the hard byte cap, growing at most growth_factor
+    per chunk so a single fast chunk does not overshoot.
+    """
+
+    def __init__(self, sizer: 'ChunkSizer', requested_rows: int = 0):
+        """
+        Initialize stream state
+
+        Args:
+            sizer: Process-wide ChunkSizer (targets and shared bytes-per-row estimate)
+            requested_rows: Client's max_results_per_chunk; 0 lets the sizer adapt
+        """
+        self.sizer = sizer
+        self.adaptive = requested_rows <= 0 and sizer.enabled
+        self.requested_rows = requested_rows if requested_rows > 0 else sizer.default_rows
+        self.bytes_per_row = sizer.bytes_per_row
+        self.max_bytes_per_row = sizer.max_bytes_per_row
+        self.seconds_per_row: Optional[float] = None
+        self.last_rows = 0
+
+    def next_rows(self) -> int:
+        """Rows to put in the next chunk"""
+        sizer = self.sizer
+        if not self.adaptive:
+            # The client's size, capped at max_bytes once a row size is known
+            if not self.max_bytes_per_row:
+                return self.requested_rows
+            return max(1, min(self.requested_rows, int(sizer.max_bytes // self.max_bytes_per_row)))
+
+        # Until some chunk has been measured, the first one is a probe of initial_rows
+        byte_cap = int(sizer.max_bytes // self.max_bytes_per_row) if self.max_bytes_per_row else sizer.initial_rows
+
+        if self.last_rows == 0:
+            rows = sizer.initial_rows
+        else:
+            rows = sizer.target_bytes / self.bytes_per_row
+            if self.seconds_per_row:
+                rows = min(rows, sizer.target_seconds / self.seconds_per_row)
+            rows = min(rows, self.last_rows * sizer.growth_factor)
+        rows = max(sizer.min_rows, min(int(rows), sizer.max_rows))
+        return max(1, min(rows, byte_cap))
+
+    def record(self, rows: int, nbytes: int, build_seconds: float, send_seconds: float):
+        """
+        Record a sent chunk
+
+        Args:
+            rows: Measurements in the chunk
+            nbytes: Serialized chunk size
+            build_seconds: Time to read, build and size the chunk
+            send_seconds: Time until gRPC accepted the chunk
+        """
+        if rows <= 0:
+            return
+        self.last_rows = rows
+        alpha = self.sizer.smoothing
+        bytes_per_row = nbytes / rows
+        seconds_per_row = (build_seconds + send_seconds) / rows
+        self.bytes_per_row = (bytes_per_row if self.bytes_per_row is None
+                              else alpha * bytes_per_row + (1 - alpha) * self.bytes_per_row)
+        self.max_bytes_per_row = max(self.max_bytes_per_row or 0, bytes_per_row)
+        self.seconds_per_row = (seconds_per_row if self.seconds_per_row is None
+                                else alpha * seconds_per_row + (1 - alpha) * self.seconds_per_row)
+        self.sizer._record(rows, nbytes, bytes_per_row, self.adaptive)
+
+
+class ChunkSizer:
+    """
+    Process-wide chunk sizing policy
+
+    Holds the targets and a bytes-per-row estimate shared by all streams
+    (rows are similar in size whoever asks for them), which seeds the hard
+    byte cap of new streams before their first chunk; the very first adaptive
+    chunk after startup, with nothing measured yet, holds at most
+    initial_rows rows. Streams that set max_results_per_chunk keep that size,
+    capped at max_chunk_bytes once a row size has been measured so no chunk
+    approaches the gRPC message size limit.
+    """
+
+    def __init__(self, enabled: bool = False, target_bytes: int = 1024 * 1024, target_seconds: float = 0.2,
+                 max_bytes: int = 3 * 1024 * 1024, min_rows: int = 100, max_rows: int = 50000,
+                 initial_rows: int = 1000, growth_factor: float = 4.0, default_rows: int = 1000,
+                 smoothing: float = 0.3, name: str = "unknown"):
+        """
+        Initialize chunk sizer
+
+        Args:
+            enabled: Adapt chunk sizes for requests without max_results_per_chunk (default: False)
+            target_bytes: Target serialized chunk size (default: 1 MiB)
+            target_seconds: Target time to build and send one chunk (default: 0.2)
+            max_bytes: Hard cap on chunk size, below clients' 4 MiB default receive limit (default: 3 MiB)
+            min_rows: Fewest rows in an adaptive chunk (default: 100)
+            max_rows: Most rows in an adaptive chunk (default: 50000)
+            initial_rows: Rows in a stream's first adaptive chunk (default: 1000)
+            growth_factor: Largest growth from one chunk to the next (default: 4.0)
+            default_rows: Rows per chunk when not adapting and the client set none (default: 1000)
+            smoothing: Weight of the newest observation in the moving averages (default: 0.3)
+            name: Name identifier for logging (default: "unknown")
+        """
+        self.enabled = enabled
+        self.target_bytes = max(1, target_bytes)
+        self.target_seconds = target_seconds
+        self.max_bytes = max(1, max_bytes)
+        self.min_rows = max(1, min_rows)
+        self.max_rows = max(self.min_rows, max_rows)
+        self.initial_rows = max(1, initial_rows)
+        self.growth_factor = max(1.0, growth_factor)
+        self.default_rows = max(1, default_rows)
+        self.smoothing = smoothing
+        self.name = name
+
+        self.lock = threading.Lock()
+        self.bytes_per_row: Optional[float] = None
+        self.max_bytes_per_row: Optional[float] = None
+        self.adaptive_chunks = 0
+        self.fixed_chunks = 0
+        self.rows_sent = 0
+        self.bytes_sent = 0
+        self.largest_chunk_bytes = 0
+
+    def start_stream(self, requested_rows: int = 0) -> ChunkStream:
+        """
+        Begin sizing a new stream
+
+        Args:
+            requested_rows: Client's max_results_per_chunk (0 to adapt)
+
+        Returns:
+            ChunkStream to ask for each chunk's size and to record sent chunks
+        """
+        with self.lock:
+            return ChunkStream(self, requested_rows)
+
+    def _record(self, rows: int, nbytes: int, bytes_per_row: float, adaptive: bool):
+        """Update the shared estimate and counters with one sent chunk"""
+        with self.lock:
+            self.bytes_per_row = (bytes_per_row if self.bytes_per_row is None
+                                  else self.smoothing * bytes_per_row + (1 - self.smoothing) * self.bytes_per_row)
+            self.max_bytes_per_row = max(self.max_bytes_per_row or 0, bytes_per_row)
+            if adaptive:
+                self.adaptive_chunks += 1
+            else:
+                self.fixed_chunks += 1
+            self.rows_sent += rows
+            self.bytes_sent += nbytes
+            self.largest_chunk_bytes = max(self.largest_chunk_bytes, nbytes)
+
+    def get_stats(self) -> dict:
+        """
+        Get chunk sizing statistics
+
+        Returns:
+            Dictionary with targets, the shared bytes-per-row estimate and chunk counters
+        """
+        with self.lock:
+            chunks = self.adaptive_chunks + self.fixed_chunks
+            return {
+                'enabled': self.enabled,
+                'target_bytes': self.target_bytes,
+                'target_seconds': self.target_seconds,
+                'max_bytes': self.max_bytes,
+                'bytes_per_row': round(self.bytes_per_row, 1) if self.bytes_per_row else None,
+                'adaptive_chunks': self.adaptive_chunks,
+                'fixed_chunks': self.fixed_chunks,
+                'average_chunk_rows': round(self.rows_sent / chunks, 1) if chunks else None,
+                'average_chunk_bytes': int(self.bytes_sent / chunks) if chunks else None,
+                'largest_chunk_bytes': self.largest_chunk_bytes
+            }
@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
 """
 Circuit breaker implementation for fault tolerance
-Prevents repeated calls to failing servers by opening circuit after threshold failures
+Prevents repeated calls to failing or degraded servers by opening circuit after
+threshold failures, or when the failure rate or slow-call rate of recent calls is too high
 """
 
 import time
 import threading
+from collections import deque
 from enum import Enum
-from typing import Callable, Any, Optional
+from typing import Callable, Any, Deque, Iterable, Optional, Tuple
+
+import grpc
+
+# gRPC codes that say the neighbor is down, overloaded or broken; other codes
+# (INVALID_ARGUMENT, RESOURCE_EXHAUSTED from quotas, ...) are about the request
+DEFAULT_FAILURE_CODES = ('UNAVAILABLE', 'DEADLINE_EXCEEDED', 'INTERNAL')
 
 
 class CircuitState(Enum):
@@ -28,11 +36,26 @@ class CircuitBreaker:
     
     State machine:
     CLOSED -> [3 failures] -> OPEN -> [30s timeout] -> HALF_OPEN -> [1 success] -> CLOSED
-                                                                  -> [1 failure] -> OPEN
+           -> [failure rate or slow-call rate over window]         -> [1 failure or slow call] -> OPEN
+    
+    Every call's duration and outcome is kept in a sliding window of the last
+    window_size calls. Once the window holds minimum_calls, the circuit also
+    opens when the failure rate or the share of calls slower than
+    slow_call_duration reaches its threshold, so a neighbor that still answers
+    but far too slowly is shed the same way as a dead one.
+    
+    Only gRPC errors with one of failure_codes count as failures (other
+    exceptions always do); errors with other codes are caused by the request
+    and pass through without being recorded.
     """
     
     def __init__(self, failure_threshold: int = 3, open_timeout: float = 30.0, 
-                 success_threshold: int = 1, name: str = "unknown"):
+                 success_threshold: int = 1, name: str = "unknown",
+                 window_size: int = 20, minimum_calls: int = 10,
+                 failure_rate_threshold: float = 0.5,
+                 slow_call_duration: float = 5.0,
+                 slow_call_rate_threshold: float = 0.5,
+                 failure_codes: Iterable[str] = DEFAULT_FAILURE_CODES):
         """
         Initialize circuit breaker
         
@@ -41,11 +64,24 @@ class CircuitBreaker:
             open_timeout: Seconds to stay OPEN before transitioning to HALF_OPEN (default: 30.0)
             success_threshold: Number of successes needed to close from HALF_OPEN (default: 1)
             name: Name identifier for logging (default: "unknown")
+            window_size: Number of recent calls kept in the sliding window (default: 20)
+            minimum_calls: Calls required in the window before rates are evaluated (default: 10)
+            failure_rate_threshold: Failure fraction of the window that opens the circuit (default: 0.5)
+            slow_call_duration: Seconds after which a call counts as slow (default: 5.0)
+            slow_call_rate_threshold: Slow-call fraction of the window that opens the circuit (default: 0.5)
+            failure_codes: Names of gRPC status codes recorded as failures
+                (default: UNAVAILABLE, DEADLINE_EXCEEDED, INTERNAL)
         """
         self.failure_threshold = failure_threshold
         self.open_timeout = open_timeout
         self.success_threshold = success_threshold
         self.name = name
+        self.window_size = window_size
+        self.minimum_calls = minimum_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.failure_codes = frozenset(grpc.StatusCode[code] for code in failure_codes)
         
         # State tracking
         self.state = CircuitState.CLOSED
@@ -53,11 +89,16 @@ class CircuitBreaker:
         self.success_count = 0
         self.last_failure_time: Optional[float] = None
         self.last_state_change_time = time.time()
+        self.open_reason: Optional[str] = None
+        
+        # Sliding window of recent calls: (duration_seconds, succeeded)
+        self.window: Deque[Tuple[float, bool]] = deque(maxlen=window_size)
         
         # Thread safety
         self.lock = threading.Lock()
         
-        print(f"[CircuitBreaker-{name}] Initialized: threshold={failure_threshold}, timeout={open_timeout}s")
+        print(f"[CircuitBreaker-{name}] Initialized: threshold={failure_threshold}, timeout={open_timeout}s, "
+              f"window={window_size}, slow_call={slow_call_duration}s")
     
     def get_state(self) -> CircuitState:
         """
@@ -88,7 +129,8 @@ class CircuitBreaker:
             
         Raises:
             CircuitBreakerOpenError: If circuit is OPEN
-            Exception: Any exception raised by func (after recording failure)
+            Exception: Any exception raised by func (recorded as a failure
+                unless it is a gRPC error outside failure_codes)
         """
         # Check current state (may trigger OPEN -> HALF_OPEN transition)
         current_state = self.get_state()
@@ -97,61 +139,122 @@ class CircuitBreaker:
             raise CircuitBreakerOpenError(f"Circuit breaker OPEN for {self.name}")
         
         # CLOSED or HALF_OPEN: attempt the call
+        start_time = time.time()
         try:
             result = func()
-            self._record_success()
-            return result
-        except Exception as e:
-            self._record_failure()
+        except grpc.RpcError as e:
+            if e.code() in self.failure_codes:
+                self._record_failure(time.time() - start_time)
+            raise
+        except Exception:
+            self._record_failure(time.time() - start_time)
             raise
+        self._record_success(time.time() - start_time)
+        return result
     
-    def _record_success(self):
-        """Record a successful call"""
+    def _record_success(self, duration: float = 0.0):
+        """
+        Record a successful call
+        
+        Args:
+            duration: Seconds the call took (slow successes count against the slow-call rate)
+        """
         with self.lock:
             old_state = self.state
+            self.window.append((duration, True))
+            is_slow = duration >= self.slow_call_duration
             
             if self.state == CircuitState.HALF_OPEN:
-                # In HALF_OPEN, we need success_threshold successes to close
-                self.success_count += 1
-                if self.success_count >= self.success_threshold:
-                    self._transition_to_closed()
+                if is_slow:
+                    # Probe answered but is still degraded: back to OPEN
+                    self._transition_to_open("slow_probe")
+                else:
+                    # In HALF_OPEN, we need success_threshold successes to close
+                    self.success_count += 1
+                    if self.success_count >= self.success_threshold:
+                        self._transition_to_closed()
             elif self.state == CircuitState.CLOSED:
                 # In CLOSED, reset failure count on success
                 self.failure_count = 0
                 self.success_count = 0
+                self._check_window_thresholds()
             
             # Log state change if it occurred
             if old_state != self.state:
-                print(f"[CircuitBreaker-{self.name}] 🟢 State transition: {old_state.value} -> {self.state.value}")
                 if self.state == CircuitState.CLOSED:
+                    print(f"[CircuitBreaker-{self.name}] 🟢 State transition: {old_state.value} -> {self.state.value}")
                     print(f"[CircuitBreaker-{self.name}] ✅ Circuit CLOSED - normal operation resumed")
+                else:
+                    self._log_opened(old_state)
     
-    def _record_failure(self):
-        """Record a failed call"""
+    def _record_failure(self, duration: float = 0.0):
+        """
+        Record a failed call
+        
+        Args:
+            duration: Seconds the call took before failing
+        """
         with self.lock:
             old_state = self.state
             self.last_failure_time = time.time()
+            self.window.append((duration, False))
             
             if self.state == CircuitState.HALF_OPEN:
                 # Failure in HALF_OPEN: go back to OPEN
-                self._transition_to_open()
+                self._transition_to_open("probe_failed")
             elif self.state == CircuitState.CLOSED:
                 # Failure in CLOSED: increment count, open if threshold reached
                 self.failure_count += 1
                 self.success_count = 0
                 if self.failure_count >= self.failure_threshold:
-                    self._transition_to_open()
+                    self._transition_to_open("consecutive_failures")
+                else:
+                    self._check_window_thresholds()
             
             # Log state change if it occurred
             if old_state != self.state:
-                print(f"[CircuitBreaker-{self.name}] 🔴 State transition: {old_state.value} -> {self.state.value} "
-                      f"(failure_count={self.failure_count})")
-                if self.state == CircuitState.OPEN:
-                    print(f"[CircuitBreaker-{self.name}] ⚠️ Circuit OPENED - will block calls for {self.open_timeout}s")
+                self._log_opened(old_state)
+    
+    def _window_rates(self) -> Tuple[float, float]:
+        """
+        Compute (failure_rate, slow_call_rate) over the sliding window
+        
+        Must be called with lock held.
+        """
+        calls = len(self.window)
+        if calls == 0:
+            return 0.0, 0.0
+        failures = sum(1 for _, succeeded in self.window if not succeeded)
+        slow = sum(1 for duration, _ in self.window if duration >= self.slow_call_duration)
+        return failures / calls, slow / calls
     
-    def _transition_to_open(self):
-        """Transition circuit to OPEN state"""
+    def _check_window_thresholds(self):
+        """Open the circuit if window failure or slow-call rate is over threshold (lock held)"""
+        if len(self.window) < self.minimum_calls:
+            return
+        failure_rate, slow_call_rate = self._window_rates()
+        if failure_rate >= self.failure_rate_threshold:
+            self._transition_to_open("failure_rate")
+        elif slow_call_rate >= self.slow_call_rate_threshold:
+            self._transition_to_open("slow_call_rate")
+    
+    def _log_opened(self, old_state: CircuitState):
+        """Log a transition into OPEN (lock held)"""
+        failure_rate, slow_call_rate = self._window_rates()
+        print(f"[CircuitBreaker-{self.name}] 🔴 State transition: {old_state.value} -> {self.state.value} "
+              f"(reason={self.open_reason}, failure_count={self.failure_count}, "
+              f"failure_rate={failure_rate:.0%}, slow_call_rate={slow_call_rate:.0%})")
+        print(f"[CircuitBreaker-{self.name}] ⚠️ Circuit OPENED - will block calls for {self.open_timeout}s")
+    
+    def _transition_to_open(self, reason: str = "manual"):
+        """
+        Transition circuit to OPEN state
+        
+        Args:
+            reason: Why the circuit opened (reported in get_stats())
+        """
         self.state = CircuitState.OPEN
+        self.open_reason = reason
         self.last_failure_time = time.time()
         self.last_state_change_time = time.time()
         self.success_count = 0
@@ -172,6 +275,9 @@ class CircuitBreaker:
         self.failure_count = 0
         self.success_count = 0
         self.last_failure_time = None
+        self.open_reason = None
+        # Start a fresh window so calls from the degraded period don't re-trip it
+        self.window.clear()
     
     def reset(self):
         """Manually reset circuit breaker to CLOSED state"""
@@ -186,16 +292,27 @@ class CircuitBreaker:
         Get circuit breaker statistics
         
         Returns:
-            Dictionary with state, failure_count, and timing information
+            Dictionary with state, failure_count, timing information and
+            sliding window statistics (call count, failure/slow-call rates, durations)
         """
         with self.lock:
+            failure_rate, slow_call_rate = self._window_rates()
+            durations = [duration for duration, _ in self.window]
             stats = {
                 'state': self.state.value,
                 'failure_count': self.failure_count,
                 'success_count': self.success_count,
                 'last_state_change_time': self.last_state_change_time,
                 'last_failure_time': self.last_failure_time,
-                'time_since_last_failure': time.time() - self.last_failure_time if self.last_failure_time else None
+                'time_since_last_failure': time.time() - self.last_failure_time if self.last_failure_time else None,
+                'open_reason': self.open_reason,
+                'window_size': self.window_size,
+                'window_calls': len(self.window),
+                'window_failure_rate': failure_rate,
+                'window_slow_call_rate': slow_call_rate,
+                'window_avg_duration': sum(durations) / len(durations) if durations else None,
+                'window_max_duration': max(durations) if durations else None,
+                'slow_call_duration': self.slow_call_duration
             }
             return stats
 
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Per-client quotas for gateway queries
+Token buckets on requests/s and result bytes/s plus a cap on concurrent streams,
+so one misbehaving client cannot saturate the cluster
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class QuotaExceededError(Exception):
+    """Exception raised when a client exceeds its request rate or concurrent stream quota"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate` tokens per second up to `burst`
+
+    try_take() is all-or-nothing (used for request admission). reserve()
+    always succeeds but may leave the bucket in debt; the caller waits out
+    the returned delay (used to pace result bytes).
+    """
+
+    def __init__(self, rate: float, burst: float):
+        """
+        Initialize token bucket
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity
+        """
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.last_refill_time = time.time()
+
+    def _refill(self):
+        """Add tokens for the time elapsed since the last refill"""
+        now = time.time()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill_time) * self.rate)
+        self.last_refill_time = now
+
+    def try_take(self, amount: float = 1.0) -> bool:
+        """
+        Take tokens if enough are available
+
+        Args:
+            amount: Tokens needed
+
+        Returns:
+            True if the tokens were taken
+        """
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take tokens, going into debt if necessary
+
+        Args:
+            amount: Tokens needed
+
+        Returns:
+            Seconds to wait until the debt is paid off (0 if none)
+        """
+        self._refill()
+        self.tokens -= amount
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def time_until(self, amount: float = 1.0) -> float:
+        """Seconds until `amount` tokens will be available"""
+        self._refill()
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+
+class _ClientState:
+    """Buckets and counters for one client"""
+
+    def __init__(self, client_id: str, limits: dict):
+        self.client_id = client_id
+        self.limits = limits
+
+        requests_per_second = limits.get('requests_per_second', 0)
+        bytes_per_second = limits.get('bytes_per_second', 0)
+        # A rate of 0 means unlimited
+        self.request_bucket = (TokenBucket(requests_per_second, limits.get('request_burst', requests_per_second))
+                               if requests_per_second > 0 else None)
+        self.byte_bucket = (TokenBucket(bytes_per_second, limits.get('bytes_burst', bytes_per_second))
+                            if bytes_per_second > 0 else None)
+        self.max_concurrent_streams = limits.get('max_concurrent_streams', 0)
+
+        self.active_streams = 0
+        self.last_used = time.time()
+        self.requests_allowed = 0
+        self.rejected_rate = 0
+        self.rejected_concurrency = 0
+        self.bytes_sent = 0
+        self.throttled_seconds = 0.0
+
+
+class ClientQuotaManager:
+    """
+    Enforces per-client quotas at the gateway
+
+    Each client (identified by the 'client-id' metadata) gets its own buckets,
+    using its entry in client_limits or else default_limits. Limit keys:
+    requests_per_second / request_burst, max_concurrent_streams and
+    bytes_per_second / bytes_burst; 0 or missing means unlimited.
+
+    Client ids are chosen by the caller, so the number of tracked states is
+    capped: states without open streams are dropped after idle_seconds, and
+    once max_clients are tracked, new unknown ids are charged to the caller's
+    peer host (see resolve_client()) instead of getting fresh buckets.
+    """
+
+    def __init__(self, default_limits: Optional[dict] = None,
+                 client_limits: Optional[Dict[str, dict]] = None, name: str = "unknown",
+                 max_clients: int = 10000, idle_seconds: float = 300.0):
+        """
+        Initialize quota manager
+
+        Args:
+            default_limits: Limits for clients without their own entry (default: unlimited)
+            client_limits: client_id -> limits overriding the defaults
+            name: Name identifier for logging (default: "unknown")
+            max_clients: Most client states to track (default: 10000)
+            idle_seconds: Drop a client's state this long after its last stream (default: 300.0)
+        """
+        self.default_limits = dict(default_limits or {})
+        self.client_limits = dict(client_limits or {})
+        self.name = name
+        self.max_clients = max_clients
+        self.idle_seconds = idle_seconds
+
+        # Least recently used first
+        self.clients: "OrderedDict[str, _ClientState]" = OrderedDict()
+        self.evicted = 0
+        self.overflowed = 0
+        self.lock = threading.Lock()
+
+        print(f"[Quota-{name}] Initialized: default={self.default_limits}, "
+              f"overrides for {sorted(self.client_limits)}, "
+              f"max_clients={max_clients}, idle_seconds={idle_seconds}")
+
+    def resolve_client(self, client_id: str, fallback_id: str) -> str:
+        """
+        Pick the identity a caller-supplied client id is charged as
+
+        Known and configured ids keep their own state. An unknown id gets one
+        while fewer than max_clients are tracked; beyond that it shares the
+        fallback's, so rotating ids cannot mint fresh quotas.
+
+        Args:
+            client_id: Id from the 'client-id' metadata
+            fallback_id: Identity to charge instead (the peer host)
+
+        Returns:
+            client_id, or fallback_id when no more clients can be tracked
+        """
+        with self.lock:
+            if client_id in self.clients or client_id in self.client_limits:
+                return client_id
+            self._evict_idle(make_room=False)
+            if len(self.clients) < self.max_clients:
+                self._get_client(client_id)
+                return client_id
+            self.overflowed += 1
+            if self.overflowed % 1000 == 1:
+                print(f"[Quota-{self.name}] Tracking {len(self.clients)} clients (limit {self.max_clients}), "
+                      f"charging {client_id} to {fallback_id} ({self.overflowed} so far)")
+            return fallback_id
+
+    def _get_client(self, client_id: str) -> _ClientState:
+        """Get or create the state for a client and mark it most recently used (lock held)"""
+        state = self.clients.get(client_id)
+        if state is None:
+            limits = dict(self.default_limits)
+            limits.update(self.client_limits.get(client_id, {}))
+            self._evict_idle(make_room=True)
+            state = _ClientState(client_id, limits)
+            self.clients[client_id] = state
+        else:
+            self.clients.move_to_end(client_id)
+        state.last_used = time.time()
+        return state
+
+    def _evict_idle(self, make_room: bool):
+        """
+        Drop states without open streams that idled past idle_seconds (lock held)
+
+        Args:
+            make_room: Also drop the least recently used idle states until one
+                more fits under max_clients (only for fallback identities, so
+                rotating ids cannot push out other clients' buckets)
+        """
+        now = time.time()
+        excess = len(self.clients) - self.max_clients + 1 if make_room else 0
+        idle = []
+        for client_id, state in self.clients.items():
+            if excess <= len(idle) and now - state.last_used < self.idle_seconds:
+                break
+            if state.active_streams == 0:
+                idle.append(client_id)
+        for client_id in idle:
+            del self.clients[client_id]
+        self.evicted += len(idle)
+
+    def start_stream(self, client_id: str):
+        """
+        Admit a new Query stream for a client
+
+        Args:
+            client_id: Identity of the calling client
+
+        Raises:
+            QuotaExceededError: If the client is over its request rate or concurrent stream limit
+        """
+        with self.lock:
+            state = self._get_client(client_id)
+
+            if state.max_concurrent_streams > 0 and state.active_streams >= state.max_concurrent_streams:
+                state.rejected_concurrency += 1
+                raise QuotaExceededError(
+                    f"client {client_id} has {state.active_streams} open streams "
+                    f"(limit {state.max_concurrent_streams})",
+                    1.0
+                )
+
+            if state.request_bucket is not None and not state.request_bucket.try_take():
+                state.rejected_rate += 1
+                raise QuotaExceededError(
+                    f"client {client_id} exceeded {state.request_bucket.rate:g} requests/s",
+                    state.request_bucket.time_until()
+                )
+
+            state.active_streams += 1
+            state.requests_allowed += 1
+
+    def end_stream(self, client_id: str):
+        """
+        Release a stream admitted by start_stream()
+
+        Args:
+            client_id: Identity of the calling client
+        """
+        with self.lock:
+            state = self.clients.get(client_id)
+            if state is not None and state.active_streams > 0:
+                state.active_streams -= 1
+                state.last_used = time.time()
+                self.clients.move_to_end(client_id)
+
+    def throttle_bytes(self, client_id: str, nbytes: int) -> float:
+        """
+        Account for result bytes about to be sent, sleeping if over the byte rate
+
+        Args:
+            client_id: Identity of the calling client
+            nbytes: Serialized size of the chunk
+
+        Returns:
+            Seconds spent throttled
+        """
+        with self.lock:
+            # The stream's start_stream() created the state, and it is not evicted while
+            # the stream is open; never recreate one (a fresh bucket would start full)
+            state = self.clients.get(client_id)
+            if state is None:
+                return 0.0
+            state.bytes_sent += nbytes
+            delay = state.byte_bucket.reserve(nbytes) if state.byte_bucket is not None else 0.0
+            state.throttled_seconds += delay
+
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def get_stats(self, client_id: Optional[str] = None) -> Dict[str, dict]:
+        """
+        Get per-client quota counters
+
+        Args:
+            client_id: Only report this client (default: all clients seen so far)
+
+        Returns:
+            client_id -> dictionary with limits, active streams and counters
+        """
+        with self.lock:
+            states = [self.clients[client_id]] if client_id in self.clients else (
+                [] if client_id else list(self.clients.values()))
+            return {
+                state.client_id: {
+                    'limits': dict(state.limits),
+                    'active_streams': state.active_streams,
+                    'requests_allowed': state.requests_allowed,
+                    'rejected_rate': state.rejected_rate,
+                    'rejected_concurrency': state.rejected_concurrency,
+                    'bytes_sent': state.bytes_sent,
+                    'throttled_seconds': state.throttled_seconds
+                }
+                for state in states
+            }
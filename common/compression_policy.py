@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Per-call response compression
+Compresses large responses (gzip or deflate) only when the caller is on
+another host: same-host hops gain nothing from fewer bytes and would pay the
+CPU. Compression ratio and CPU cost are estimated on a sample of the
+compressed messages, off the request path.
+"""
+
+import ipaddress
+import queue
+import socket
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, Optional
+from urllib.parse import unquote
+
+import grpc
+
+# Config names -> gRPC algorithms
+ALGORITHMS = {
+    'gzip': grpc.Compression.Gzip,
+    'deflate': grpc.Compression.Deflate
+}
+
+# zlib window bits giving the same stream format gRPC uses (gzip / zlib
+# wrapper, default level), so sampled ratios match what goes on the wire
+ZLIB_WBITS = {
+    'gzip': 15 | 16,
+    'deflate': 15
+}
+
+
+def _peer_host(peer: str) -> Optional[str]:
+    """
+    Host part of a gRPC peer string ("ipv4:10.0.0.2:5000", "ipv6:[::1]:5000")
+    Returns None for peers without an IP (e.g. unix sockets)
+    """
+    kind, _, address = unquote(peer).partition(':')
+    if kind == 'ipv4':
+        return address.rsplit(':', 1)[0]
+    if kind == 'ipv6':
+        return address.rsplit(':', 1)[0].strip('[]')
+    return None
+
+
+def local_addresses(hostnames: Iterable[str] = ()) -> set:
+    """IP addresses of this host (its hostname plus the configured ones)"""
+    addresses = set()
+    for hostname in [socket.gethostname(), *hostnames]:
+        try:
+            addresses.update(socket.gethostbyname_ex(hostname)[2])
+        except (socket.error, UnicodeError):
+            continue
+    return addresses
+
+
+class CompressionPolicy:
+    """
+    Decides per call (and per streamed message) whether to compress
+
+    A message is compressed when compression is enabled, it serializes to
+    at least min_bytes and, with cross_host_only, the peer is not this host.
+    Unary responses set the call's compression; streams enable it for the
+    call up front and turn it off for each message below the threshold.
+    gRPC does not report compressed sizes or compression time, so the ratio
+    and CPU cost in get_stats() are estimates: every sample_every-th
+    compressed message is handed to a background thread that compresses it
+    again with zlib in gRPC's format. Samples arriving while one is being
+    compressed are dropped, so the request path never waits on it.
+    """
+
+    def __init__(self, process_id: str, config: Optional[dict] = None, hostnames: Iterable[str] = ()):
+        """
+        Initialize compression policy
+
+        Args:
+            process_id: Process ID for logging
+            config: "compression" config section (enabled, algorithm, min_bytes,
+                cross_host_only, stats_sample_every); None disables compression
+            hostnames: Hostnames this process is reachable under (treated as local)
+        """
+        config = config or {}
+        self.process_id = process_id
+        self.enabled = config.get('enabled', False)
+        self.algorithm_name = config.get('algorithm', 'gzip')
+        if self.algorithm_name not in ALGORITHMS:
+            raise ValueError(f"Unknown compression algorithm: {self.algorithm_name}")
+        self.algorithm = ALGORITHMS[self.algorithm_name]
+        self.min_bytes = config.get('min_bytes', 64 * 1024)
+        self.cross_host_only = config.get('cross_host_only', True)
+        self.sample_every = max(1, config.get('stats_sample_every', 10))
+        self.local_addresses = local_addresses(hostnames) if self.enabled else set()
+
+        self.lock = threading.Lock()
+        self.peer_decisions: Dict[str, bool] = {}
+        self.compressed_messages = 0
+        self.compressed_bytes_in = 0
+        self.small_messages = 0
+        self.same_host_messages = 0
+        self.sampled_bytes_in = 0
+        self.sampled_bytes_out = 0
+        self.sampled_cpu_seconds = 0.0
+        self.samples_dropped = 0
+        self.samples: queue.Queue = queue.Queue(maxsize=1)
+        self.sampler_thread: Optional[threading.Thread] = None
+
+    def is_cross_host(self, peer: str) -> bool:
+        """Whether a gRPC peer is on another host (cached per peer host)"""
+        host = _peer_host(peer)
+        if host is None:
+            return False
+        decision = self.peer_decisions.get(host)
+        if decision is None:
+            try:
+                address = ipaddress.ip_address(host)
+                if address.version == 6 and address.ipv4_mapped is not None:
+                    address = address.ipv4_mapped
+                decision = not address.is_loopback and str(address) not in self.local_addresses
+            except ValueError:
+                decision = True
+            self.peer_decisions[host] = decision
+        return decision
+
+    def _peer_eligible(self, context) -> bool:
+        """Whether responses to this call's peer may be compressed"""
+        if not self.enabled:
+            return False
+        return not self.cross_host_only or self.is_cross_host(context.peer())
+
+    def compress_response(self, context, message) -> bool:
+        """
+        Set compression for a unary response
+
+        Args:
+            context: gRPC servicer context of the call
+            message: Response message about to be returned
+
+        Returns:
+            True if the response will be compressed
+        """
+        if not self.enabled:
+            return False
+        if not self._peer_eligible(context):
+            with self.lock:
+                self.same_host_messages += 1
+            return False
+
+        size = message.ByteSize()
+        if size < self.min_bytes:
+            with self.lock:
+                self.small_messages += 1
+            return False
+
+        context.set_compression(self.algorithm)
+        self._record(message, size)
+        print(f"[{self.process_id}] Compressing {size / 1024:.0f} KiB response with {self.algorithm_name} "
+              f"for {context.peer()}")
+        return True
+
+    def start_stream(self, context) -> bool:
+        """
+        Enable compression for a response stream (call before the first message)
+
+        Returns:
+            True if the stream's large messages will be compressed
+        """
+        if not self._peer_eligible(context):
+            return False
+        context.set_compression(self.algorithm)
+        return True
+
+    def stream_message(self, context, message, compressing: bool, size: Optional[int] = None):
+        """
+        Decide compression for the next message of a stream started with start_stream()
+
+        Args:
+            context: gRPC servicer context of the call
+            message: Message about to be yielded
+            compressing: Return value of start_stream()
+            size: message.ByteSize(), if already known
+        """
+        if not self.enabled:
+            return
+        if not compressing:
+            with self.lock:
+                self.same_host_messages += 1
+            return
+
+        size = message.ByteSize() if size is None else size
+        if size < self.min_bytes:
+            context.disable_next_message_compression()
+            with self.lock:
+                self.small_messages += 1
+            return
+        self._record(message, size)
+
+    def _record(self, message, size: int):
+        """Count a compressed message, queueing a sample for the ratio / CPU estimate"""
+        with self.lock:
+            self.compressed_messages += 1
+            self.compressed_bytes_in += size
+            sample = (self.compressed_messages - 1) % self.sample_every == 0
+            if sample and self.sampler_thread is None:
+                self.sampler_thread = threading.Thread(target=self._sample_loop, daemon=True,
+                                                       name=f"CompressionSampler-{self.process_id}")
+                self.sampler_thread.start()
+        if not sample:
+            return
+
+        try:
+            self.samples.put_nowait(message)
+        except queue.Full:
+            with self.lock:
+                self.samples_dropped += 1
+
+    def _sample_loop(self):
+        """Background thread compressing sampled messages to estimate ratio and CPU cost"""
+        wbits = ZLIB_WBITS[self.algorithm_name]
+        while True:
+            message = self.samples.get()
+            payload = message.SerializeToString()
+            start = time.thread_time()
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, wbits)
+            compressed_size = len(compressor.compress(payload)) + len(compressor.flush())
+            cpu_seconds = time.thread_time() - start
+            with self.lock:
+                self.sampled_bytes_in += len(payload)
+                self.sampled_bytes_out += compressed_size
+                self.sampled_cpu_seconds += cpu_seconds
+            print(f"[{self.process_id}] Compression sample: {len(payload) / 1024:.0f} KiB -> "
+                  f"~{compressed_size / 1024:.0f} KiB ({len(payload) / max(1, compressed_size):.1f}x) "
+                  f"in ~{cpu_seconds * 1000:.1f} ms CPU")
+
+    def get_stats(self) -> dict:
+        """
+        Get compression counters
+
+        Returns:
+            Dictionary with message counts, bytes and the estimated ratio / CPU cost
+            (from background recompression of a sample, not measured inside gRPC)
+        """
+        with self.lock:
+            ratio = self.sampled_bytes_in / self.sampled_bytes_out if self.sampled_bytes_out else None
+            megabytes = self.sampled_bytes_in / (1024 * 1024)
+            return {
+                'enabled': self.enabled,
+                'algorithm': self.algorithm_name,
+                'min_bytes': self.min_bytes,
+                'cross_host_only': self.cross_host_only,
+                'compressed_messages': self.compressed_messages,
+                'compressed_bytes_in': self.compressed_bytes_in,
+                'estimated_bytes_saved': int(self.compressed_bytes_in * (1 - 1 / ratio)) if ratio else 0,
+                'small_messages': self.small_messages,
+                'same_host_messages': self.same_host_messages,
+                'estimated_ratio': round(ratio, 2) if ratio else None,
+                'estimated_cpu_ms_per_mib': round(self.sampled_cpu_seconds * 1000 / megabytes, 2) if megabytes else None,
+                'samples_dropped': self.samples_dropped
+            }
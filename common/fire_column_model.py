@@ -4,18 +4,28 @@ Column-oriented fire air quality data model for efficient querying
 """
 
 import csv
+import hashlib
 import os
 from typing import List, Dict, Set, Tuple, Optional
-from collections import defaultdict
+
+from bitmap_index import BitmapIndex, bitmap_rows
+from rollups import RollupTable
+from zone_map import ZoneMap
+
+# Columns with a bitmap index (FireColumnModel.bitmap())
+BITMAP_COLUMNS = ('parameter', 'site_name', 'agency_name', 'aqs_code', 'category')
 
 
 class FireColumnModel:
     """
     Column-oriented storage for fire air quality measurements.
-    Provides efficient indexing and querying capabilities.
+    Provides efficient indexing and querying capabilities
+    (bitmap indexes on the categorical columns).
+    Optionally maintains site x parameter x hour rollups for summary queries.
+    Keeps a zone map (per-file / per-block min/max) so range scans skip blocks.
     """
     
-    def __init__(self):
+    def __init__(self, build_rollups: bool = False, zone_map_block_rows: int = 4096):
         # Columnar storage - parallel arrays
         self.latitudes: List[float] = []
         self.longitudes: List[float] = []
@@ -31,10 +41,14 @@ class FireColumnModel:
         self.aqs_codes: List[str] = []
         self.full_aqs_codes: List[str] = []
         
-        # Index structures for fast lookups
-        self._site_indices: Dict[str, List[int]] = defaultdict(list)
-        self._parameter_indices: Dict[str, List[int]] = defaultdict(list)
-        self._aqs_indices: Dict[str, List[int]] = defaultdict(list)
+        # Bitmap indexes for fast lookups (value -> rows holding it)
+        self._bitmap_indexes: Dict[str, BitmapIndex] = {column: BitmapIndex() for column in BITMAP_COLUMNS}
+        
+        # Observed AQI range per AQI category
+        self._category_aqi_bounds: Dict[int, List[int]] = {}
+        
+        # Min/max of the numeric columns per row block (blocks end at file boundaries)
+        self.zone_map = ZoneMap(zone_map_block_rows)
         
         # Metadata tracking
         self._unique_sites: Set[str] = set()
@@ -47,14 +61,21 @@ class FireColumnModel:
         self._max_latitude: Optional[float] = None
         self._min_longitude: Optional[float] = None
         self._max_longitude: Optional[float] = None
+        
+        # Pre-computed rollups (None when disabled)
+        self.rollups: Optional[RollupTable] = RollupTable() if build_rollups else None
+        self._building_rollups = build_rollups
     
-    def read_from_directory(self, directory_path: str, allowed_subdirs: List[str] = None) -> None:
+    def read_from_directory(self, directory_path: str, allowed_subdirs: List[str] = None,
+                            rollup_snapshot: Optional[str] = None) -> None:
         """
         Load all CSV files from a directory (recursively).
         
         Args:
             directory_path: Path to directory containing CSV files
             allowed_subdirs: Optional list of subdirectory names to load (for partitioning)
+            rollup_snapshot: Optional file to load rollups from (if built from the
+                same CSV files) or to persist freshly built rollups to
         """
         csv_files = self._get_csv_files(directory_path, allowed_subdirs)
         
@@ -67,6 +88,16 @@ class FireColumnModel:
         else:
             print(f"[FireColumnModel] Processing {len(csv_files)} CSV files from {directory_path}...")
         
+        # Reuse persisted rollups if the partition is unchanged
+        signature = None
+        if self.rollups is not None and rollup_snapshot and self.measurement_count() == 0:
+            signature = self._source_signature(csv_files)
+            snapshot = RollupTable.load(rollup_snapshot, signature)
+            if snapshot is not None:
+                self.rollups = snapshot
+                self._building_rollups = False
+                print(f"[FireColumnModel] Loaded {snapshot.bucket_count()} rollup buckets from {rollup_snapshot}")
+        
         for csv_file in csv_files:
             try:
                 self.read_from_csv(csv_file)
@@ -74,6 +105,19 @@ class FireColumnModel:
                 print(f"[FireColumnModel] Error processing {csv_file}: {e}")
         
         print(f"[FireColumnModel] Loaded {self.measurement_count()} measurements from {self.site_count()} sites")
+        print(f"[FireColumnModel] Zone map covers {self.zone_map.block_count()} row blocks")
+        
+        if self._building_rollups:
+            print(f"[FireColumnModel] Built {self.rollups.bucket_count()} rollup buckets")
+            if signature is not None:
+                try:
+                    self.rollups.save(rollup_snapshot, signature)
+                    print(f"[FireColumnModel] Saved rollup snapshot to {rollup_snapshot}")
+                except OSError as e:
+                    print(f"[FireColumnModel] Could not save rollup snapshot {rollup_snapshot}: {e}")
+        
+        # Rows inserted from now on keep the rollups current
+        self._building_rollups = self.rollups is not None
     
     def read_from_csv(self, filename: str) -> None:
         """
@@ -119,6 +163,9 @@ class FireColumnModel:
                 except (ValueError, IndexError) as e:
                     # Skip rows with invalid data
                     continue
+        
+        # Each file gets its own zone map block(s)
+        self.zone_map.seal()
     
     def insert_measurement(
         self,
@@ -157,23 +204,44 @@ class FireColumnModel:
         self._update_indices(new_index)
         self._update_geographic_bounds(latitude, longitude)
         self._update_datetime_range(datetime)
+        self.zone_map.add(new_index, datetime, aqi, concentration, latitude, longitude)
         
         # Update metadata
         self._unique_sites.add(site_name)
         self._unique_parameters.add(parameter)
         self._unique_agencies.add(agency_name)
+        
+        if self._building_rollups:
+            self.rollups.add(site_name, parameter, datetime, aqi, concentration)
     
     def get_indices_by_site(self, site_name: str) -> List[int]:
         """Get all measurement indices for a specific site."""
-        return self._site_indices.get(site_name, [])
+        return bitmap_rows(self._bitmap_indexes['site_name'].bitmap(site_name))
     
     def get_indices_by_parameter(self, parameter: str) -> List[int]:
         """Get all measurement indices for a specific parameter (e.g., PM2.5)."""
-        return self._parameter_indices.get(parameter, [])
+        return bitmap_rows(self._bitmap_indexes['parameter'].bitmap(parameter))
     
     def get_indices_by_aqs_code(self, aqs_code: str) -> List[int]:
         """Get all measurement indices for a specific AQS code."""
-        return self._aqs_indices.get(aqs_code, [])
+        return bitmap_rows(self._bitmap_indexes['aqs_code'].bitmap(aqs_code))
+    
+    def bitmap(self, column: str, values) -> int:
+        """
+        Bitmap of the rows whose column holds any of the values.
+        
+        Args:
+            column: One of BITMAP_COLUMNS
+            values: Values to match
+        
+        Returns:
+            Packed bitset with bit i set for each matching row i
+        """
+        return self._bitmap_indexes[column].union(values)
+    
+    def category_aqi_bounds(self) -> Dict[int, List[int]]:
+        """Get observed [min, max] AQI per AQI category."""
+        return self._category_aqi_bounds
     
     def measurement_count(self) -> int:
         """Get total number of measurements."""
@@ -208,9 +276,19 @@ class FireColumnModel:
         if index >= len(self.site_names):
             return
         
-        self._site_indices[self.site_names[index]].append(index)
-        self._parameter_indices[self.parameters[index]].append(index)
-        self._aqs_indices[self.aqs_codes[index]].append(index)
+        self._bitmap_indexes['parameter'].add(self.parameters[index], index)
+        self._bitmap_indexes['site_name'].add(self.site_names[index], index)
+        self._bitmap_indexes['agency_name'].add(self.agency_names[index], index)
+        self._bitmap_indexes['aqs_code'].add(self.aqs_codes[index], index)
+        self._bitmap_indexes['category'].add(self.categories[index], index)
+        
+        aqi = self.aqis[index]
+        bounds = self._category_aqi_bounds.get(self.categories[index])
+        if bounds is None:
+            self._category_aqi_bounds[self.categories[index]] = [aqi, aqi]
+        else:
+            bounds[0] = min(bounds[0], aqi)
+            bounds[1] = max(bounds[1], aqi)
     
     def _update_geographic_bounds(self, latitude: float, longitude: float) -> None:
         """Update geographic bounds tracking."""
@@ -230,30 +308,47 @@ class FireColumnModel:
         if not self._datetime_range[1] or datetime > self._datetime_range[1]:
             self._datetime_range[1] = datetime
     
+    def _source_signature(self, csv_files: List[str]) -> str:
+        """Signature of the source files (name, size, mtime) used to validate rollup snapshots."""
+        digest = hashlib.sha1()
+        for csv_file in csv_files:
+            stat = os.stat(csv_file)
+            digest.update(f"{os.path.basename(csv_file)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode('utf-8'))
+        return digest.hexdigest()
+    
     def _get_csv_files(self, directory_path: str, allowed_subdirs: List[str] = None) -> List[str]:
         """
         Recursively find all CSV files in directory.
         
         Args:
             directory_path: Base directory path
-            allowed_subdirs: Optional list of allowed subdirectory names (for partitioning)
+            allowed_subdirs: Optional list of allowed subdirectory names (for partitioning);
+                "<subdirectory>/<file>" entries allow single files of a split subdirectory
         """
         csv_files = []
+        split_files = {entry for entry in (allowed_subdirs or []) if '/' in entry}
+        split_dirs = {entry.split('/')[0] for entry in split_files}
         
         try:
             for root, dirs, files in os.walk(directory_path):
                 # If we have partition restrictions, check if current directory is allowed
+                whole_dir = True
                 if allowed_subdirs:
                     # Get the immediate subdirectory name relative to directory_path
                     rel_path = os.path.relpath(root, directory_path)
                     # Check if this directory or its parent is in allowed list
                     dir_name = rel_path.split(os.sep)[0]
                     if dir_name != '.' and dir_name not in allowed_subdirs:
-                        continue  # Skip this directory
+                        if dir_name not in split_dirs:
+                            continue  # Skip this directory
+                        whole_dir = False
                 
                 for file in files:
-                    if file.endswith('.csv'):
-                        csv_files.append(os.path.join(root, file))
+                    if not file.endswith('.csv'):
+                        continue
+                    if not whole_dir and '/'.join(rel_path.split(os.sep) + [file]) not in split_files:
+                        continue  # File of a split subdirectory assigned elsewhere
+                    csv_files.append(os.path.join(root, file))
         except Exception as e:
             print(f"[FireColumnModel] Error accessing directory {directory_path}: {e}")
         
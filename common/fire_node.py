@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Fire node - config-driven team leader / worker server
+One implementation for processes B-F: the config's role, data partition and
+neighbors decide what a node does. Every node answers internal queries from
+its local scan; team leaders also fan the query out to their query-enabled
+neighbors and merge the responses. Partitions and links can be reassigned at
+runtime (AssignPartitions, coordinated by the gateway).
+
+Usage: python common/fire_node.py <config_file>
+"""
+
+import json
+import grpc
+from concurrent import futures
+import sys
+import os
+import time
+
+# Add proto directory to path (this file's directory, common/, is already on it)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'proto'))
+
+import fire_service_pb2
+import fire_service_pb2_grpc
+from local_scan import LocalScan
+from neighbor_fan_out import NeighborFanOut, query_neighbors
+from partition_handoff import PartitionHandoff
+from query_profile import QueryProfiler
+from sketches import SKETCH_QUERY_TYPES, SketchAggregator
+from admission_control import AdmissionController, AdmissionRejectedError, priority_class
+from compression_policy import CompressionPolicy
+from result_buffer import MemoryBudget, create_result_buffer
+from health_monitor import HealthBroadcaster, ServerStatus
+
+
+class FireNodeService(fire_service_pb2_grpc.FireQueryServiceServicer):
+    """
+    FireQueryService for a team leader or worker
+
+    Behavior comes from the config and two components: the local scan
+    (data partition + query engine) and the fan-out to neighbors. Nodes
+    whose config lists query-enabled neighbors get a NeighborFanOut and
+    buffer local and neighbor results under the memory budget; nodes
+    without one (workers) build their response straight from the local scan.
+    Each query is answered from the partition assignment version of its
+    partition_epoch, so a partition handoff never mixes assignments.
+    """
+
+    def __init__(self, config, local_scan=None, fan_out=None, scan_factory=None):
+        """
+        Initialize node
+
+        Args:
+            config: Process config (see configs/process_*.json)
+            local_scan: Local scan component (default: LocalScan over the configured partition)
+            fan_out: Fan-out component (default: NeighborFanOut when the config has
+                query-enabled neighbors, none otherwise)
+            scan_factory: Builds the local scan of a reassigned partition list
+                (default: LocalScan over those partitions)
+        """
+        self.config = config
+        self.process_id = config['identity']
+        self.role = config['role']
+        self.team = config['team']
+        self.neighbors = config.get('neighbors', [])
+        print(f"[{self.process_id}] Initialized as {self.role} for Team {self.team}")
+        if self.neighbors:
+            print(f"[{self.process_id}] Neighbors: {[n['process_id'] for n in self.neighbors]}")
+
+        # Own health state pushed to callers' WatchHealth streams
+        health_config = config.get('health_monitoring', {})
+        self.heartbeat_interval = health_config.get('heartbeat_interval_seconds', 0.25)
+        self.health_broadcaster = HealthBroadcaster(self.process_id)
+
+        # Local data partition and its query engine
+        local_scan = local_scan if local_scan is not None else LocalScan(self.process_id, config)
+
+        # Per-call compression of large responses to callers on other hosts
+        self.compression = CompressionPolicy(self.process_id, config.get('compression'), [config['hostname']])
+
+        # Memory budget for buffered results (requests over their share spill to disk)
+        memory_config = config.get('memory_budget', {})
+        self.memory_budget = MemoryBudget(
+            max_bytes=memory_config.get('max_buffered_bytes', 256 * 1024 * 1024),
+            max_request_fraction=memory_config.get('max_request_fraction', 0.5),
+            name=self.process_id
+        ) if memory_config.get('enabled', False) else None
+        self.spill_directory = memory_config.get('spill_directory')
+
+        # Priority-aware admission control for internal queries
+        admission_config = config.get('admission_control', {})
+        self.admission_enabled = admission_config.get('enabled', False)
+        self.admission_controller = AdmissionController(
+            initial_limit=admission_config.get('initial_limit', 8),
+            min_limit=admission_config.get('min_limit', 1),
+            max_limit=admission_config.get('max_limit', 32),
+            max_queue=admission_config.get('max_queue', 16),
+            queue_timeout=admission_config.get('queue_timeout_seconds', 2.0),
+            latency_target=admission_config.get('latency_target_seconds', 5.0),
+            backoff_ratio=admission_config.get('backoff_ratio', 0.9),
+            priority_shares=admission_config.get('priority_shares'),
+            max_preempt_pause=admission_config.get('max_preempt_pause_seconds', 1.0),
+            name=self.process_id
+        )
+
+        # Team leaders fan out to query-enabled neighbors; workers only scan locally
+        self.fan_out = fan_out
+        if self.fan_out is None and query_neighbors(config):
+            self.fan_out = NeighborFanOut(self.process_id, config, neighbor_label="worker")
+        if self.fan_out is not None:
+            print(f"[{self.process_id}] Circuit breakers initialized for "
+                  f"{len(self.fan_out.circuit_breakers)} query-enabled neighbors")
+            self.fan_out.start_health_monitoring()
+
+        # Partition assignment versions (the configured partitions are epoch 0)
+        if scan_factory is None:
+            def scan_factory(partitions):
+                return LocalScan(self.process_id, config, partitions=partitions)
+        self.partition_handoff = PartitionHandoff(self.process_id, local_scan, self.fan_out, config, scan_factory)
+
+    def Query(self, request, context):
+        """
+        Handle client query request (if called directly)
+        Clients query the gateway; leaders and workers receive InternalQuery instead
+        """
+        print(f"[{self.process_id}] Received direct query request_id={request.request_id}")
+
+        chunk = fire_service_pb2.QueryResponseChunk(
+            request_id=request.request_id,
+            chunk_number=0,
+            is_last_chunk=True,
+            total_chunks=1,
+            total_results=0
+        )
+        yield chunk
+
+    def InternalQuery(self, request, context):
+        """
+        Handle internal queries, admitted by priority class
+        Rejected queries fail fast with RESOURCE_EXHAUSTED and a retry-after hint
+        """
+        priority = request.priority
+        profiler = QueryProfiler(self.process_id, self.role)
+        queue_wait = 0.0
+        if self.admission_enabled:
+            try:
+                queue_wait = self.admission_controller.acquire(priority)
+            except AdmissionRejectedError as e:
+                retry_after_ms = int(e.retry_after * 1000)
+                print(f"[{self.process_id}] 🚫 Rejected internal query {request.request_id}: {e} (retry after {retry_after_ms}ms)")
+                context.set_trailing_metadata((('retry-after-ms', str(retry_after_ms)),))
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, f"{self.process_id} overloaded: {e}")
+            if queue_wait > 0:
+                print(f"[{self.process_id}] {priority_class(priority)} query {request.request_id} waited {queue_wait:.2f}s for a slot")
+
+        start_time = time.time()
+        failed = False
+        try:
+            profiler.add('queue_wait', queue_wait * 1000)
+            response = self._handle_internal_query(request, profiler)
+            self.compression.compress_response(context, response)
+            return response
+        except Exception:
+            failed = True
+            raise
+        finally:
+            if self.admission_enabled:
+                self.admission_controller.release(time.time() - start_time, not failed, priority)
+
+    def _handle_internal_query(self, request, profiler):
+        """
+        Handle internal queries from the gateway (leaders) or a team leader (workers)
+        Local results, plus the neighbors' results on nodes that fan out
+        """
+        query_start = time.time()
+        print(f"[{self.process_id}] 📥 Internal query from {request.requesting_process}")
+        print(f"  Request ID: {request.request_id}")
+        print(f"  Original request: {request.original_request_id}")
+        print(f"  Query type: {request.query_type}")
+
+        # Answer from the partition assignment the query was planned against
+        version = self.partition_handoff.for_epoch(request.partition_epoch)
+        if version.epoch != request.partition_epoch:
+            print(f"  Partition epoch: {request.partition_epoch} (serving epoch {version.epoch})")
+
+        if request.query_type in SKETCH_QUERY_TYPES:
+            return self._handle_sketch_query(request, version, profiler)
+        if request.query_type == 'summary':
+            return self._handle_summary_query(request, version, profiler)
+
+        if self.fan_out is None:
+            # Query local data straight into the response (no neighbors, nothing to merge)
+            response = self._new_response(request, [])
+            local_start = time.time()
+            local_count = version.scan.execute_into(response, request, self._scan_checkpoint(request), profiler)
+            print(f"[{self.process_id}] Found {local_count} local measurements (took {time.time() - local_start:.2f}s)")
+        else:
+            # Aggregated results (spill to disk beyond this request's memory share;
+            # sorted queries keep one run per source and merge them into the response)
+            results = create_result_buffer(request, self.memory_budget, self.spill_directory,
+                                           name=f"{self.process_id}-{request.request_id}")
+            try:
+                local_start = time.time()
+                local_measurements = version.scan.execute(request, self._scan_checkpoint(request), profiler)
+                print(f"[{self.process_id}] Found {len(local_measurements)} local measurements "
+                      f"(took {time.time() - local_start:.2f}s)")
+                with profiler.stage('merge'):
+                    results.extend(local_measurements)
+                del local_measurements
+
+                unavailable_processes = self._forward(request, version, results, profiler)
+                print(f"[{self.process_id}] Aggregated {len(results)} measurements "
+                      f"(total {time.time() - query_start:.2f}s){' (spilled to disk)' if results.spilled else ''}")
+
+                response = self._new_response(request, unavailable_processes)
+                with profiler.stage('merge'):
+                    for batch in results.iter_batches(1000):
+                        response.measurements.extend(batch)
+            finally:
+                results.close()
+
+        print(f"[{self.process_id}] Returning response with {len(response.measurements)} measurements")
+        self._attach_profile(request, response, profiler)
+        return response
+
+    def _forward(self, request, version, results, profiler):
+        """
+        Forward to neighbors if this node fans out (every query type goes through here)
+        Merges their answers into results; returns unavailable processes
+        """
+        if self.fan_out is None:
+            return []
+        forward_start = time.time()
+        unavailable_processes = self.fan_out.forward(request, results, profiler, version.routes)
+        print(f"[{self.process_id}] Forward to {self.fan_out.neighbor_label}s took {time.time() - forward_start:.2f}s"
+              f"{f', missing {unavailable_processes}' if unavailable_processes else ''}")
+        return unavailable_processes
+
+    def _new_response(self, request, unavailable_processes):
+        """InternalQueryResponse for a request, partial when processes were unavailable"""
+        return fire_service_pb2.InternalQueryResponse(
+            request_id=request.request_id,
+            original_request_id=request.original_request_id,
+            is_complete=not unavailable_processes,
+            responding_process=self.process_id,
+            unavailable_processes=unavailable_processes
+        )
+
+    def _scan_checkpoint(self, request):
+        """Preemption checkpoint for a local scan (None for interactive queries)"""
+        if self.admission_enabled and request.priority != fire_service_pb2.INTERACTIVE:
+            return lambda: self._preemption_checkpoint(request)
+        return None
+
+    def _attach_profile(self, request, response, profiler):
+        """Add this process's QueryProfile to the response if the caller asked for one"""
+        if not request.profile:
+            return
+        profiler.rows_returned = len(response.measurements) + len(response.summaries)
+        # gRPC serializes the response after we return; time one serialization here
+        with profiler.stage('serialization'):
+            response.SerializeToString()
+        response.profile.CopyFrom(profiler.to_proto())
+
+    def _handle_sketch_query(self, request, version, profiler):
+        """
+        Handle distinct_count / quantiles queries
+        Merges the local sketch with the neighbors' sketches; no rows are moved
+        """
+        sketch, rows = version.scan.sketch(request, self._scan_checkpoint(request), profiler)
+        print(f"[{self.process_id}] Sketched {rows} local rows")
+
+        aggregator = SketchAggregator(request.query_type, sketch, rows)
+        unavailable_processes = self._forward(request, version, aggregator, profiler)
+
+        response = self._new_response(request, unavailable_processes)
+        response.sketch = aggregator.sketch.to_bytes()
+        response.aggregated_rows = aggregator.rows
+        print(f"[{self.process_id}] Returning {request.query_type} sketch over {aggregator.rows} rows "
+              f"({len(response.sketch)} bytes)")
+        self._attach_profile(request, response, profiler)
+        return response
+
+    def _handle_summary_query(self, request, version, profiler):
+        """
+        Handle summary queries (grouped count/min/max/sum)
+        Merges the local groups (from rollups when the filter aligns) with the neighbors' groups
+        """
+        summary, from_rollups = version.scan.summarize(request, self._scan_checkpoint(request), profiler)
+        print(f"[{self.process_id}] Summarized {len(summary)} local groups "
+              f"({'from rollups' if from_rollups else 'from raw rows'})")
+
+        unavailable_processes = self._forward(request, version, summary, profiler)
+
+        response = self._new_response(request, unavailable_processes)
+        response.summaries.extend(summary.to_rows())
+        print(f"[{self.process_id}] Returning {len(response.summaries)} summary groups")
+        self._attach_profile(request, response, profiler)
+        return response
+
+    def _preemption_checkpoint(self, request):
+        """Pause a lower-priority scan between batches while more important work is active"""
+        paused = self.admission_controller.yield_to_higher_priority(request.priority)
+        if paused > 0:
+            print(f"[{self.process_id}] ⏸️ {priority_class(request.priority)} query {request.request_id} "
+                  f"yielded {paused:.2f}s to higher-priority work")
+
+    def AssignPartitions(self, request, context):
+        """
+        Handle one phase of a partition reassignment (from the gateway or a team leader)
+        Applied here and relayed to this node's neighbors
+        """
+        print(f"[{self.process_id}] Partition assignment {request.phase} "
+              f"(epoch {request.epoch}) from {request.requesting_process}")
+        return self.partition_handoff.handle(request)
+
+    def CancelRequest(self, request, context):
+        """Handle request cancellation"""
+        print(f"[{self.process_id}] Cancel request_id={request.request_id}")
+
+        return fire_service_pb2.StatusResponse(
+            request_id=request.request_id,
+            status="cancelled",
+            chunks_delivered=0,
+            total_chunks=0
+        )
+
+    def GetStatus(self, request, context):
+        """Handle status check"""
+        print(f"[{self.process_id}] Status request_id={request.request_id}")
+
+        return fire_service_pb2.StatusResponse(
+            request_id=request.request_id,
+            status="pending",
+            chunks_delivered=0,
+            total_chunks=0
+        )
+
+    def HealthCheck(self, request, context):
+        """Handle health check requests"""
+        return self._health_response(self.health_broadcaster.get_status())
+
+    def WatchHealth(self, request, context):
+        """
+        Stream this server's health: state changes immediately, heartbeats otherwise
+        """
+        interval = self.heartbeat_interval
+        if request.heartbeat_interval_ms > 0:
+            interval = max(request.heartbeat_interval_ms / 1000.0, 0.05)
+
+        version = -1
+        while context.is_active():
+            version, status = self.health_broadcaster.wait_for_change(version, interval)
+            yield self._health_response(status)
+
+    def _health_response(self, status):
+        """Build HealthResponse for the given own ServerStatus"""
+        return fire_service_pb2.HealthResponse(
+            healthy=(status != ServerStatus.UNAVAILABLE),
+            status=status.value,
+            timestamp=int(time.time()),
+            process_id=self.process_id,
+            role=self.role
+        )
+
+    def Notify(self, request, context):
+        """Handle notifications from other processes"""
+        print(f"[{self.process_id}] Notification from {request.requesting_process}")
+
+        return fire_service_pb2.StatusResponse(
+            request_id=request.request_id,
+            status="acknowledged"
+        )
+
+
+def load_config(config_path):
+    """Load configuration from JSON file"""
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+
+def serve(config_path):
+    """Start the gRPC server"""
+    # Load configuration
+    config = load_config(config_path)
+    process_id = config['identity']
+    hostname = config['hostname']
+    port = config['port']
+
+    # Create server: enough threads for admitted + queued internal queries plus health streams
+    server_config = config.get('server', {})
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=server_config.get('max_workers', 10)))
+
+    # Add service implementation
+    service_impl = FireNodeService(config)
+    fire_service_pb2_grpc.add_FireQueryServiceServicer_to_server(service_impl, server)
+
+    # Bind to address
+    server_address = f"{hostname}:{port}"
+    server.add_insecure_port(server_address)
+
+    # Start server
+    server.start()
+    print(f"[{process_id}] Server started on {server_address}")
+    print(f"[{process_id}] Press Ctrl+C to stop")
+
+    # Keep server running
+    try:
+        server.wait_for_termination()
+    except KeyboardInterrupt:
+        print(f"\n[{process_id}] Shutting down...")
+        # Tell watchers we are going away before the streams are torn down
+        service_impl.health_broadcaster.set_status(ServerStatus.UNAVAILABLE)
+        if service_impl.fan_out is not None:
+            service_impl.fan_out.health_monitor.stop_monitoring()
+        server.stop(0.5)
+        if service_impl.fan_out is not None:
+            service_impl.fan_out.channel_pool.close()
+
+
+def main(argv=None, example_config="configs/process_c.json"):
+    """
+    Command-line entry point: serve the config given as the only argument
+
+    Args:
+        argv: Command line (default: sys.argv)
+        example_config: Config shown in the usage message
+    """
+    argv = sys.argv if argv is None else argv
+    if len(argv) != 2:
+        script = os.path.basename(argv[0])
+        print(f"Usage: python {script} <config_file>")
+        print(f"Example: python {script} {example_config}")
+        sys.exit(1)
+
+    serve(argv[1])
+
+
+if __name__ == '__main__':
+    main()
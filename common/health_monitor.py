@@ -6,7 +6,7 @@ Health monitoring utilities for tracking neighbor server status
 import time
 import threading
 from enum import Enum
-from typing import Dict, Optional, Callable
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
 
 
 class ServerStatus(Enum):
@@ -20,30 +20,55 @@ class HealthMonitor:
     """
     Tracks health status of neighbor servers
     
-    Monitors neighbor health through periodic checks and updates status
-    based on consecutive failures/successes.
+    Monitors neighbor health either through periodic checks or by consuming
+    WatchHealth streams, and updates status based on consecutive failures/successes.
+    A polled neighbor is UNAVAILABLE after failure_threshold failed checks. A
+    watched neighbor is UNAVAILABLE after as many failed streams (missed
+    heartbeat deadlines, refused connections) as fit in the detection budget,
+    at least one, so a hung or dead neighbor is detected within the budget.
     """
     
-    def __init__(self, process_id: str, health_check_interval: float = 5.0):
+    def __init__(self, process_id: str, health_check_interval: float = 5.0,
+                 heartbeat_timeout: float = 0.75, failure_threshold: int = 3,
+                 detection_budget: Optional[float] = None):
         """
         Initialize health monitor
         
         Args:
             process_id: ID of this process (for logging)
             health_check_interval: Seconds between health checks (default: 5.0)
+            heartbeat_timeout: Seconds without a heartbeat before a watched
+                               neighbor counts as failed (default: 0.75)
+            failure_threshold: Consecutive failed checks before a polled
+                               neighbor is UNAVAILABLE (default: 3)
+            detection_budget: Seconds allowed to detect a failed watched
+                              neighbor (default: failure_threshold heartbeat timeouts)
         """
         self.process_id = process_id
         self.health_check_interval = health_check_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.failure_threshold = max(1, failure_threshold)
+        if detection_budget is None:
+            self.watch_failure_threshold = self.failure_threshold
+        else:
+            self.watch_failure_threshold = max(1, int(detection_budget // max(heartbeat_timeout, 0.01)))
         
         # Track health of each neighbor
         # neighbor_id -> {status, last_seen, consecutive_failures, last_check_time}
         self.neighbor_health: Dict[str, dict] = {}
         
-        self.lock = threading.Lock()
+        # Active WatchHealth streams: neighbor_id -> call object (cancelled on stop/stall)
+        self.watch_calls: Dict[str, Any] = {}
+        self.watch_threads: Dict[str, threading.Thread] = {}
+        self.watchdog_thread: Optional[threading.Thread] = None
+        
+        self.lock = threading.RLock()
         self.running = False
         self.health_check_thread: Optional[threading.Thread] = None
         
-        print(f"[HealthMonitor-{process_id}] Initialized with interval={health_check_interval}s")
+        print(f"[HealthMonitor-{process_id}] Initialized with interval={health_check_interval}s, "
+              f"heartbeat_timeout={heartbeat_timeout}s, unavailable after {self.failure_threshold} failed checks "
+              f"or {self.watch_failure_threshold} failed health streams")
     
     def register_neighbor(self, neighbor_id: str):
         """
@@ -65,13 +90,15 @@ class HealthMonitor:
                 }
                 print(f"[HealthMonitor-{self.process_id}] Registered neighbor: {neighbor_id}")
     
-    def update_health(self, neighbor_id: str, is_healthy: bool):
+    def update_health(self, neighbor_id: str, is_healthy: bool, failure_threshold: Optional[int] = None):
         """
         Update health status for a neighbor
         
         Args:
             neighbor_id: ID of neighbor
             is_healthy: True if health check succeeded, False if failed
+            failure_threshold: Consecutive failures before UNAVAILABLE
+                               (default: the monitor's failure_threshold)
         """
         with self.lock:
             if neighbor_id not in self.neighbor_health:
@@ -99,7 +126,7 @@ class HealthMonitor:
                 health_info['total_failures'] += 1
                 
                 # Update status based on failure count
-                if health_info['consecutive_failures'] >= 3:
+                if health_info['consecutive_failures'] >= (failure_threshold or self.failure_threshold):
                     health_info['status'] = ServerStatus.UNAVAILABLE
                 elif health_info['consecutive_failures'] >= 1:
                     health_info['status'] = ServerStatus.DEGRADED
@@ -137,6 +164,24 @@ class HealthMonitor:
         """
         return self.get_status(neighbor_id) == ServerStatus.HEALTHY
     
+    def is_known_unavailable(self, neighbor_id: str) -> bool:
+        """
+        Check if checks have marked a neighbor UNAVAILABLE
+        
+        Unlike get_status(), a neighbor that was not checked yet (just
+        registered, or monitoring not started) does not count as unavailable.
+        
+        Args:
+            neighbor_id: ID of neighbor
+            
+        Returns:
+            True if the neighbor was checked and is UNAVAILABLE
+        """
+        with self.lock:
+            health_info = self.neighbor_health.get(neighbor_id)
+            return (health_info is not None and health_info['total_checks'] > 0
+                    and health_info['status'] == ServerStatus.UNAVAILABLE)
+    
     def get_health_info(self, neighbor_id: str) -> Optional[dict]:
         """
         Get detailed health information for a neighbor
@@ -198,16 +243,152 @@ class HealthMonitor:
         self.health_check_thread.start()
         print(f"[HealthMonitor-{self.process_id}] Background monitoring started")
     
+    def start_watching(self, neighbor_id: str, open_stream: Callable[[], Iterator]):
+        """
+        Start consuming a WatchHealth stream for a neighbor
+        
+        Every message on the stream (state change or heartbeat) is fed into
+        update_health(). A broken stream counts as a failure and is reopened
+        with a short backoff; a silent stream is detected by the watchdog.
+        
+        Args:
+            neighbor_id: ID of neighbor to watch
+            open_stream: Function that opens a new WatchHealth call
+                         (returns an iterator of HealthResponse with cancel())
+        """
+        self.register_neighbor(neighbor_id)
+        
+        with self.lock:
+            if neighbor_id in self.watch_threads:
+                print(f"[HealthMonitor-{self.process_id}] Already watching {neighbor_id}")
+                return
+            self.running = True
+            thread = threading.Thread(
+                target=self._watch_loop,
+                args=(neighbor_id, open_stream),
+                daemon=True,
+                name=f"HealthWatch-{self.process_id}->{neighbor_id}"
+            )
+            self.watch_threads[neighbor_id] = thread
+            
+            if self.watchdog_thread is None:
+                self.watchdog_thread = threading.Thread(
+                    target=self._watchdog_loop,
+                    daemon=True,
+                    name=f"HealthWatchdog-{self.process_id}"
+                )
+                self.watchdog_thread.start()
+        
+        thread.start()
+        print(f"[HealthMonitor-{self.process_id}] Watching {neighbor_id} via health stream")
+    
+    def stop_watching(self, neighbor_id: str):
+        """
+        Stop consuming a neighbor's health stream and forget the neighbor
+        
+        Args:
+            neighbor_id: ID of neighbor no longer linked
+        """
+        with self.lock:
+            thread = self.watch_threads.pop(neighbor_id, None)
+            call = self.watch_calls.pop(neighbor_id, None)
+            self.neighbor_health.pop(neighbor_id, None)
+        if call is not None:
+            call.cancel()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2.0)
+        print(f"[HealthMonitor-{self.process_id}] Stopped watching {neighbor_id}")
+    
     def stop_monitoring(self):
-        """Stop background health check thread"""
+        """Stop background health check thread and all health streams"""
         if not self.running:
             return
         
         self.running = False
+        with self.lock:
+            calls = list(self.watch_calls.values())
+        for call in calls:
+            call.cancel()
         if self.health_check_thread:
             self.health_check_thread.join(timeout=2.0)
+        for thread in list(self.watch_threads.values()):
+            thread.join(timeout=2.0)
         print(f"[HealthMonitor-{self.process_id}] Background monitoring stopped")
     
+    def _watch_loop(self, neighbor_id: str, open_stream: Callable[[], Iterator]):
+        """
+        Background thread that consumes one neighbor's health stream
+        
+        Args:
+            neighbor_id: ID of neighbor being watched
+            open_stream: Function that opens a new WatchHealth call
+        """
+        backoff = 0.1
+        while self._is_watching(neighbor_id):
+            call = None
+            try:
+                call = open_stream()
+                with self.lock:
+                    if neighbor_id not in self.watch_threads:
+                        call.cancel()  # Link closed while reconnecting
+                        break
+                    self.watch_calls[neighbor_id] = call
+                    # Reset the stall timer so reconnects get a full heartbeat window
+                    self.neighbor_health[neighbor_id]['last_check_time'] = time.time()
+                
+                for response in call:
+                    if not self._is_watching(neighbor_id):
+                        break
+                    self.update_health(neighbor_id, response.healthy, self.watch_failure_threshold)
+                    backoff = 0.1
+                
+                # Server closed the stream (e.g. shutting down)
+                if self._is_watching(neighbor_id):
+                    self.update_health(neighbor_id, False, self.watch_failure_threshold)
+            except Exception as e:
+                if not self._is_watching(neighbor_id):
+                    break
+                was_unavailable = self.get_status(neighbor_id) == ServerStatus.UNAVAILABLE
+                self.update_health(neighbor_id, False, self.watch_failure_threshold)
+                # Only log the transition to reduce log spam while reconnecting
+                if not was_unavailable and self.get_status(neighbor_id) == ServerStatus.UNAVAILABLE:
+                    code = e.code() if hasattr(e, 'code') else type(e).__name__
+                    print(f"[HealthMonitor-{self.process_id}] Health stream to {neighbor_id} failed: {code}")
+            finally:
+                with self.lock:
+                    if self.watch_calls.get(neighbor_id) is call:
+                        self.watch_calls.pop(neighbor_id)
+            
+            # Reconnect with capped exponential backoff
+            time.sleep(backoff)
+            backoff = min(backoff * 2, max(self.heartbeat_timeout, 0.1))
+    
+    def _is_watching(self, neighbor_id: str) -> bool:
+        """Whether the health stream of a neighbor should (still) be consumed"""
+        with self.lock:
+            return self.running and neighbor_id in self.watch_threads
+    
+    def _watchdog_loop(self):
+        """Background thread that fails watched neighbors whose heartbeats stop"""
+        tick = max(self.heartbeat_timeout / 3, 0.05)
+        while self.running:
+            time.sleep(tick)
+            now = time.time()
+            stalled = []
+            with self.lock:
+                for neighbor_id, call in self.watch_calls.items():
+                    health_info = self.neighbor_health.get(neighbor_id)
+                    if health_info is not None and now - health_info['last_check_time'] > self.heartbeat_timeout:
+                        stalled.append((neighbor_id, call))
+            
+            for neighbor_id, call in stalled:
+                # Hung neighbor: no heartbeat within timeout. Cancelling the call
+                # makes the watch loop record the failure and reconnect.
+                if self.get_status(neighbor_id) != ServerStatus.UNAVAILABLE:
+                    print(f"[HealthMonitor-{self.process_id}] No heartbeat from {neighbor_id} "
+                          f"for {self.heartbeat_timeout}s, reconnecting")
+                call.cancel()
+    
     def _health_check_loop(self, check_callback: Callable):
         """
         Background thread that periodically checks neighbor health
@@ -227,3 +408,60 @@ class HealthMonitor:
                 time.sleep(0.5)
                 sleep_time += 0.5
 
+
+
+class HealthBroadcaster:
+    """
+    Publishes this process's own health state to WatchHealth streams
+    
+    Stream handlers block in wait_for_change() and wake up either when the
+    state changes or when the heartbeat interval elapses.
+    """
+    
+    def __init__(self, process_id: str):
+        """
+        Initialize health broadcaster
+        
+        Args:
+            process_id: ID of this process (for logging)
+        """
+        self.process_id = process_id
+        self.status = ServerStatus.HEALTHY
+        self.version = 0
+        self.condition = threading.Condition()
+    
+    def set_status(self, status: ServerStatus):
+        """
+        Update own status and wake all watchers
+        
+        Args:
+            status: New ServerStatus for this process
+        """
+        with self.condition:
+            if status == self.status:
+                return
+            print(f"[HealthBroadcaster-{self.process_id}] Own status: {self.status.value} -> {status.value}")
+            self.status = status
+            self.version += 1
+            self.condition.notify_all()
+    
+    def get_status(self) -> ServerStatus:
+        """Get own current status"""
+        with self.condition:
+            return self.status
+    
+    def wait_for_change(self, last_version: int, timeout: float) -> Tuple[int, ServerStatus]:
+        """
+        Block until status changes past last_version or timeout elapses
+        
+        Args:
+            last_version: Version the caller has already seen (-1 for none)
+            timeout: Maximum seconds to wait (heartbeat interval)
+            
+        Returns:
+            Tuple of (current version, current status)
+        """
+        with self.condition:
+            if self.version == last_version:
+                self.condition.wait(timeout)
+            return self.version, self.status
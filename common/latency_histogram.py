@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Streaming latency histogram with logarithmic buckets
+Used to derive per-neighbor call deadlines from observed latency percentiles
+"""
+
+import math
+import threading
+from typing import List, Optional
+
+
+class LatencyHistogram:
+    """
+    Fixed-memory latency histogram with exponentially growing buckets
+
+    Bucket i covers (min_value * growth^(i-1), min_value * growth^i], so the
+    relative error of any percentile is bounded by the growth factor. Counts
+    are halved every decay_every samples so the histogram follows the recent
+    behavior of a neighbor rather than its whole history.
+    """
+
+    def __init__(self, min_value: float = 0.001, max_value: float = 600.0,
+                 growth: float = 1.2, decay_every: int = 200):
+        """
+        Initialize latency histogram
+
+        Args:
+            min_value: Upper bound of the first bucket in seconds (default: 0.001)
+            max_value: Largest tracked latency in seconds; larger samples are clamped (default: 600.0)
+            growth: Ratio between consecutive bucket bounds (default: 1.2)
+            decay_every: Samples between halving all counts, 0 disables decay (default: 200)
+        """
+        self.min_value = min_value
+        self.max_value = max_value
+        self.growth = growth
+        self.decay_every = decay_every
+
+        bucket_count = int(math.ceil(math.log(max_value / min_value, growth))) + 1
+        self.bounds: List[float] = [min_value * growth ** i for i in range(bucket_count)]
+        self.counts: List[float] = [0.0] * bucket_count
+        self.total = 0.0
+        self.samples_since_decay = 0
+        self.samples = 0
+        self.max_seen = 0.0
+
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """
+        Record one latency sample
+
+        Args:
+            seconds: Observed latency in seconds
+        """
+        seconds = min(max(seconds, 0.0), self.max_value)
+        if seconds <= self.min_value:
+            index = 0
+        else:
+            index = min(int(math.ceil(math.log(seconds / self.min_value, self.growth))),
+                        len(self.counts) - 1)
+
+        with self.lock:
+            self.counts[index] += 1.0
+            self.total += 1.0
+            self.samples += 1
+            self.max_seen = max(self.max_seen, seconds)
+            self.samples_since_decay += 1
+            if self.decay_every and self.samples_since_decay >= self.decay_every:
+                self.counts = [count / 2.0 for count in self.counts]
+                self.total /= 2.0
+                self.samples_since_decay = 0
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Estimate a latency percentile
+
+        Args:
+            p: Percentile in [0, 100]
+
+        Returns:
+            Upper bound of the bucket holding the percentile, or None if empty
+        """
+        with self.lock:
+            if self.total <= 0:
+                return None
+            target = self.total * min(max(p, 0.0), 100.0) / 100.0
+            cumulative = 0.0
+            for bound, count in zip(self.bounds, self.counts):
+                cumulative += count
+                if count > 0 and cumulative >= target:
+                    return bound
+            return self.bounds[-1]
+
+    def count(self) -> int:
+        """Get total number of samples recorded (not decayed)"""
+        with self.lock:
+            return self.samples
+
+    def get_stats(self) -> dict:
+        """
+        Get histogram summary
+
+        Returns:
+            Dictionary with sample count and p50/p90/p99/max latencies
+        """
+        return {
+            'samples': self.count(),
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max_seen
+        }
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Local scan component of a fire node
+Loads the process's data partition into a FireColumnModel (with rollups and
+zone maps as configured) and answers the local part of internal queries with
+a LocalQueryEngine
+"""
+
+import os
+from typing import List, Optional
+
+from fire_column_model import FireColumnModel
+from query_engine import LocalQueryEngine
+
+# Repository root: data/ and rollup snapshot paths in configs are relative to it
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LocalScan:
+    """
+    A process's data partition and the engine that scans it
+
+    Nodes call execute / execute_into / sketch / summarize with a
+    preemption checkpoint and a profiler; any object with those methods
+    can stand in for this one (e.g. a different storage engine).
+    """
+
+    def __init__(self, process_id: str, config: dict, root_dir: Optional[str] = None,
+                 partitions: Optional[List[str]] = None):
+        """
+        Load the configured partition and create the query engine
+
+        Args:
+            process_id: Process ID for logging
+            config: Process config (data_partition, rollups, zone_maps and
+                query_execution sections)
+            root_dir: Directory holding data/ (default: repository root)
+            partitions: Partitions to load instead of data_partition.directories
+                (a reassigned partition set; requires partitioning to be enabled)
+        """
+        self.process_id = process_id
+        root_dir = root_dir or REPO_ROOT
+        self.data_dir = os.path.join(root_dir, 'data')
+
+        # Partitions served (None: whole data directory, partitioning disabled)
+        self.partitions: Optional[List[str]] = None
+        if config.get('data_partition', {}).get('enabled'):
+            self.partitions = list(partitions if partitions is not None
+                                   else config['data_partition'].get('directories', []))
+
+        # Columnar store (optionally with site x parameter x hour rollups, persisted
+        # to a snapshot file; zone maps keep per-block min/max so range scans skip blocks)
+        rollup_config = config.get('rollups', {})
+        zone_map_config = config.get('zone_maps', {})
+        self.data_model = FireColumnModel(
+            build_rollups=rollup_config.get('enabled', False),
+            zone_map_block_rows=zone_map_config.get('block_rows', 4096)
+        )
+        rollup_snapshot = rollup_config.get('snapshot_file')
+        if rollup_snapshot:
+            rollup_snapshot = os.path.join(root_dir, rollup_snapshot)
+        data_path = self.data_dir
+        if self.partitions == []:
+            # Every partition handed off (or none assigned yet): serve nothing
+            print(f"[{process_id}] No partitions assigned")
+            print(f"[{process_id}] Data model initialized with 0 measurements")
+        elif os.path.exists(data_path):
+            # Check if partition is configured
+            allowed_dirs = self.partitions
+            if allowed_dirs is not None:
+                print(f"[{process_id}] Loading partitioned data from {len(allowed_dirs)} subdirectories: {allowed_dirs}")
+
+            self.data_model.read_from_directory(data_path, allowed_dirs, rollup_snapshot)
+            print(f"[{process_id}] Data model initialized with {self.data_model.measurement_count()} measurements")
+        else:
+            print(f"[{process_id}] Data directory not found: {data_path}")
+            print(f"[{process_id}] Data model initialized with 0 measurements")
+
+        # Planned, batched local scans (lower-priority scans yield between batches)
+        query_config = config.get('query_execution', {})
+        self.query_engine = LocalQueryEngine(
+            self.data_model,
+            scan_batch_size=query_config.get('scan_batch_size', 2000),
+            name=process_id,
+            histogram_buckets=query_config.get('histogram_buckets', 32),
+            grid_cell_degrees=query_config.get('grid_cell_degrees', 1.0),
+            cache_serialized_rows=query_config.get('cache_serialized_rows', False),
+            preload_serialized_rows=query_config.get('preload_serialized_rows', False)
+        )
+
+    def measurement_count(self) -> int:
+        """Number of rows in the local partition"""
+        return self.data_model.measurement_count()
+
+    def execute(self, request, checkpoint=None, profiler=None):
+        """Matching local rows as FireMeasurement messages (see LocalQueryEngine.execute)"""
+        return self.query_engine.execute(request, checkpoint, profiler)
+
+    def execute_into(self, response, request, checkpoint=None, profiler=None) -> int:
+        """Add matching local rows to response.measurements (see LocalQueryEngine.execute_into)"""
+        return self.query_engine.execute_into(response, request, checkpoint, profiler)
+
+    def sketch(self, request, checkpoint=None, profiler=None):
+        """Sketch of the matching local rows (see LocalQueryEngine.sketch)"""
+        return self.query_engine.sketch(request, checkpoint, profiler)
+
+    def summarize(self, request, checkpoint=None, profiler=None):
+        """Grouped summary of the matching local rows (see LocalQueryEngine.summarize)"""
+        return self.query_engine.summarize(request, checkpoint, profiler)
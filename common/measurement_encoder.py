@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Batch FireMeasurement encoding straight from the columnar store
+Builds the wire encoding of a repeated measurements field column by column
+(cached per-value field encodings, joined with C-level map/zip) so it can be
+parsed in one call, instead of constructing one message per row with 13
+keyword arguments
+"""
+
+import struct
+import threading
+from array import array
+from math import copysign
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from fire_column_model import FireColumnModel
+
+# FireMeasurement fields: (field number, wire type, FireColumnModel column)
+WIRE_DOUBLE, WIRE_VARINT, WIRE_BYTES = 1, 0, 2
+MEASUREMENT_FIELDS: Tuple[Tuple[int, int, str], ...] = (
+    (1, WIRE_DOUBLE, 'latitudes'),
+    (2, WIRE_DOUBLE, 'longitudes'),
+    (3, WIRE_BYTES, 'datetimes'),
+    (4, WIRE_BYTES, 'parameters'),
+    (5, WIRE_DOUBLE, 'concentrations'),
+    (6, WIRE_BYTES, 'units'),
+    (7, WIRE_DOUBLE, 'raw_concentrations'),
+    (8, WIRE_VARINT, 'aqis'),
+    (9, WIRE_VARINT, 'categories'),
+    (10, WIRE_BYTES, 'site_names'),
+    (11, WIRE_BYTES, 'agency_names'),
+    (12, WIRE_BYTES, 'aqs_codes'),
+    (13, WIRE_BYTES, 'full_aqs_codes')
+)
+
+# Field number of InternalQueryResponse.measurements
+RESPONSE_MEASUREMENTS_FIELD = 3
+
+_DOUBLE = struct.Struct('<d')
+_NEGATIVE_ZERO_BITS = 1 << 63
+
+
+def encode_varint(value: int) -> bytes:
+    """Protobuf base-128 varint (negative values as 64-bit two's complement)"""
+    if value < 0:
+        value += 1 << 64
+    out = bytearray()
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+class _FieldCache(dict):
+    """Value -> encoded field (tag + value), encoded on first lookup"""
+
+    def __init__(self, encode: Callable[[object], bytes]):
+        super().__init__()
+        self.encode = encode
+
+    def __missing__(self, value):
+        encoded = self.encode(value)
+        # NaN never matches itself (it would only grow the cache) and -0.0
+        # matches 0.0 while encoding differently; leave both uncached
+        if value == value and (value or not isinstance(value, float)):
+            self[value] = encoded
+        return encoded
+
+
+def _field_encoder(field_number: int, wire_type: int) -> Callable[[object], bytes]:
+    """Encoder for one field; default values encode to nothing, as in proto3"""
+    tag = encode_varint((field_number << 3) | wire_type)
+    if wire_type == WIRE_DOUBLE:
+        # -0.0 is not the default: protobuf serializes it
+        return lambda value: tag + _DOUBLE.pack(value) if value or copysign(1.0, value) < 0 else b''
+    if wire_type == WIRE_VARINT:
+        return lambda value: tag + encode_varint(value) if value else b''
+
+    def encode_string(value: str) -> bytes:
+        data = value.encode('utf-8')
+        return tag + encode_varint(len(data)) + data if data else b''
+    return encode_string
+
+
+def _has_negative_zero(values) -> bool:
+    """Whether a float column holds -0.0 (equal to 0.0, so invisible to set/dict checks)"""
+    return _NEGATIVE_ZERO_BITS in array('Q', array('d', values).tobytes())
+
+
+class MeasurementEncoder:
+    """
+    Encodes rows of a FireColumnModel as repeated FireMeasurement fields
+
+    Each column keeps a cache of its encoded values, and columns that are
+    functionally dependent on a determinant column (a site's coordinates,
+    agency and codes; a parameter's unit; an AQI's category) are folded
+    into one cached segment per determinant value. Encoding a row is then
+    a handful of dictionary lookups, and the per-row loops run inside
+    map()/zip() rather than Python bytecode. Protobuf parsers accept fields
+    in any order, so segments need not follow field number order.
+    """
+
+    # Columns other columns may be folded into, in order of preference
+    DETERMINANTS = ('site_names', 'parameters', 'aqis', 'concentrations')
+
+    def __init__(self, data_model: FireColumnModel):
+        """
+        Initialize encoder
+
+        Args:
+            data_model: Columnar store to read rows from
+        """
+        self.data_model = data_model
+        self.field_caches: Dict[str, _FieldCache] = {
+            column: _FieldCache(_field_encoder(number, wire_type))
+            for number, wire_type, column in MEASUREMENT_FIELDS
+        }
+        self.length_prefixes = _FieldCache(
+            lambda length: encode_varint((RESPONSE_MEASUREMENTS_FIELD << 3) | WIRE_BYTES) + encode_varint(length)
+        )
+        self.segments: List[Tuple[str, Dict]] = []
+        self.analyzed_rows = -1
+        self.lock = threading.Lock()
+
+    def _analyze(self):
+        """Group columns into segments (redone when rows were added since)"""
+        model = self.data_model
+        remaining = [column for _, _, column in MEASUREMENT_FIELDS]
+        # A key seen with both 0.0 and -0.0 would look dependent but encode wrongly
+        signed_zeros = {column for _, wire_type, column in MEASUREMENT_FIELDS
+                        if wire_type == WIRE_DOUBLE and _has_negative_zero(getattr(model, column))}
+        segments = []
+        for determinant in self.DETERMINANTS:
+            if determinant not in remaining:
+                continue  # Already folded into an earlier determinant's segment
+            keys = getattr(model, determinant)
+            remaining.remove(determinant)
+            distinct = len(set(keys))
+            dependents = [column for column in remaining if column not in signed_zeros
+                          and len(set(zip(keys, getattr(model, column)))) == distinct]
+            if not dependents:
+                remaining.insert(0, determinant)
+                continue
+            for column in dependents:
+                remaining.remove(column)
+            segments.append((determinant, self._segment_cache(determinant, dependents)))
+
+        segments.extend((column, self.field_caches[column]) for column in remaining)
+        self.segments = segments
+        self.analyzed_rows = model.measurement_count()
+
+    def _segment_cache(self, determinant: str, dependents: List[str]) -> _FieldCache:
+        """Determinant value -> encoded fields of the determinant and its dependents"""
+        model = self.data_model
+        keys = getattr(model, determinant)
+        lookups = [(self.field_caches[determinant], None)] + [
+            (self.field_caches[column], dict(zip(keys, getattr(model, column)))) for column in dependents
+        ]
+        return _FieldCache(lambda value: b''.join(
+            cache[value if values is None else values[value]] for cache, values in lookups
+        ))
+
+    def encode(self, rows: Iterable[int]) -> bytes:
+        """
+        Wire encoding of InternalQueryResponse.measurements holding the rows
+
+        Args:
+            rows: Row indices, in result order
+
+        Returns:
+            Bytes that parse as an InternalQueryResponse with just those measurements
+        """
+        rows = list(rows)
+        if not rows:
+            return b''
+        with self.lock:
+            if self.analyzed_rows != self.data_model.measurement_count():
+                self._analyze()
+            segments = self.segments
+
+        gather = itemgetter(*rows) if len(rows) > 1 else (lambda column: (column[rows[0]],))
+        columns = [map(cache.__getitem__, gather(getattr(self.data_model, column)))
+                   for column, cache in segments]
+        bodies = list(map(b''.join, zip(*columns)))
+        parts = [b''] * (2 * len(bodies))
+        parts[0::2] = map(self.length_prefixes.__getitem__, map(len, bodies))
+        parts[1::2] = bodies
+        return b''.join(parts)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Client-side wrapper for calls to one neighbor server
+Bundles the pooled channel, circuit breaker, an adaptive per-call deadline
+derived from the neighbor's observed latency percentiles, and budgeted retries
+"""
+
+import time
+from typing import Dict, Optional
+
+import grpc
+
+import fire_service_pb2_grpc
+from channel_pool import ChannelPool
+from circuit_breaker import CircuitBreaker, CircuitState
+from latency_histogram import LatencyHistogram
+from retry_policy import RetryPolicy
+
+
+class NeighborClient:
+    """
+    Wrapper around the FireQueryService stub for a single neighbor
+
+    Every InternalQuery gets a deadline of percentile(latency) * multiplier,
+    clamped to [floor, ceiling]. Latency is tracked per query class (query
+    type plus limit / filtered / full scan), so a run of cheap LIMIT queries
+    does not shrink the deadline of a full scan. Until min_samples calls of a
+    class have been observed the initial timeout is used. Each call (with its retries) runs through the
+    neighbor's circuit breaker once, so deadline expiries on stuck workers
+    count as failures there. InternalQuery is read-only, so failed attempts
+    are retried per the retry policy.
+    """
+
+    def __init__(self, neighbor_id: str, address: str, channel_pool: ChannelPool,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 timeout_config: Optional[dict] = None,
+                 retry_policy: Optional[RetryPolicy] = None, name: str = "unknown"):
+        """
+        Initialize neighbor client
+
+        Args:
+            neighbor_id: ID of the neighbor process
+            address: Neighbor address in "host:port" form
+            channel_pool: Pool providing the shared channel
+            circuit_breaker: Breaker protecting calls to this neighbor (optional)
+            timeout_config: 'adaptive_timeouts' config section (optional)
+            retry_policy: Policy (with shared per-process budget) for retrying InternalQuery (optional)
+            name: Name identifier for logging (default: "unknown")
+        """
+        self.neighbor_id = neighbor_id
+        self.address = address
+        self.channel_pool = channel_pool
+        self.circuit_breaker = circuit_breaker
+        self.retry_policy = retry_policy
+        self.name = name
+
+        timeout_config = timeout_config or {}
+        self.adaptive = timeout_config.get('enabled', True)
+        self.percentile = timeout_config.get('percentile', 99.0)
+        self.multiplier = timeout_config.get('multiplier', 2.0)
+        self.floor = timeout_config.get('floor_seconds', 1.0)
+        self.ceiling = timeout_config.get('ceiling_seconds', 60.0)
+        self.min_samples = timeout_config.get('min_samples', 10)
+        self.initial_timeout = timeout_config.get('initial_timeout_seconds', self.ceiling)
+
+        self.latencies: Dict[str, LatencyHistogram] = {}
+        self.timeouts = 0
+        self.retries = 0
+
+    @property
+    def stub(self) -> fire_service_pb2_grpc.FireQueryServiceStub:
+        """Stub bound to the pooled channel for this neighbor"""
+        return fire_service_pb2_grpc.FireQueryServiceStub(self.channel_pool.get_channel(self.address))
+
+    @staticmethod
+    def query_class(request) -> str:
+        """
+        Get the latency class of a request
+
+        Args:
+            request: InternalQueryRequest to classify
+
+        Returns:
+            "<query_type>/<limit|filtered|full>"
+        """
+        if request.limit > 0:
+            scope = "limit"
+        elif request.filter.ByteSize() > 0:
+            scope = "filtered"
+        else:
+            scope = "full"
+        return f"{request.query_type or 'filter'}/{scope}"
+
+    def _latency(self, query_class: str) -> LatencyHistogram:
+        """Get (creating on first use) the histogram of a query class"""
+        return self.latencies.setdefault(query_class, LatencyHistogram())
+
+    def current_timeout(self, query_class: str) -> Optional[float]:
+        """
+        Get the deadline to use for the next call of a query class
+
+        Args:
+            query_class: Class from query_class()
+
+        Returns:
+            Timeout in seconds, or None when adaptive timeouts are disabled
+        """
+        if not self.adaptive:
+            return None
+        latency = self.latencies.get(query_class)
+        if latency is None or latency.count() < self.min_samples:
+            return self.initial_timeout
+        observed = latency.percentile(self.percentile)
+        return min(max(observed * self.multiplier, self.floor), self.ceiling)
+
+    def internal_query(self, request):
+        """
+        Send InternalQuery to the neighbor, retrying transient failures
+
+        The whole call, retries included, goes through the circuit breaker
+        once, so a transient failure that a retry absorbs does not count
+        against the neighbor. Each attempt gets a fresh adaptive deadline.
+        Retries stop when the policy's attempts or the shared retry budget
+        are exhausted, or when the circuit opens (other calls failing).
+
+        Args:
+            request: InternalQueryRequest to send
+
+        Returns:
+            InternalQueryResponse from the neighbor
+
+        Raises:
+            CircuitBreakerOpenError: If the neighbor's circuit is OPEN
+            grpc.RpcError: If the last attempt fails (including DEADLINE_EXCEEDED)
+        """
+        def attempts():
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    return self._internal_query_once(request)
+                except grpc.RpcError as e:
+                    if self.retry_policy is None or not self.retry_policy.should_retry(e, attempt):
+                        raise
+                    if self.circuit_breaker is not None and self.circuit_breaker.state == CircuitState.OPEN:
+                        print(f"[NeighborClient-{self.name}] {self.neighbor_id} failed with {e.code()}, "
+                              f"circuit opened meanwhile, not retrying")
+                        raise
+                    backoff = self.retry_policy.backoff(attempt)
+                    self.retries += 1
+                    print(f"[NeighborClient-{self.name}] {self.neighbor_id} failed with {e.code()}, "
+                          f"retry {attempt}/{self.retry_policy.max_attempts - 1} in {backoff * 1000:.0f}ms")
+                    time.sleep(backoff)
+
+        if self.circuit_breaker is not None:
+            response = self.circuit_breaker.call(attempts)
+        else:
+            response = attempts()
+        if self.retry_policy is not None:
+            self.retry_policy.record_success()
+        return response
+
+    def _internal_query_once(self, request):
+        """
+        Make a single InternalQuery attempt with an adaptive deadline
+
+        Args:
+            request: InternalQueryRequest to send
+
+        Returns:
+            InternalQueryResponse from the neighbor
+        """
+        query_class = self.query_class(request)
+        latency = self._latency(query_class)
+        timeout = self.current_timeout(query_class)
+
+        start_time = time.time()
+        try:
+            response = self.stub.InternalQuery(request, timeout=timeout)
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.DEADLINE_EXCEEDED:
+                # Censored sample: the call took at least the deadline. Recording
+                # it lets the deadline grow if legitimate scans got slower.
+                self.timeouts += 1
+                latency.record(time.time() - start_time)
+                print(f"[NeighborClient-{self.name}] {self.neighbor_id} exceeded {query_class} deadline of {timeout:.2f}s")
+            raise
+
+        latency.record(time.time() - start_time)
+        return response
+
+    def watch_health(self, request):
+        """
+        Open a WatchHealth stream to the neighbor
+
+        Args:
+            request: HealthRequest describing the heartbeat interval
+
+        Returns:
+            Response iterator (call object with cancel())
+        """
+        return self.stub.WatchHealth(request)
+
+    def assign_partitions(self, request, timeout: float):
+        """
+        Send one phase of a partition reassignment to the neighbor
+
+        Control calls bypass the circuit breaker and retries: the coordinator
+        aborts the whole reassignment if any process cannot be reached.
+
+        Args:
+            request: PartitionChangeRequest with epoch and phase set
+            timeout: Deadline in seconds (prepare loads data, so it needs more than queries)
+
+        Returns:
+            PartitionChangeResponse for the neighbor's subtree
+        """
+        return self.stub.AssignPartitions(request, timeout=timeout)
+
+    def get_stats(self) -> dict:
+        """
+        Get client statistics
+
+        Returns:
+            Dictionary with per-class latency percentiles and current timeouts,
+            timeout and retry counts
+        """
+        classes = {}
+        for query_class, latency in list(self.latencies.items()):
+            classes[query_class] = latency.get_stats()
+            classes[query_class]['current_timeout'] = self.current_timeout(query_class)
+        return {
+            'query_classes': classes,
+            'timeouts': self.timeouts,
+            'retries': self.retries
+        }
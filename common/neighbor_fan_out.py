@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Fan-out of internal queries to neighbor processes
+Owns everything a process needs to call its query-enabled neighbors (pooled
+channels, health monitoring, circuit breakers, retry budget, adaptive
+deadlines) and merges their responses into a result buffer, so the gateway
+and team leaders share one implementation
+"""
+
+import time
+from typing import Dict, List, Optional
+
+import grpc
+
+import fire_service_pb2
+from channel_pool import ChannelPool
+from circuit_breaker import DEFAULT_FAILURE_CODES, CircuitBreaker, CircuitBreakerOpenError
+from health_monitor import HealthMonitor
+from neighbor_client import NeighborClient
+from partition_handoff import partitions_match
+from retry_policy import RetryBudget, RetryPolicy
+
+
+def query_neighbors(config: dict) -> List[dict]:
+    """Neighbors of a process config that receive queries (not control-only links)"""
+    return [n for n in config.get('neighbors', []) if n.get('query_enabled', True)]
+
+
+class NeighborFanOut:
+    """
+    Sends InternalQuery to each query-enabled neighbor in config order
+
+    Applies LIMIT pushdown (later neighbors are asked only for the rows still
+    missing, and skipped once the limit is reached, unless the query is
+    sorted), skips neighbors whose circuit is open or whose health stream
+    reports them UNAVAILABLE, and records every call
+    in the query profile. A neighbor that cannot be reached is reported as
+    unavailable instead of failing the query. Links can be opened and closed
+    at runtime (partition reassignment); given the routing table of the
+    query's assignment version, only neighbors that may hold matching rows
+    are called.
+    """
+
+    def __init__(self, process_id: str, config: dict, neighbor_label: str = "neighbor"):
+        """
+        Initialize fan-out from a process config
+
+        Args:
+            process_id: Process ID for logging
+            config: Process config (neighbors, health_monitoring, circuit_breakers,
+                retry and adaptive_timeouts sections)
+            neighbor_label: How neighbors are named in logs (e.g. "Team Leader")
+        """
+        self.process_id = process_id
+        self.neighbor_label = neighbor_label
+        self.neighbors = query_neighbors(config)
+
+        # Long-lived channels to neighbors (shared by queries and health streams)
+        self.channel_pool = ChannelPool(name=process_id)
+
+        # Health monitor fed by WatchHealth streams
+        health_config = config.get('health_monitoring', {})
+        health_check_interval = health_config.get('interval_seconds', 5.0)
+        self.heartbeat_interval = health_config.get('heartbeat_interval_seconds', 0.25)
+        heartbeat_timeout = health_config.get('heartbeat_timeout_seconds', 0.75)
+        self.health_monitor = HealthMonitor(
+            process_id, health_check_interval, heartbeat_timeout,
+            failure_threshold=health_config.get('failure_threshold', 3),
+            detection_budget=health_config.get('detection_budget_seconds', 1.0)
+        )
+
+        # One circuit breaker and client per neighbor (links can be added at runtime)
+        self.cb_config = config.get('circuit_breakers', {})
+        self.timeout_config = config.get('adaptive_timeouts', {})
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {}
+        self.neighbor_clients: Dict[str, NeighborClient] = {}
+        self.monitoring = False
+
+        # Per-process retry budget shared by all neighbors (InternalQuery is read-only)
+        retry_config = config.get('retry', {})
+        self.retry_budget = RetryBudget(
+            ratio=retry_config.get('budget_ratio', 0.1),
+            max_tokens=retry_config.get('budget_max_tokens', 10.0),
+            min_retries_per_second=retry_config.get('budget_min_retries_per_second', 1.0),
+            name=process_id
+        )
+        self.retry_policy = RetryPolicy(
+            max_attempts=retry_config.get('max_attempts', 3),
+            initial_backoff=retry_config.get('initial_backoff_seconds', 0.05),
+            max_backoff=retry_config.get('max_backoff_seconds', 1.0),
+            backoff_multiplier=retry_config.get('backoff_multiplier', 2.0),
+            retryable_codes=retry_config.get('retryable_status_codes', ["UNAVAILABLE"]),
+            budget=self.retry_budget
+        )
+
+        for neighbor in self.neighbors:
+            self._connect(neighbor)
+
+        skipped = [n['process_id'] for n in config.get('neighbors', []) if not n.get('query_enabled', True)]
+        print(f"[{process_id}] Fan-out to {[n['process_id'] for n in self.neighbors]}"
+              f"{f' (control-only links: {skipped})' if skipped else ''}")
+
+    def _connect(self, neighbor: dict):
+        """Create the circuit breaker and client of a neighbor (pooled channel + adaptive deadline + retries)"""
+        neighbor_id = neighbor['process_id']
+        cb_config = self.cb_config
+        self.circuit_breakers[neighbor_id] = CircuitBreaker(
+            failure_threshold=cb_config.get('failure_threshold', 3),
+            open_timeout=cb_config.get('open_timeout_seconds', 30.0),
+            success_threshold=cb_config.get('success_threshold', 1),
+            name=f"{self.process_id}->{neighbor_id}",
+            window_size=cb_config.get('window_size', 20),
+            minimum_calls=cb_config.get('minimum_calls', 10),
+            failure_rate_threshold=cb_config.get('failure_rate_threshold', 0.5),
+            slow_call_duration=cb_config.get('slow_call_duration_seconds', 5.0),
+            slow_call_rate_threshold=cb_config.get('slow_call_rate_threshold', 0.5),
+            failure_codes=cb_config.get('failure_codes', DEFAULT_FAILURE_CODES)
+        )
+        self.neighbor_clients[neighbor_id] = NeighborClient(
+            neighbor_id,
+            f"{neighbor['hostname']}:{neighbor['port']}",
+            self.channel_pool,
+            circuit_breaker=self.circuit_breakers[neighbor_id],
+            timeout_config=self.timeout_config,
+            retry_policy=self.retry_policy,
+            name=f"{self.process_id}->{neighbor_id}"
+        )
+        self.health_monitor.register_neighbor(neighbor_id)
+
+    def start_health_monitoring(self):
+        """Start WatchHealth streams to all query-enabled neighbors over pooled channels"""
+        self.monitoring = True
+        for neighbor in self.neighbors:
+            self._watch(neighbor['process_id'])
+
+        print(f"[{self.process_id}] Background health monitoring started")
+
+    def _watch(self, neighbor_id: str):
+        """Start the WatchHealth stream of one neighbor"""
+        heartbeat_ms = int(self.heartbeat_interval * 1000)
+        client = self.neighbor_clients[neighbor_id]
+
+        def open_stream():
+            health_request = fire_service_pb2.HealthRequest(
+                requester_id=self.process_id,
+                timestamp=int(time.time()),
+                heartbeat_interval_ms=heartbeat_ms
+            )
+            return client.watch_health(health_request)
+
+        self.health_monitor.start_watching(neighbor_id, open_stream)
+
+    def add_link(self, neighbor: dict) -> bool:
+        """
+        Open a link to a neighbor at runtime
+
+        Args:
+            neighbor: Neighbor entry as in the config (process_id, hostname, port)
+
+        Returns:
+            False if the link was already open
+        """
+        neighbor_id = neighbor['process_id']
+        if any(n['process_id'] == neighbor_id for n in self.neighbors):
+            return False
+        self._connect(neighbor)
+        if self.monitoring:
+            self._watch(neighbor_id)
+        # Replace the list so concurrent queries keep iterating over their own snapshot
+        self.neighbors = self.neighbors + [neighbor]
+        print(f"[{self.process_id}] Opened link to {neighbor_id} at {neighbor['hostname']}:{neighbor['port']}")
+        return True
+
+    def remove_link(self, neighbor_id: str):
+        """Close the link to a neighbor (queries stop fanning out to it)"""
+        self.neighbors = [n for n in self.neighbors if n['process_id'] != neighbor_id]
+        self.health_monitor.stop_watching(neighbor_id)
+        self.neighbor_clients.pop(neighbor_id, None)
+        self.circuit_breakers.pop(neighbor_id, None)
+        print(f"[{self.process_id}] Closed link to {neighbor_id}")
+
+    def assign_partitions(self, neighbor_id: str, request, timeout: float):
+        """Send one reassignment phase to a linked neighbor (see NeighborClient.assign_partitions)"""
+        return self.neighbor_clients[neighbor_id].assign_partitions(request, timeout)
+
+    def forward(self, request, results, profiler, routes: Optional[Dict[str, List[str]]] = None) -> List[str]:
+        """
+        Send an internal query to every neighbor and merge the responses
+
+        Args:
+            request: InternalQueryRequest to forward
+            results: Result buffer, SketchAggregator or SummaryAccumulator (add_response())
+            profiler: QueryProfiler recording each neighbor's call (and its profile)
+            routes: Partitions behind each neighbor at the request's assignment version
+                (None: every open link); neighbors without a partition in the
+                filter's time range are not queried
+
+        Returns:
+            Processes whose data is missing because they or their downstream
+            processes could not be reached
+        """
+        unavailable_processes = []
+
+        neighbors = self.neighbors
+        if routes is not None:
+            links = {n['process_id']: n for n in neighbors}
+            neighbors = [links[neighbor_id] for neighbor_id in routes if neighbor_id in links]
+
+        for neighbor in neighbors:
+            neighbor_id = neighbor['process_id']
+            neighbor_address = f"{neighbor['hostname']}:{neighbor['port']}"
+
+            # Partition routing: only neighbors holding days the filter can match
+            if routes is not None and not partitions_match(routes[neighbor_id], request.filter):
+                print(f"[{self.process_id}] No partitions behind {neighbor_id} match the time range, not querying it")
+                profiler.add_missing_child(neighbor_id, "pruned")
+                continue
+
+            # LIMIT pushdown: ask only for the rows still missing, skip neighbors once satisfied
+            # (sorted queries need the top `limit` rows from every neighbor instead)
+            neighbor_request = request
+            if request.limit > 0 and not request.order_by:
+                remaining = request.limit - len(results)
+                if remaining <= 0:
+                    print(f"[{self.process_id}] Limit {request.limit} reached, not querying {neighbor_id}")
+                    profiler.add_missing_child(neighbor_id, "skipped")
+                    continue
+                neighbor_request = fire_service_pb2.InternalQueryRequest()
+                neighbor_request.CopyFrom(request)
+                neighbor_request.limit = remaining
+
+            # Health monitor already saw the neighbor go down: don't wait out a deadline on it
+            if self.health_monitor.is_known_unavailable(neighbor_id):
+                print(f"[{self.process_id}] ⏭️ {neighbor_id} is UNAVAILABLE per health monitor, skipping call")
+                unavailable_processes.append(neighbor_id)
+                profiler.add_missing_child(neighbor_id, "unhealthy")
+                continue
+
+            print(f"[{self.process_id}] 📤 Forwarding query to {self.neighbor_label} {neighbor_id} at {neighbor_address}")
+
+            # Check circuit breaker state before attempting call
+            circuit_breaker = self.circuit_breakers[neighbor_id]
+            if circuit_breaker.get_state().value == "open":
+                stats = circuit_breaker.get_stats()
+                time_since_failure = stats.get('time_since_last_failure', 0)
+                print(f"[{self.process_id}] ⏭️ Circuit breaker OPEN for {neighbor_id}, skipping call "
+                      f"(fail-fast, reason={stats.get('open_reason')})")
+                if time_since_failure:
+                    print(f"[{self.process_id}]    Circuit opened {time_since_failure:.1f}s ago "
+                          f"(needs {circuit_breaker.open_timeout}s to recover)")
+                unavailable_processes.append(neighbor_id)
+                profiler.add_missing_child(neighbor_id, "circuit_open")
+                continue
+
+            start_time = time.time()
+            try:
+                # Circuit breaker + adaptive deadline are applied by the neighbor client
+                response = self.neighbor_clients[neighbor_id].internal_query(neighbor_request)
+                elapsed = time.time() - start_time
+
+                # Collect measurements
+                with profiler.stage('merge'):
+                    results.add_response(response)
+                if response.HasField('profile'):
+                    profiler.add_child(response.profile, elapsed * 1000)
+                unavailable_processes.extend(response.unavailable_processes)
+                print(f"[{self.process_id}] ✅ Received {len(response.measurements)} measurements "
+                      f"from {neighbor_id} in {elapsed:.2f}s")
+
+            except CircuitBreakerOpenError:
+                # Circuit is OPEN - fail fast, skip call
+                unavailable_processes.append(neighbor_id)
+                profiler.add_missing_child(neighbor_id, "circuit_open")
+                print(f"[{self.process_id}] ⏭️ Circuit breaker OPEN for {neighbor_id}, skipping call (fail-fast)")
+            except grpc.RpcError as e:
+                # gRPC error - circuit breaker records failure automatically
+                unavailable_processes.append(neighbor_id)
+                profiler.add_missing_child(neighbor_id, "unavailable", (time.time() - start_time) * 1000)
+                error_code = e.code()
+                failure_count = circuit_breaker.get_stats().get('failure_count', 0)
+                print(f"[{self.process_id}] ❌ Error contacting {neighbor_id}: {error_code}: {e.details()}")
+                print(f"[{self.process_id}]    Circuit breaker {neighbor_id} failure count: "
+                      f"{failure_count}/{circuit_breaker.failure_threshold}")
+                if error_code == grpc.StatusCode.DEADLINE_EXCEEDED:
+                    print(f"[{self.process_id}] ⚠️ TIMEOUT for {neighbor_id} - this slows {self.process_id}'s own response")
+                elif error_code == grpc.StatusCode.UNAVAILABLE:
+                    print(f"[{self.process_id}] ⚠️ UNAVAILABLE for {neighbor_id} - server may be down")
+            except Exception as e:
+                # Other errors - circuit breaker records failure automatically
+                unavailable_processes.append(neighbor_id)
+                profiler.add_missing_child(neighbor_id, "unavailable", (time.time() - start_time) * 1000)
+                print(f"[{self.process_id}] ❌ Unexpected error contacting {neighbor_id}: {type(e).__name__}: {e}")
+
+        return unavailable_processes
+
+    def get_stats(self) -> dict:
+        """
+        Get fan-out statistics
+
+        Returns:
+            Dictionary with the retry budget, circuit breakers and per-neighbor client stats
+        """
+        return {
+            'retry_budget': self.retry_budget.get_stats(),
+            'circuit_breakers': {nid: cb.get_stats() for nid, cb in list(self.circuit_breakers.items())},
+            'neighbors': {nid: client.get_stats() for nid, client in list(self.neighbor_clients.items())}
+        }
+
+    def close(self):
+        """Stop health monitoring and close the pooled channels"""
+        self.health_monitor.stop_monitoring()
+        self.channel_pool.close()
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+Partition handoff between processes
+Versions each process's partition assignment by epoch so day directories can
+be moved (or a hot day split by file) between running processes: the
+gateway prepares a reassignment everywhere (new partition sets loaded beside
+the ones in use, new links opened), then commits it. Queries carry the epoch
+they were planned at, so every process answers a query from the same
+assignment and no partition is scanned twice or missed while it moves.
+"""
+
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+import grpc
+
+import fire_service_pb2
+
+# Partition list entry of a process that serves its whole data directory
+ALL_PARTITIONS = '*'
+
+
+class PartitionChangeError(Exception):
+    """A partition move cannot be applied to a process's partitions"""
+
+
+def partition_prefix(partition: str) -> Optional[str]:
+    """
+    Datetime prefix shared by all rows of a partition
+
+    "20200816" -> "2020-08-16", "20200816/20200816-01.csv" -> "2020-08-16T01";
+    None when the name does not encode a date (rows may have any datetime)
+    """
+    day, _, file_name = partition.partition('/')
+    if len(day) != 8 or not day.isdigit():
+        return None
+    prefix = f"{day[:4]}-{day[4:6]}-{day[6:]}"
+    hour = os.path.splitext(file_name)[0].rpartition('-')[2]
+    if file_name and len(hour) == 2 and hour.isdigit():
+        prefix += f"T{hour}"
+    return prefix
+
+
+def partitions_match(partitions: List[str], query_filter) -> bool:
+    """Whether any of the partitions can hold rows in the filter's datetime range"""
+    low, high = query_filter.min_datetime, query_filter.max_datetime
+    if not low and not high:
+        return True
+    for partition in partitions:
+        prefix = partition_prefix(partition)
+        if prefix is None:
+            return True
+        # Datetimes compare as strings; every row of the partition starts with the prefix
+        if (not high or prefix <= high) and (not low or low <= prefix + '\uffff'):
+            return True
+    return False
+
+
+def _day_files(data_dir: str, day: str) -> List[str]:
+    """Partition entries of the CSV files of a day directory ("<day>/<file>")"""
+    day_path = os.path.join(data_dir, day)
+    if not os.path.isdir(day_path):
+        raise PartitionChangeError(f"no data directory {day}")
+    return [f"{day}/{name}" for name in sorted(os.listdir(day_path)) if name.endswith('.csv')]
+
+
+def apply_moves(process_id: str, partitions: Optional[List[str]], moves, data_dir: str) -> Optional[List[str]]:
+    """
+    Partitions of a process after a set of moves
+
+    Args:
+        process_id: Process whose partitions change
+        partitions: Its current partitions (None: whole data directory)
+        moves: PartitionMove messages (moves between other processes are ignored)
+        data_dir: Data directory (to list the files of a day being split)
+
+    Returns:
+        New partition list (the same partitions if no move involves the process)
+
+    Raises:
+        PartitionChangeError: Giving away a partition the process does not
+            serve, receiving one it already serves (in full or in part), or
+            moving partitions of a process without partitioning
+    """
+    involved = [m for m in moves if process_id in (m.from_process, m.to_process)]
+    if not involved:
+        return partitions
+    if partitions is None or ALL_PARTITIONS in partitions:
+        raise PartitionChangeError(f"{process_id} serves its whole data directory (partitioning disabled)")
+
+    result = list(partitions)
+    for move in involved:
+        partition = move.partition.strip('/')
+        day = partition.split('/')[0]
+        if move.from_process == process_id:
+            if partition in result:
+                result.remove(partition)
+            elif day in result and partition != day:
+                # Split: keep the day's other files
+                files = _day_files(data_dir, day)
+                if partition not in files:
+                    raise PartitionChangeError(f"no file {partition}")
+                result.remove(day)
+                result.extend(f for f in files if f != partition)
+            else:
+                raise PartitionChangeError(f"{process_id} does not serve {partition}")
+        else:
+            if day in result or partition in result or (
+                    partition == day and any(p.startswith(day + '/') for p in result)):
+                raise PartitionChangeError(f"{process_id} already serves (part of) {partition}")
+            if partition != day and partition not in _day_files(data_dir, day):
+                raise PartitionChangeError(f"no file {partition}")
+            if not os.path.isdir(os.path.join(data_dir, day)):
+                raise PartitionChangeError(f"no data directory {day}")
+            result.append(partition)
+
+    # Merge the files of a day back into the day once all of them are here again
+    for day in sorted({p.split('/')[0] for p in result if '/' in p}):
+        held = [p for p in result if p.startswith(day + '/')]
+        if sorted(held) == _day_files(data_dir, day):
+            result = [p for p in result if not p.startswith(day + '/')] + [day]
+    return sorted(result)
+
+
+def find_conflicts(assignments) -> List[str]:
+    """
+    Partitions assigned to more than one process
+
+    Args:
+        assignments: PartitionAssignment messages (one per process)
+
+    Returns:
+        Descriptions of overlapping partitions (empty if the assignment is disjoint)
+    """
+    owners: Dict[str, List[str]] = {}
+    for assignment in {a.process_id: a for a in assignments}.values():
+        for partition in assignment.partitions:
+            if partition != ALL_PARTITIONS:
+                owners.setdefault(partition, []).append(assignment.process_id)
+
+    conflicts = []
+    for partition, processes in sorted(owners.items()):
+        holders = set(processes)
+        day = partition.split('/')[0]
+        if partition != day:
+            holders.update(owners.get(day, []))  # the whole day is also somewhere
+        if len(holders) > 1:
+            conflicts.append(f"{partition} ({' and '.join(sorted(holders))})")
+    return conflicts
+
+
+class PartitionVersion:
+    """What a process serves at one assignment epoch"""
+
+    def __init__(self, epoch: int, scan, routes: Optional[Dict[str, List[str]]] = None):
+        self.epoch = epoch
+        self.scan = scan
+        # neighbor_id -> partitions behind it (None: unknown, query every open link)
+        self.routes = routes
+        self.committed = False
+        self.added_links: List[str] = []
+        self.removed_links: List[str] = []
+
+    @property
+    def partitions(self) -> Optional[List[str]]:
+        """Local partitions (None when the process holds no data, e.g. the gateway)"""
+        if self.scan is None:
+            return None
+        return self.scan.partitions if self.scan.partitions is not None else [ALL_PARTITIONS]
+
+
+class PartitionHandoff:
+    """
+    A process's assignment versions and its part in reassignments
+
+    Phases arrive from the gateway and are relayed to every open link:
+    describe reports the partitions of the subtree (and refreshes the
+    routing table), prepare loads the new partition set into a second local
+    scan beside the one in use and opens new links, commit makes the
+    version current and abort discards it. A query is answered from the
+    newest version at or before its epoch, so queries planned before the
+    commit finish on the old assignment everywhere; versions older than a
+    committed one are dropped, and links it removes are closed,
+    drain_seconds later. Assignments changed at runtime are not written back
+    to the config: a restarted process starts from its configured partitions.
+    """
+
+    def __init__(self, process_id: str, scan, fan_out, config: dict,
+                 scan_factory: Optional[Callable[[List[str]], object]] = None):
+        """
+        Initialize with the startup assignment as epoch 0
+
+        Args:
+            process_id: Process ID for logging
+            scan: Local scan loaded from the config (None for the gateway, which holds no data)
+            fan_out: NeighborFanOut to relay phases over (None for workers)
+            config: Process config (partition_handoff section)
+            scan_factory: Builds a local scan for a new partition list
+        """
+        self.process_id = process_id
+        self.fan_out = fan_out
+        self.scan_factory = scan_factory
+        self.data_dir = getattr(scan, 'data_dir', None)
+
+        handoff_config = config.get('partition_handoff', {})
+        self.drain_seconds = handoff_config.get('drain_seconds', 60.0)
+        self.prepare_timeout = handoff_config.get('prepare_timeout_seconds', 120.0)
+        self.control_timeout = handoff_config.get('control_timeout_seconds', 10.0)
+
+        self.lock = threading.Lock()
+        self.change_lock = threading.Lock()
+        initial = PartitionVersion(0, scan)
+        initial.committed = True
+        self.versions: Dict[int, PartitionVersion] = {0: initial}
+        self.committed_changes = 0
+        self.aborted_changes = 0
+
+    def current(self) -> PartitionVersion:
+        """Newest committed version (the one new queries are planned against)"""
+        with self.lock:
+            return self.versions[max(e for e, v in self.versions.items() if v.committed)]
+
+    def for_epoch(self, epoch: int) -> PartitionVersion:
+        """
+        Version to answer a query planned at an epoch
+
+        The newest version at or before the epoch, prepared ones included
+        (the gateway only hands out committed epochs, so a prepared version a
+        query asks for is committed even if its commit has not arrived yet);
+        the oldest retained version when older ones have drained.
+        """
+        with self.lock:
+            eligible = [e for e in self.versions if e <= epoch]
+            return self.versions[max(eligible) if eligible else min(self.versions)]
+
+    def handle(self, request):
+        """
+        Run one phase of a reassignment here and in the subtree
+
+        Args:
+            request: PartitionChangeRequest with phase (and epoch for prepare/commit/abort)
+
+        Returns:
+            PartitionChangeResponse for this process and everything behind it
+        """
+        phases = {
+            'describe': self._describe,
+            'prepare': self._prepare,
+            'commit': self._commit,
+            'abort': self._abort
+        }
+        if request.phase not in phases:
+            return fire_service_pb2.PartitionChangeResponse(
+                success=False, message=f"{self.process_id}: unknown phase '{request.phase}'")
+        with self.change_lock:
+            return phases[request.phase](request)
+
+    def coordinate(self, request):
+        """
+        Apply a client's reassignment to the whole tree (gateway)
+
+        Describes the current assignment, prepares the new one everywhere
+        and commits it only if every process prepared it and no partition
+        ends up on two processes; otherwise aborts it everywhere.
+
+        Args:
+            request: PartitionChangeRequest with moves and/or links (neither: only describe)
+
+        Returns:
+            PartitionChangeResponse with the (new) assignment of every process
+        """
+        describe = fire_service_pb2.PartitionChangeRequest(requesting_process=self.process_id, phase='describe')
+        current = self.handle(describe)
+        if not request.moves and not request.add_links and not request.remove_links:
+            return current
+
+        def rejected(message):
+            print(f"[{self.process_id}] ❌ Partition reassignment rejected: {message}")
+            current.success = False
+            current.message = message
+            return current
+
+        if current.unavailable_processes:
+            return rejected(f"cannot reach {', '.join(current.unavailable_processes)}")
+        processes = {a.process_id for a in current.assignments}
+        for link in request.add_links:
+            if not link.hostname or not link.port:
+                return rejected(f"link to {link.process_id} needs hostname and port")
+            if link.parent_process not in processes and link.parent_process != self.process_id:
+                return rejected(f"link to {link.process_id}: unknown process {link.parent_process}")
+        processes.update(link.process_id for link in request.add_links)
+        for move in request.moves:
+            if move.from_process == move.to_process:
+                return rejected(f"{move.partition}: source and destination are both {move.from_process}")
+            for process_id in (move.from_process, move.to_process):
+                if process_id not in processes:
+                    return rejected(f"{move.partition}: unknown process {process_id}")
+
+        change = fire_service_pb2.PartitionChangeRequest()
+        change.CopyFrom(request)
+        change.requesting_process = self.process_id
+        change.epoch = current.epoch + 1
+        print(f"[{self.process_id}] 🔀 Preparing partition assignment epoch {change.epoch}: "
+              f"{[f'{m.partition} {m.from_process}->{m.to_process}' for m in request.moves]}")
+        change.phase = 'prepare'
+        prepared = self.handle(change)
+
+        failure = prepared.message if not prepared.success else None
+        if prepared.unavailable_processes:
+            failure = f"cannot reach {', '.join(prepared.unavailable_processes)}"
+        if failure is None:
+            conflicts = find_conflicts(prepared.assignments)
+            removed = {link.process_id for link in request.remove_links}
+            still_serving = [a.process_id for a in prepared.assignments if a.process_id in removed and a.partitions]
+            if conflicts:
+                failure = f"partitions on two processes: {', '.join(conflicts)}"
+            elif still_serving:
+                failure = f"links to {', '.join(still_serving)} removed while they still serve partitions"
+        if failure is not None:
+            change.phase = 'abort'
+            self.handle(change)
+            print(f"[{self.process_id}] ❌ Aborted partition assignment epoch {change.epoch}")
+            return rejected(failure)
+
+        change.phase = 'commit'
+        committed = self.handle(change)
+        prepared.success = committed.success
+        prepared.message = committed.message
+        prepared.epoch = change.epoch
+        return prepared
+
+    def _describe(self, request):
+        """
+        Report the current assignment of the subtree and refresh the current version's routes
+        The response epoch is the newest one any process has seen, so the next change is newer
+        """
+        version = self.current()
+        with self.lock:
+            newest = max(self.versions)
+        response = fire_service_pb2.PartitionChangeResponse(epoch=newest, success=True)
+        self._add_assignment(response, version)
+        version.routes = self._relay(request, response, self.control_timeout)
+        return response
+
+    def _prepare(self, request):
+        """Load the new partition set and open new links, without serving them yet"""
+        response = fire_service_pb2.PartitionChangeResponse(epoch=request.epoch, success=True)
+        with self.lock:
+            newest = max(self.versions)
+            prepared = self.versions.get(request.epoch)
+        if prepared is not None and not prepared.committed:
+            # Reached again over another link: already prepared (and relayed)
+            self._add_assignment(response, prepared)
+            return response
+        if request.epoch <= newest:
+            response.success = False
+            response.message = f"{self.process_id}: epoch {request.epoch} is not newer than {newest}"
+            return response
+
+        current = self.current()
+        scan = current.scan
+        try:
+            if current.scan is not None:
+                partitions = apply_moves(self.process_id, current.scan.partitions, request.moves, self.data_dir)
+                if partitions != current.scan.partitions:
+                    if self.scan_factory is None:
+                        raise PartitionChangeError(f"{self.process_id} cannot load new partitions")
+                    print(f"[{self.process_id}] 📦 Loading partitions for epoch {request.epoch}: {partitions} "
+                          f"(still serving {current.scan.partitions})")
+                    scan = self.scan_factory(partitions)
+            elif any(self.process_id in (m.from_process, m.to_process) for m in request.moves):
+                raise PartitionChangeError(f"{self.process_id} holds no data")
+            links = [link for link in request.add_links if link.parent_process == self.process_id]
+            if links and self.fan_out is None:
+                raise PartitionChangeError(f"{self.process_id} has no neighbors to fan out to")
+        except (PartitionChangeError, OSError) as e:
+            response.success = False
+            response.message = f"{self.process_id}: {e}"
+            print(f"[{self.process_id}] ❌ Cannot prepare partition assignment epoch {request.epoch}: {e}")
+            return response
+
+        version = PartitionVersion(request.epoch, scan)
+        for link in links:
+            if self.fan_out.add_link({'process_id': link.process_id, 'hostname': link.hostname, 'port': link.port}):
+                version.added_links.append(link.process_id)
+        version.removed_links = [link.process_id for link in request.remove_links
+                                 if link.parent_process == self.process_id]
+        with self.lock:
+            self.versions[request.epoch] = version
+
+        self._add_assignment(response, version)
+        routes = self._relay(request, response, self.prepare_timeout)
+        version.routes = {nid: r for nid, r in routes.items() if nid not in version.removed_links}
+        return response
+
+    def _commit(self, request):
+        """Make a prepared version current; older versions drain before they are dropped"""
+        response = fire_service_pb2.PartitionChangeResponse(epoch=request.epoch, success=True)
+        with self.lock:
+            version = self.versions.get(request.epoch)
+        if version is None:
+            response.success = False
+            response.message = f"{self.process_id}: epoch {request.epoch} was not prepared"
+        self._relay(request, response, self.control_timeout)
+        if version is None:
+            return response
+
+        with self.lock:
+            version.committed = True
+            self.committed_changes += 1
+        self._add_assignment(response, version)
+        print(f"[{self.process_id}] ✅ Serving partition assignment epoch {request.epoch}"
+              f"{f': {version.partitions}' if version.partitions is not None else ''} "
+              f"(older epochs drain for {self.drain_seconds}s)")
+        timer = threading.Timer(self.drain_seconds, self._drain, args=(request.epoch,))
+        timer.daemon = True
+        timer.start()
+        return response
+
+    def _abort(self, request):
+        """Discard a prepared version and close the links it opened"""
+        response = fire_service_pb2.PartitionChangeResponse(epoch=request.epoch, success=True)
+        with self.lock:
+            version = self.versions.get(request.epoch)
+            if version is not None and not version.committed:
+                del self.versions[request.epoch]
+                self.aborted_changes += 1
+            else:
+                version = None
+        if version is not None:
+            for neighbor_id in version.added_links:
+                self.fan_out.remove_link(neighbor_id)
+            print(f"[{self.process_id}] Discarded partition assignment epoch {request.epoch}")
+        self._relay(request, response, self.control_timeout)
+        return response
+
+    def _drain(self, epoch: int):
+        """Drop versions older than a committed epoch and close the links it removed"""
+        with self.lock:
+            version = self.versions.get(epoch)
+            dropped = [e for e in self.versions if e < epoch]
+            for old_epoch in dropped:
+                del self.versions[old_epoch]
+        if version is None:
+            return
+        for neighbor_id in version.removed_links:
+            self.fan_out.remove_link(neighbor_id)
+        if dropped:
+            print(f"[{self.process_id}] Dropped partition assignment epochs {dropped} (drained)")
+
+    def _add_assignment(self, response, version: PartitionVersion):
+        """Add this process's partitions at a version to a response"""
+        if version.scan is None:
+            return
+        response.assignments.add(
+            process_id=self.process_id,
+            partitions=version.partitions,
+            epoch=version.epoch,
+            measurement_count=version.scan.measurement_count()
+        )
+
+    def _relay(self, request, response, timeout: float) -> Dict[str, List[str]]:
+        """
+        Send a phase to every open link and merge the subtree responses
+
+        Args:
+            request: PartitionChangeRequest to relay
+            response: This process's PartitionChangeResponse (updated in place)
+            timeout: Deadline per neighbor call
+
+        Returns:
+            Routing table: neighbor_id -> partitions behind it ("*" if unknown)
+        """
+        routes = {}
+        if self.fan_out is None:
+            return routes
+        relayed = fire_service_pb2.PartitionChangeRequest()
+        relayed.CopyFrom(request)
+        relayed.requesting_process = self.process_id
+
+        for neighbor in self.fan_out.neighbors:
+            neighbor_id = neighbor['process_id']
+            if request.phase == 'prepare' and not response.success:
+                break  # Will be aborted: do not load partitions elsewhere in vain
+            try:
+                child = self.fan_out.assign_partitions(neighbor_id, relayed, timeout)
+            except grpc.RpcError as e:
+                print(f"[{self.process_id}] ❌ {request.phase} of partition assignment failed at "
+                      f"{neighbor_id}: {e.code()}: {e.details()}")
+                response.success = False
+                response.message = response.message or f"{neighbor_id} unreachable"
+                response.unavailable_processes.append(neighbor_id)
+                routes[neighbor_id] = [ALL_PARTITIONS]
+                continue
+
+            response.assignments.extend(child.assignments)
+            response.unavailable_processes.extend(child.unavailable_processes)
+            response.epoch = max(response.epoch, child.epoch)
+            if not child.success:
+                response.success = False
+                response.message = response.message or child.message
+            # A subtree with unreachable processes may hold any partition
+            routes[neighbor_id] = ([ALL_PARTITIONS] if child.unavailable_processes
+                                   else [p for a in child.assignments for p in a.partitions])
+        return routes
+
+    def get_stats(self) -> dict:
+        """
+        Get assignment statistics
+
+        Returns:
+            Dictionary with the current epoch and every retained version
+            (partitions, routes, committed) plus change counters
+        """
+        with self.lock:
+            versions = sorted(self.versions.values(), key=lambda v: v.epoch)
+            return {
+                'epoch': max(v.epoch for v in versions if v.committed),
+                'versions': [{
+                    'epoch': v.epoch,
+                    'committed': v.committed,
+                    'partitions': v.partitions,
+                    'routes': v.routes
+                } for v in versions],
+                'committed_changes': self.committed_changes,
+                'aborted_changes': self.aborted_changes,
+                'drain_seconds': self.drain_seconds
+            }
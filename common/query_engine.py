@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Local query execution over a FireColumnModel
+Shared by the team leaders and workers, which all scan their own data partition
+"""
+
+import heapq
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import fire_service_pb2
+from fire_column_model import FireColumnModel
+from sketches import SKETCH_QUERY_TYPES
+from rollups import SummaryAccumulator, filter_aligned
+from query_planner import ColumnStatistics, QueryPlan, QueryPlanner
+from query_profile import QueryProfiler
+from measurement_encoder import MeasurementEncoder
+from row_cache import SerializedRowCache
+
+# Sortable fields (QueryRequest.order_by) -> FireColumnModel column
+SORT_COLUMNS = {
+    'datetime': 'datetimes',
+    'aqi': 'aqis',
+    'concentration': 'concentrations'
+}
+
+# Fields a top_k query may rank by (largest values first)
+TOP_K_FIELDS = ('aqi', 'concentration')
+
+# Fields each sketch query type may aggregate (aggregate_field) -> FireColumnModel column
+SKETCH_COLUMNS = {
+    'distinct_count': {
+        'site_name': 'site_names',
+        'aqs_code': 'aqs_codes',
+        'full_aqs_code': 'full_aqs_codes',
+        'agency_name': 'agency_names',
+        'parameter': 'parameters',
+        'datetime': 'datetimes'
+    },
+    'quantiles': {
+        'aqi': 'aqis',
+        'concentration': 'concentrations',
+        'raw_concentration': 'raw_concentrations'
+    }
+}
+
+
+class LocalQueryEngine:
+    """
+    Executes InternalQueryRequest filters against the local data model
+
+    Candidate rows come from the access path chosen by the QueryPlanner
+    (bitmap index, time/AQI range, spatial grid or full range); the remaining
+    predicates and proto conversion run in batches of
+    scan_batch_size rows. Between batches the optional checkpoint callback is
+    invoked, which is where lower-priority scans yield to more important work.
+    A request limit stops the scan as soon as enough rows have matched.
+
+    Sorted queries walk candidates in order_by order, using a per-column
+    sort index (row indices sorted by that column, built on first use since
+    the data is read-only after load), so a sorted LIMIT query still stops
+    early. Small candidate sets are simply sorted directly.
+
+    top_k queries keep a bounded min-heap of the k largest values instead,
+    so only k rows are ever converted to messages. Sketch queries
+    (distinct_count, quantiles) feed one column of the matching rows into a
+    mergeable sketch and never build messages at all. Summary queries are
+    answered from the data model's rollups when the filter aligns with the
+    hourly buckets, and from a scan of the matching rows otherwise.
+
+    Results are never constructed message by message: the rows are
+    batch-encoded from the columns (or, with the serialized row cache
+    enabled, joined from each row's cached FireMeasurement bytes) and parsed
+    in one call. execute_into() merges that encoding straight into a
+    response, skipping the copy from a message list.
+    """
+
+    def __init__(self, data_model: FireColumnModel, scan_batch_size: int = 2000, name: str = "unknown",
+                 histogram_buckets: int = 32, grid_cell_degrees: float = 1.0,
+                 cache_serialized_rows: bool = False, preload_serialized_rows: bool = False):
+        """
+        Initialize query engine
+
+        Args:
+            data_model: Loaded FireColumnModel for this process's partition
+            scan_batch_size: Candidate rows processed between checkpoints (default: 2000)
+            name: Name identifier for logging (default: "unknown")
+            histogram_buckets: Buckets of the planner's AQI/concentration histograms (default: 32)
+            grid_cell_degrees: Planner's spatial grid cell size in degrees (default: 1.0)
+            cache_serialized_rows: Cache each row's serialized FireMeasurement (default: False)
+            preload_serialized_rows: Build the whole cache now rather than on first use (default: False)
+        """
+        self.data_model = data_model
+        self.scan_batch_size = max(1, scan_batch_size)
+        self.name = name
+
+        self.sort_indexes: Dict[str, List[int]] = {}
+        self.lock = threading.Lock()
+
+        self.planner = QueryPlanner(
+            data_model, self._sort_index,
+            ColumnStatistics(data_model, histogram_buckets, grid_cell_degrees)
+        )
+
+        self.encoder = MeasurementEncoder(data_model)
+        self.row_cache: Optional[SerializedRowCache] = None
+        if cache_serialized_rows:
+            self.row_cache = SerializedRowCache(data_model.measurement_count, self._to_measurement)
+            if preload_serialized_rows:
+                cached_bytes = self.row_cache.preload()
+                print(f"[QueryEngine-{self.name}] Cached {data_model.measurement_count()} serialized rows "
+                      f"({cached_bytes / 1024:.0f} KiB)")
+
+    def _plan(self, request, profiler: QueryProfiler) -> QueryPlan:
+        """Choose the access path and predicate order for a request's filter"""
+        with profiler.stage('index_lookup'):
+            plan = self.planner.plan(request.filter)
+        profiler.record_plan(plan)
+        print(f"[QueryEngine-{self.name}] Plan: {plan.describe()}")
+        return plan
+
+    def _matching_rows(self, candidates: Iterable[int], matches: Callable[[int], bool],
+                       checkpoint: Optional[Callable[[], None]], profiler: QueryProfiler) -> Iterator[int]:
+        """
+        Yield the candidate rows that pass the predicates
+
+        Calls checkpoint before every scan batch after the first. Scan time
+        (excluding checkpoint pauses, including the caller's per-row work)
+        and rows examined are added to the profiler, also when the caller
+        stops early.
+        """
+        start = time.perf_counter()
+        paused_before = profiler.timings['preempted']
+        position = -1
+        try:
+            for position, idx in enumerate(candidates):
+                if checkpoint is not None and position > 0 and position % self.scan_batch_size == 0:
+                    with profiler.stage('preempted'):
+                        checkpoint()
+
+                if matches(idx):
+                    yield idx
+        finally:
+            profiler.rows_scanned += position + 1
+            paused = profiler.timings['preempted'] - paused_before
+            profiler.add('predicate_eval', (time.perf_counter() - start) * 1000 - paused)
+
+    def _sort_index(self, order_by: str) -> List[int]:
+        """Row indices in ascending order of a sortable column (built once per column)"""
+        with self.lock:
+            order = self.sort_indexes.get(order_by)
+            if order is None:
+                column = getattr(self.data_model, SORT_COLUMNS[order_by])
+                order = sorted(range(self.data_model.measurement_count()), key=column.__getitem__)
+                self.sort_indexes[order_by] = order
+                print(f"[QueryEngine-{self.name}] Built sort index on {order_by} ({len(order)} rows)")
+            return order
+
+    def _ordered(self, candidates: Sequence[int], order_by: str, descending: bool) -> Iterable[int]:
+        """
+        Arrange candidate rows in order_by order
+        Returns iterable of row indices (lazy when walking the sort index)
+        """
+        column = getattr(self.data_model, SORT_COLUMNS[order_by])
+        if len(candidates) < self.data_model.measurement_count() // 8:
+            # Small selection: sorting it is cheaper than walking the whole index
+            return sorted(candidates, key=column.__getitem__, reverse=descending)
+
+        order = self._sort_index(order_by)
+        if descending:
+            order = reversed(order)
+        if isinstance(candidates, range):
+            return order
+        members = set(candidates)
+        return (idx for idx in order if idx in members)
+
+    def _to_measurement(self, idx: int):
+        """Build the FireMeasurement proto for one row"""
+        return fire_service_pb2.FireMeasurement(
+            latitude=self.data_model.latitudes[idx],
+            longitude=self.data_model.longitudes[idx],
+            datetime=self.data_model.datetimes[idx],
+            parameter=self.data_model.parameters[idx],
+            concentration=self.data_model.concentrations[idx],
+            unit=self.data_model.units[idx],
+            raw_concentration=self.data_model.raw_concentrations[idx],
+            aqi=self.data_model.aqis[idx],
+            category=self.data_model.categories[idx],
+            site_name=self.data_model.site_names[idx],
+            agency_name=self.data_model.agency_names[idx],
+            aqs_code=self.data_model.aqs_codes[idx],
+            full_aqs_code=self.data_model.full_aqs_codes[idx]
+        )
+
+    def _encode(self, rows: Sequence[int]) -> bytes:
+        """
+        Wire encoding of InternalQueryResponse.measurements for rows
+        (from the serialized row cache if enabled, else batch-encoded from the columns)
+        """
+        if self.row_cache is not None:
+            return self.row_cache.encode(rows)
+        return self.encoder.encode(rows)
+
+    def _to_measurements(self, rows: Sequence[int]):
+        """
+        Build the FireMeasurement protos for rows, parsed from their encoding in one call
+        Returns list-like sequence of FireMeasurement messages in the order of rows
+        """
+        holder = fire_service_pb2.InternalQueryResponse()
+        holder.MergeFromString(self._encode(rows))
+        return holder.measurements
+
+    def execute(self, request, checkpoint: Optional[Callable[[], None]] = None,
+                profiler: Optional[QueryProfiler] = None):
+        """
+        Run a query against the local data
+
+        Args:
+            request: InternalQueryRequest (uses its filter, limit and order_by)
+            checkpoint: Called before every scan batch after the first (optional)
+            profiler: Receives the plan, stage timings and row counts (optional)
+
+        Returns:
+            List-like sequence of FireMeasurement proto messages (sorted if order_by is set)
+        """
+        profiler = profiler if profiler is not None else QueryProfiler(self.name)
+        rows = self._result_rows(request, checkpoint, profiler)
+
+        with profiler.stage('proto_build'):
+            measurements = self._to_measurements(rows)
+        profiler.rows_returned += len(measurements)
+        return measurements
+
+    def execute_into(self, response, request, checkpoint: Optional[Callable[[], None]] = None,
+                     profiler: Optional[QueryProfiler] = None) -> int:
+        """
+        Run a query and add the results straight to an InternalQueryResponse
+
+        Same as execute(), but the encoded rows are merged into the response
+        in one step instead of being built as messages and copied into it.
+
+        Args:
+            response: InternalQueryResponse to add the measurements to
+            request: InternalQueryRequest (uses its filter, limit and order_by)
+            checkpoint: Called before every scan batch after the first (optional)
+            profiler: Receives the plan, stage timings and row counts (optional)
+
+        Returns:
+            Number of measurements added
+        """
+        profiler = profiler if profiler is not None else QueryProfiler(self.name)
+        rows = self._result_rows(request, checkpoint, profiler)
+
+        with profiler.stage('proto_build'):
+            response.MergeFromString(self._encode(rows))
+        profiler.rows_returned += len(rows)
+        return len(rows)
+
+    def _result_rows(self, request, checkpoint: Optional[Callable[[], None]],
+                     profiler: QueryProfiler) -> List[int]:
+        """
+        Plan and scan a query
+        Returns list of matching row indices in result order
+        """
+        plan = self._plan(request, profiler)
+        matching_indices = plan.candidates
+
+        if request.query_type == 'top_k':
+            return self._top_k(request, plan, checkpoint, profiler)
+
+        if request.order_by:
+            with profiler.stage('index_lookup'):
+                matching_indices = self._ordered(matching_indices, request.order_by, request.order_descending)
+        limit = request.limit if request.limit > 0 else None
+
+        matched = []
+        for idx in self._matching_rows(matching_indices, plan.matches, checkpoint, profiler):
+            matched.append(idx)
+            if limit is not None and len(matched) >= limit:
+                # Early termination: the caller needs no more rows
+                break
+        return matched
+
+    def _top_k(self, request, plan: QueryPlan, checkpoint: Optional[Callable[[], None]],
+               profiler: QueryProfiler) -> List[int]:
+        """
+        Find the k matching rows with the largest order_by values (default aqi)
+        Returns list of row indices, largest first
+        """
+        column = getattr(self.data_model, SORT_COLUMNS[request.order_by or 'aqi'])
+        k = request.limit
+        if k <= 0:
+            return []
+        heap = []  # min-heap of (value, idx) holding the k largest seen so far
+        for idx in self._matching_rows(plan.candidates, plan.matches, checkpoint, profiler):
+            value = column[idx]
+            if len(heap) < k:
+                heapq.heappush(heap, (value, idx))
+            elif value > heap[0][0]:
+                heapq.heapreplace(heap, (value, idx))
+        return [idx for _, idx in sorted(heap, reverse=True)]
+
+    def sketch(self, request, checkpoint: Optional[Callable[[], None]] = None,
+               profiler: Optional[QueryProfiler] = None):
+        """
+        Build the sketch for a distinct_count or quantiles query
+
+        Args:
+            request: InternalQueryRequest (uses its filter, query_type and aggregate_field)
+            checkpoint: Called before every scan batch after the first (optional)
+            profiler: Receives the plan, stage timings and row counts (optional)
+
+        Returns:
+            Tuple of (sketch, number of matching rows added to it)
+        """
+        profiler = profiler if profiler is not None else QueryProfiler(self.name)
+        sketch_class, default_field = SKETCH_QUERY_TYPES[request.query_type]
+        field = request.aggregate_field or default_field
+        column = getattr(self.data_model, SKETCH_COLUMNS[request.query_type][field])
+        plan = self._plan(request, profiler)
+
+        sketch = sketch_class()
+        rows = 0
+        for idx in self._matching_rows(plan.candidates, plan.matches, checkpoint, profiler):
+            sketch.add(column[idx])
+            rows += 1
+
+        return sketch, rows
+
+    def summarize(self, request, checkpoint: Optional[Callable[[], None]] = None,
+                  profiler: Optional[QueryProfiler] = None):
+        """
+        Compute the grouped count/min/max/sum for a summary query
+
+        Args:
+            request: InternalQueryRequest (uses its filter and group_by)
+            checkpoint: Called before every scan batch after the first (optional)
+            profiler: Receives the plan, stage timings and row counts (optional)
+
+        Returns:
+            Tuple of (SummaryAccumulator, whether it was answered from rollups)
+        """
+        profiler = profiler if profiler is not None else QueryProfiler(self.name)
+        rollups = self.data_model.rollups
+        if rollups is not None and filter_aligned(request.filter):
+            profiler.access_path = 'rollups'
+            with profiler.stage('index_lookup'):
+                return rollups.summarize(request.filter, request.group_by), True
+
+        summary = SummaryAccumulator(request.group_by)
+        plan = self._plan(request, profiler)
+        model = self.data_model
+        for idx in self._matching_rows(plan.candidates, plan.matches, checkpoint, profiler):
+            aqi, concentration = model.aqis[idx], model.concentrations[idx]
+            summary.add(model.site_names[idx], model.parameters[idx], model.datetimes[idx],
+                        (1, aqi, aqi, aqi, concentration, concentration, concentration))
+
+        return summary, False
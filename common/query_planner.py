@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Cost-based access path selection for local scans
+Per-column statistics estimate how many rows each filter predicate keeps; the
+planner starts from the access path with the fewest candidate rows and
+evaluates the remaining predicates most selective first. Categorical
+predicates are combined exactly with bitmap indexes, and zone maps drop row
+blocks that cannot satisfy the range predicates
+"""
+
+import bisect
+import math
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from bitmap_index import bitmap_contains, bitmap_from_ranges, bitmap_rows
+from fire_column_model import FireColumnModel
+
+# Access paths, cheapest to set up first (used to break estimate ties)
+ACCESS_PATHS = ('full_scan', 'bitmap', 'spatial_grid', 'time_range', 'aqi_range')
+
+
+class _Histogram:
+    """Equi-width histogram over a numeric column"""
+
+    def __init__(self, values: Sequence[float], num_buckets: int):
+        self.total = len(values)
+        self.low = min(values) if values else 0.0
+        high = max(values) if values else 0.0
+        self.width = (high - self.low) / num_buckets if high > self.low else 1.0
+        self.counts = [0] * num_buckets
+        for value in values:
+            self.counts[min(int((value - self.low) / self.width), num_buckets - 1)] += 1
+
+    def estimate(self, low: Optional[float], high: Optional[float]) -> float:
+        """Estimated rows with low <= value <= high (None is open), uniform within buckets"""
+        rows = 0.0
+        touched = False
+        for bucket, count in enumerate(self.counts):
+            start = self.low + bucket * self.width
+            end = start + self.width
+            overlap = (end if high is None else min(end, high)) - (start if low is None else max(start, low))
+            if overlap >= 0 and count:
+                # Ranges that only touch a bucket edge (e.g. the maximum value) still match rows
+                touched = True
+                rows += count * min(1.0, overlap / self.width)
+        return min(max(rows, 1.0 if touched else 0.0), self.total)
+
+
+class ColumnStatistics:
+    """
+    Statistics for selectivity estimates, built once after the data is loaded
+
+    An hourly histogram of datetimes; equi-width histograms of AQI and
+    concentration; and a lat/lon grid (cell -> row indices) that doubles as
+    the spatial access path. Categorical predicates need no statistics: the
+    population count of their bitmap is exact.
+    """
+
+    def __init__(self, data_model: FireColumnModel, histogram_buckets: int = 32,
+                 grid_cell_degrees: float = 1.0):
+        """
+        Build statistics
+
+        Args:
+            data_model: Loaded FireColumnModel
+            histogram_buckets: Buckets for the AQI and concentration histograms (default: 32)
+            grid_cell_degrees: Size of a spatial grid cell in degrees (default: 1.0)
+        """
+        self.row_count = data_model.measurement_count()
+
+        hour_counts = Counter(datetime[:13] for datetime in data_model.datetimes)
+        self.hours = sorted(hour_counts)
+        self.hour_cumulative = [0]
+        for hour in self.hours:
+            self.hour_cumulative.append(self.hour_cumulative[-1] + hour_counts[hour])
+
+        buckets = max(1, histogram_buckets)
+        self.aqi_histogram = _Histogram(data_model.aqis, buckets)
+        self.concentration_histogram = _Histogram(data_model.concentrations, buckets)
+
+        self.grid_cell_degrees = grid_cell_degrees
+        self.grid: Dict[Tuple[int, int], List[int]] = {}
+        for idx, (latitude, longitude) in enumerate(zip(data_model.latitudes, data_model.longitudes)):
+            self.grid.setdefault(self.grid_cell(latitude, longitude), []).append(idx)
+
+    def grid_cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """Grid cell containing a point"""
+        return (math.floor(latitude / self.grid_cell_degrees), math.floor(longitude / self.grid_cell_degrees))
+
+    def time_rows(self, min_datetime: str, max_datetime: str) -> int:
+        """Estimated rows in a datetime range (hour granularity; empty bounds are open)"""
+        start = bisect.bisect_left(self.hours, min_datetime[:13]) if min_datetime else 0
+        end = bisect.bisect_right(self.hours, max_datetime[:13]) if max_datetime else len(self.hours)
+        return self.hour_cumulative[end] - self.hour_cumulative[start] if end > start else 0
+
+    def grid_cells(self, filter_obj) -> List[Tuple[int, int]]:
+        """Grid cells overlapping a filter's lat/lon bounds (0 bounds are open)"""
+        min_cell = self.grid_cell(filter_obj.min_latitude or -90.0, filter_obj.min_longitude or -180.0)
+        max_cell = self.grid_cell(filter_obj.max_latitude or 90.0, filter_obj.max_longitude or 180.0)
+        return [cell for cell in self.grid
+                if min_cell[0] <= cell[0] <= max_cell[0] and min_cell[1] <= cell[1] <= max_cell[1]]
+
+
+class QueryPlan:
+    """
+    Chosen access path plus residual predicates for one local scan
+    """
+
+    def __init__(self, access_path: str, candidates: Sequence[int], estimates: Dict[str, float],
+                 predicates: List[Tuple[str, float, Callable[[int], bool]]], row_count: int,
+                 blocks_skipped: int = 0, block_count: int = 0):
+        """
+        Initialize plan
+
+        Args:
+            access_path: Key of ACCESS_PATHS
+            candidates: Row indices produced by the access path
+            estimates: Estimated candidate rows for every applicable access path
+            predicates: (name, selectivity, check) still to evaluate, in evaluation order
+            row_count: Rows in the partition
+            blocks_skipped: Zone map blocks ruled out by the range predicates (default: 0)
+            block_count: Zone map blocks in the partition (default: 0)
+        """
+        self.access_path = access_path
+        self.candidates = candidates
+        self.estimates = estimates
+        self.predicates = predicates
+        self.row_count = row_count
+        self.blocks_skipped = blocks_skipped
+        self.block_count = block_count
+
+        checks = [check for _, _, check in predicates]
+
+        def matches(idx: int) -> bool:
+            for check in checks:
+                if not check(idx):
+                    return False
+            return True
+
+        self.matches = matches
+
+    def describe(self) -> str:
+        """One-line summary for logs"""
+        order = ', '.join(f"{name}({selectivity:.2f})" for name, selectivity, _ in self.predicates) or 'none'
+        description = (f"{self.access_path} -> {len(self.candidates)}/{self.row_count} candidates "
+                       f"(est. {self.estimates[self.access_path]:.0f}), predicates: {order}")
+        if self.blocks_skipped:
+            description += f", zone map skipped {self.blocks_skipped}/{self.block_count} blocks"
+        return description
+
+
+class QueryPlanner:
+    """
+    Chooses the access path and predicate order for a QueryFilter
+
+    Every filter field is honored: parameters, site names, AQS codes and
+    agencies match any listed value; lat/lon, datetime, concentration and AQI
+    bounds are ranges where 0 / empty means open. The access path with the
+    lowest estimated row count produces the candidates; predicates it
+    answers exactly are dropped and the rest run most selective first.
+
+    The categorical predicates collapse into one bitmap: OR across the
+    listed values of a column, AND across columns. AQI bounds add the
+    bitmaps of the AQI categories they overlap, which answers them exactly
+    when every overlapping category lies inside the bounds. The bitmap is
+    either the access path (its set rows are the candidates) or a single
+    residual membership check.
+
+    Range predicates on datetime, AQI, concentration, latitude and
+    longitude are first checked against the data model's zone map; rows of
+    blocks that cannot match are cleared from the bitmap, so every access
+    path skips them.
+    """
+
+    def __init__(self, data_model: FireColumnModel, sort_index: Callable[[str], List[int]],
+                 statistics: Optional[ColumnStatistics] = None):
+        """
+        Initialize planner
+
+        Args:
+            data_model: Loaded FireColumnModel
+            sort_index: Returns row indices in ascending order of a column ('datetime', 'aqi')
+            statistics: Column statistics (default: built with default settings)
+        """
+        self.data_model = data_model
+        self.sort_index = sort_index
+        self.statistics = statistics if statistics is not None else ColumnStatistics(data_model)
+
+    def plan(self, filter_obj) -> QueryPlan:
+        """
+        Plan a scan for a filter
+
+        Args:
+            filter_obj: QueryFilter
+
+        Returns:
+            QueryPlan with candidates and ordered residual predicates
+        """
+        stats = self.statistics
+        model = self.data_model
+        n = stats.row_count
+
+        has_location = bool(filter_obj.min_latitude or filter_obj.max_latitude or
+                            filter_obj.min_longitude or filter_obj.max_longitude)
+        min_datetime, max_datetime = filter_obj.min_datetime, filter_obj.max_datetime
+        min_aqi, max_aqi = filter_obj.min_aqi, filter_obj.max_aqi
+        min_concentration, max_concentration = filter_obj.min_concentration, filter_obj.max_concentration
+        bitmap, aqi_exact = self._categorical_bitmap(filter_obj)
+        zone_bitmap, blocks_skipped = self._zone_bitmap(filter_obj)
+        bitmap = self._intersect(bitmap, zone_bitmap)
+
+        # Estimated rows per predicate (exact for the bitmap's categorical part)
+        grid_cells = stats.grid_cells(filter_obj) if has_location else []
+        location_rows = sum(len(stats.grid[cell]) for cell in grid_cells)
+        estimates = {'full_scan': n}
+        if bitmap is not None:
+            estimates['bitmap'] = bitmap.bit_count()
+        if has_location:
+            estimates['spatial_grid'] = location_rows
+        if min_datetime or max_datetime:
+            estimates['time_range'] = stats.time_rows(min_datetime, max_datetime)
+        if min_aqi or max_aqi:
+            estimates['aqi_range'] = stats.aqi_histogram.estimate(min_aqi or None, max_aqi or None)
+
+        access_path = min(estimates, key=lambda path: (estimates[path], ACCESS_PATHS.index(path)))
+        candidates = self._candidates(access_path, bitmap, grid_cells,
+                                      min_datetime, max_datetime, min_aqi, max_aqi)
+
+        # Residual predicates (the grid is coarse, so location is always rechecked)
+        predicates = []
+
+        def add(name, rows, check):
+            predicates.append((name, rows / n if n else 1.0, check))
+
+        if access_path == 'aqi_range':
+            # The range is exact, so only the non-AQI part of the bitmap is still needed
+            bitmap = self._intersect(self._categorical_bitmap(filter_obj, include_aqi=False)[0], zone_bitmap)
+        if bitmap is not None and access_path != 'bitmap':
+            add('bitmap', bitmap.bit_count(), bitmap_contains(bitmap, n))
+        if has_location:
+            add('location', location_rows, self._location_check(filter_obj))
+        if (min_datetime or max_datetime) and access_path != 'time_range':
+            add('datetime', estimates['time_range'], self._range_check(model.datetimes, min_datetime, max_datetime))
+        if (min_aqi or max_aqi) and access_path != 'aqi_range' and not aqi_exact:
+            add('aqi', estimates['aqi_range'], self._range_check(model.aqis, min_aqi, max_aqi))
+        if min_concentration or max_concentration:
+            add('concentration',
+                stats.concentration_histogram.estimate(min_concentration or None, max_concentration or None),
+                self._range_check(model.concentrations, min_concentration, max_concentration))
+        predicates.sort(key=lambda predicate: predicate[1])
+
+        return QueryPlan(access_path, candidates, estimates, predicates, n,
+                         blocks_skipped, model.zone_map.block_count())
+
+    def _zone_bitmap(self, filter_obj) -> Tuple[Optional[int], int]:
+        """
+        Bitmap of the rows in zone map blocks that may match the filter's ranges
+
+        Returns:
+            Tuple of (bitmap, or None if no block is skipped; blocks skipped)
+        """
+        ranges, skipped = self.data_model.zone_map.matching_ranges(filter_obj)
+        if not skipped:
+            return None, 0
+        return bitmap_from_ranges(ranges), skipped
+
+    @staticmethod
+    def _intersect(bitmap: Optional[int], other: Optional[int]) -> Optional[int]:
+        """AND two optional bitmaps (None means no restriction)"""
+        if bitmap is None:
+            return other
+        if other is None:
+            return bitmap
+        return bitmap & other
+
+    def _categorical_bitmap(self, filter_obj, include_aqi: bool = True) -> Tuple[Optional[int], bool]:
+        """
+        Combine the filter's categorical predicates into one bitmap
+
+        Args:
+            filter_obj: QueryFilter
+            include_aqi: Whether to add the AQI categories overlapping the AQI bounds
+
+        Returns:
+            Tuple of (bitmap, or None if no predicate applies; whether the
+            bitmap answers the AQI bounds exactly)
+        """
+        model = self.data_model
+        bitmaps = [model.bitmap(column, values) for column, values in (
+            ('parameter', filter_obj.parameters),
+            ('site_name', filter_obj.site_names),
+            ('aqs_code', filter_obj.aqs_codes),
+            ('agency_name', filter_obj.agency_names)
+        ) if values]
+
+        aqi_exact = False
+        min_aqi, max_aqi = filter_obj.min_aqi, filter_obj.max_aqi
+        if include_aqi and (min_aqi or max_aqi):
+            overlapping = []
+            aqi_exact = True
+            for category, (low, high) in model.category_aqi_bounds().items():
+                if (min_aqi and high < min_aqi) or (max_aqi and low > max_aqi):
+                    continue
+                overlapping.append(category)
+                if (min_aqi and low < min_aqi) or (max_aqi and high > max_aqi):
+                    aqi_exact = False
+            # When every category overlaps the bitmap would prune nothing (and
+            # if they all lie inside the bounds, no row needs an AQI check)
+            if len(overlapping) < len(model.category_aqi_bounds()):
+                bitmaps.append(model.bitmap('category', overlapping))
+
+        if not bitmaps:
+            return None, aqi_exact
+        bitmap = bitmaps[0]
+        for other in bitmaps[1:]:
+            bitmap &= other
+        return bitmap, aqi_exact
+
+    def _candidates(self, access_path, bitmap, grid_cells,
+                    min_datetime, max_datetime, min_aqi, max_aqi) -> Sequence[int]:
+        """Row indices produced by an access path"""
+        model = self.data_model
+        if access_path == 'bitmap':
+            return bitmap_rows(bitmap)
+        if access_path == 'spatial_grid':
+            return self._union(self.statistics.grid.__getitem__, grid_cells)
+        if access_path == 'time_range':
+            return self._sorted_range('datetime', model.datetimes, min_datetime, max_datetime)
+        if access_path == 'aqi_range':
+            return self._sorted_range('aqi', model.aqis, min_aqi, max_aqi)
+        return range(model.measurement_count())
+
+    @staticmethod
+    def _union(lookup: Callable, keys) -> Sequence[int]:
+        """Concatenate index lists (each row has one value per column, so they are disjoint)"""
+        keys = list(keys)
+        if len(keys) == 1:
+            return lookup(keys[0])
+        indices = []
+        for key in keys:
+            indices.extend(lookup(key))
+        return indices
+
+    def _sorted_range(self, order_by: str, column, low, high) -> Sequence[int]:
+        """Rows with low <= value <= high (falsy bounds are open) from a sort index"""
+        order = self.sort_index(order_by)
+        start = bisect.bisect_left(order, low, key=column.__getitem__) if low else 0
+        end = bisect.bisect_right(order, high, key=column.__getitem__) if high else len(order)
+        return order[start:end]
+
+    @staticmethod
+    def _range_check(column, low, high) -> Callable[[int], bool]:
+        """Check low <= column[idx] <= high (falsy bounds are open)"""
+        if low and high:
+            return lambda idx: low <= column[idx] <= high
+        if low:
+            return lambda idx: column[idx] >= low
+        return lambda idx: column[idx] <= high
+
+    def _location_check(self, filter_obj) -> Callable[[int], bool]:
+        """Check a row lies within the filter's lat/lon bounds (0 bounds are open)"""
+        latitudes, longitudes = self.data_model.latitudes, self.data_model.longitudes
+        min_latitude = filter_obj.min_latitude or -90.0
+        max_latitude = filter_obj.max_latitude or 90.0
+        min_longitude = filter_obj.min_longitude or -180.0
+        max_longitude = filter_obj.max_longitude or 180.0
+        return lambda idx: (min_latitude <= latitudes[idx] <= max_latitude and
+                            min_longitude <= longitudes[idx] <= max_longitude)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Per-process query profiling
+Each process times the stages of its part of a query and returns them as a
+QueryProfile node; callers attach their neighbors' nodes as children, so a
+profiled query comes back with a timing tree of the whole fan-out
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+import fire_service_pb2
+
+# Timed stages (QueryProfile.<stage>_ms)
+STAGES = ('queue_wait', 'index_lookup', 'predicate_eval', 'preempted', 'proto_build',
+          'serialization', 'network', 'merge', 'stream')
+
+
+class QueryProfiler:
+    """
+    Collects stage timings and row counts for one query in one process
+
+    Cheap enough to keep for every query (a few perf_counter() calls); the
+    tree is only built and sent when the request asks for a profile.
+    """
+
+    def __init__(self, process_id: str, role: str = ""):
+        """
+        Initialize profiler
+
+        Args:
+            process_id: Process the timings belong to
+            role: Role of the process (gateway, team_leader, worker)
+        """
+        self.process_id = process_id
+        self.role = role
+        self.start_time = time.perf_counter()
+
+        self.timings: Dict[str, float] = {stage: 0.0 for stage in STAGES}
+        self.access_path = ""
+        self.plan = ""
+        self.rows_scanned = 0
+        self.rows_returned = 0
+        self.children = []
+
+    def add(self, stage: str, milliseconds: float):
+        """Add time to a stage"""
+        self.timings[stage] += milliseconds
+
+    @contextmanager
+    def stage(self, stage: str):
+        """Time the enclosed block as part of a stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] += (time.perf_counter() - start) * 1000
+
+    def record_plan(self, plan):
+        """Record the QueryPlan chosen for the local scan"""
+        self.access_path = plan.access_path
+        self.plan = plan.describe()
+
+    def add_child(self, profile, call_ms: float):
+        """
+        Attach a neighbor's profile
+
+        Args:
+            profile: QueryProfile returned by the neighbor
+            call_ms: Duration of the call as seen by this process; the part not
+                spent inside the neighbor is attributed to the network
+        """
+        child = fire_service_pb2.QueryProfile()
+        child.CopyFrom(profile)
+        child.network_ms = max(0.0, call_ms - child.total_ms)
+        self.children.append(child)
+
+    def add_missing_child(self, process_id: str, status: str, call_ms: float = 0.0):
+        """Attach a placeholder for a neighbor that did not return a profile"""
+        self.children.append(fire_service_pb2.QueryProfile(
+            process_id=process_id,
+            status=status,
+            network_ms=call_ms
+        ))
+
+    def to_proto(self):
+        """
+        Build the QueryProfile node for this process
+
+        Returns:
+            QueryProfile with total_ms measured up to now
+        """
+        profile = fire_service_pb2.QueryProfile(
+            process_id=self.process_id,
+            role=self.role,
+            status="ok",
+            access_path=self.access_path,
+            plan=self.plan,
+            rows_scanned=self.rows_scanned,
+            rows_returned=self.rows_returned,
+            total_ms=(time.perf_counter() - self.start_time) * 1000
+        )
+        for stage, milliseconds in self.timings.items():
+            setattr(profile, f"{stage}_ms", milliseconds)
+        profile.children.extend(self.children)
+        return profile
+
+
+def format_profile(profile, indent: int = 0) -> str:
+    """
+    Render a QueryProfile tree as indented text
+
+    Args:
+        profile: QueryProfile root
+        indent: Nesting level of the root (default: 0)
+
+    Returns:
+        Multi-line string, one process per line
+    """
+    stages = ', '.join(f"{stage}={getattr(profile, f'{stage}_ms'):.1f}ms" for stage in STAGES
+                       if getattr(profile, f"{stage}_ms") > 0.05)
+    line = (f"{'  ' * indent}{profile.process_id} [{profile.role or '-'}] {profile.status} "
+            f"total={profile.total_ms:.1f}ms rows {profile.rows_scanned} scanned / "
+            f"{profile.rows_returned} returned")
+    if profile.access_path:
+        line += f" via {profile.access_path}"
+    if stages:
+        line += f"\n{'  ' * indent}  {stages}"
+    lines = [line]
+    for child in profile.children:
+        lines.append(format_profile(child, indent + 1))
+    return '\n'.join(lines)
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Memory-bounded buffering of in-flight query results
+A per-process budget caps how many result bytes are held in memory; a request
+that exceeds its share spills its measurements to a temporary file in
+serialized form and streams them back from disk. Sorted queries keep one run
+per source and k-way merge them while reading.
+"""
+
+import heapq
+import itertools
+import operator
+import struct
+import tempfile
+import threading
+from typing import Iterator, List, Optional
+
+import fire_service_pb2
+
+# Record header: length of the serialized FireMeasurement that follows
+_RECORD_HEADER = struct.Struct('<I')
+
+
+class MemoryBudget:
+    """
+    Per-process budget for buffered result bytes
+
+    Sizes are serialized protobuf sizes, a consistent (if optimistic) proxy
+    for the memory held by the in-memory message objects.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_request_fraction: float = 0.5,
+                 name: str = "unknown"):
+        """
+        Initialize memory budget
+
+        Args:
+            max_bytes: Total result bytes all requests may hold in memory (default: 256MB)
+            max_request_fraction: Share of max_bytes one request may hold (default: 0.5)
+            name: Name identifier for logging (default: "unknown")
+        """
+        self.max_bytes = max_bytes
+        self.max_request_bytes = int(max_bytes * max_request_fraction)
+        self.name = name
+
+        self.used_bytes = 0
+        self.peak_bytes = 0
+        self.spills = 0
+        self.spilled_bytes = 0
+
+        self.lock = threading.Lock()
+
+    def try_reserve(self, nbytes: int, request_bytes: int) -> bool:
+        """
+        Reserve memory for more buffered results of a request
+
+        Args:
+            nbytes: Bytes to add
+            request_bytes: Bytes the request already holds in memory
+
+        Returns:
+            True if reserved, False if the request should spill instead
+        """
+        with self.lock:
+            if request_bytes + nbytes > self.max_request_bytes or self.used_bytes + nbytes > self.max_bytes:
+                return False
+            self.used_bytes += nbytes
+            self.peak_bytes = max(self.peak_bytes, self.used_bytes)
+            return True
+
+    def release(self, nbytes: int):
+        """
+        Return memory reserved with try_reserve()
+
+        Args:
+            nbytes: Bytes to release
+        """
+        with self.lock:
+            self.used_bytes = max(0, self.used_bytes - nbytes)
+
+    def record_spill(self, nbytes: int):
+        """Count bytes written to disk by a spilling request"""
+        with self.lock:
+            self.spilled_bytes += nbytes
+
+    def record_spilled_request(self):
+        """Count a request that started spilling"""
+        with self.lock:
+            self.spills += 1
+
+    def get_stats(self) -> dict:
+        """
+        Get budget statistics
+
+        Returns:
+            Dictionary with current/peak buffered bytes and spill counters
+        """
+        with self.lock:
+            return {
+                'max_bytes': self.max_bytes,
+                'max_request_bytes': self.max_request_bytes,
+                'used_bytes': self.used_bytes,
+                'peak_bytes': self.peak_bytes,
+                'spilled_requests': self.spills,
+                'spilled_bytes': self.spilled_bytes
+            }
+
+
+class SpillableResultBuffer:
+    """
+    Ordered buffer of FireMeasurement messages for one request
+
+    Measurements stay in memory while the budget allows. On the first
+    overflow everything buffered so far, and everything added afterwards,
+    goes to an unnamed temporary file as length-prefixed serialized records,
+    so iteration order always matches insertion order. Fill the buffer
+    completely before iterating it; close() releases memory and the file.
+    """
+
+    def __init__(self, budget: Optional[MemoryBudget] = None, spill_directory: Optional[str] = None,
+                 name: str = "unknown"):
+        """
+        Initialize result buffer
+
+        Args:
+            budget: Process memory budget (default: unbounded, never spills)
+            spill_directory: Directory for the spill file (default: system temp directory)
+            name: Name identifier for logging (default: "unknown")
+        """
+        self.budget = budget
+        self.spill_directory = spill_directory
+        self.name = name
+
+        self.memory: List = []
+        self.memory_bytes = 0
+        self.spill_file = None
+        self.spilled_count = 0
+        self.spilled_bytes = 0
+
+    def __len__(self) -> int:
+        return self.spilled_count + len(self.memory)
+
+    @property
+    def spilled(self) -> bool:
+        """Whether this buffer has spilled to disk"""
+        return self.spill_file is not None
+
+    def extend(self, measurements, nbytes: Optional[int] = None):
+        """
+        Append measurements
+
+        Args:
+            measurements: Iterable of FireMeasurement messages
+            nbytes: Their total serialized size, if already known (e.g. from a response's ByteSize())
+        """
+        measurements = list(measurements)
+        if not measurements:
+            return
+        if nbytes is None:
+            nbytes = sum(m.ByteSize() for m in measurements)
+
+        if self.spill_file is None:
+            if self.budget is None or self.budget.try_reserve(nbytes, self.memory_bytes):
+                self.memory.extend(measurements)
+                self.memory_bytes += nbytes
+                return
+            self._start_spilling()
+
+        self._write(measurements)
+
+    def add_response(self, response):
+        """Append the measurements of a neighbor's InternalQueryResponse"""
+        self.extend(response.measurements, nbytes=response.ByteSize())
+
+    def _start_spilling(self):
+        """Move everything held in memory to a new spill file"""
+        self.spill_file = tempfile.TemporaryFile(prefix='fire_spill_', dir=self.spill_directory)
+        held = self.memory
+        self.memory = []
+        self._write(held)
+        if self.budget is not None:
+            self.budget.release(self.memory_bytes)
+            self.budget.record_spilled_request()
+        self.memory_bytes = 0
+        print(f"[ResultBuffer-{self.name}] Memory share exceeded, spilling results to disk")
+
+    def _write(self, measurements):
+        """Append serialized records to the spill file"""
+        written = 0
+        parts = []
+        for m in measurements:
+            data = m.SerializeToString()
+            parts.append(_RECORD_HEADER.pack(len(data)))
+            parts.append(data)
+            written += _RECORD_HEADER.size + len(data)
+        self.spill_file.write(b''.join(parts))
+        self.spilled_count += len(measurements)
+        self.spilled_bytes += written
+        if self.budget is not None:
+            self.budget.record_spill(written)
+
+    def iter_batches(self, batch_size: int) -> Iterator[List]:
+        """
+        Iterate buffered measurements in insertion order
+
+        Args:
+            batch_size: Measurements per yielded list
+
+        Returns:
+            Iterator of lists of FireMeasurement messages
+        """
+        batch_size = max(1, batch_size)
+
+        # After a spill everything lives in the file; otherwise everything is in memory
+        if self.spill_file is None:
+            for start in range(0, len(self.memory), batch_size):
+                yield self.memory[start:start + batch_size]
+            return
+
+        self.spill_file.flush()
+        self.spill_file.seek(0)
+        batch = []
+        for _ in range(self.spilled_count):
+            (length,) = _RECORD_HEADER.unpack(self.spill_file.read(_RECORD_HEADER.size))
+            batch.append(fire_service_pb2.FireMeasurement.FromString(self.spill_file.read(length)))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def close(self):
+        """Release the memory reservation and delete the spill file"""
+        if self.budget is not None and self.memory_bytes:
+            self.budget.release(self.memory_bytes)
+        self.memory = []
+        self.memory_bytes = 0
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SortedRunBuffer:
+    """
+    Buffer of independently sorted runs, merged on read
+
+    Each extend() call adds one run (one source's already-sorted results,
+    e.g. the local scan or one neighbor's response), held in its own
+    SpillableResultBuffer. iter_batches() performs a streaming k-way merge
+    of the runs on order_by, so the first batch is available without
+    sorting the whole result, and stops after `limit` measurements.
+    """
+
+    def __init__(self, order_by: str, descending: bool = False, limit: int = 0,
+                 budget: Optional[MemoryBudget] = None, spill_directory: Optional[str] = None,
+                 name: str = "unknown"):
+        """
+        Initialize sorted run buffer
+
+        Args:
+            order_by: FireMeasurement field the runs are sorted by
+            descending: Whether runs are sorted in descending order (default: False)
+            limit: Maximum measurements to return, 0 for all (default: 0)
+            budget: Process memory budget shared by all runs (default: unbounded)
+            spill_directory: Directory for spill files (default: system temp directory)
+            name: Name identifier for logging (default: "unknown")
+        """
+        self.sort_key = operator.attrgetter(order_by)
+        self.descending = descending
+        self.limit = limit
+        self.budget = budget
+        self.spill_directory = spill_directory
+        self.name = name
+
+        self.runs: List[SpillableResultBuffer] = []
+
+    def __len__(self) -> int:
+        total = sum(len(run) for run in self.runs)
+        return min(total, self.limit) if self.limit > 0 else total
+
+    @property
+    def spilled(self) -> bool:
+        """Whether any run has spilled to disk"""
+        return any(run.spilled for run in self.runs)
+
+    def extend(self, measurements, nbytes: Optional[int] = None):
+        """
+        Add one sorted run
+
+        Args:
+            measurements: FireMeasurement messages sorted by order_by
+            nbytes: Their total serialized size, if already known
+        """
+        run = SpillableResultBuffer(self.budget, self.spill_directory, name=f"{self.name}.{len(self.runs)}")
+        run.extend(measurements, nbytes)
+        if len(run):
+            self.runs.append(run)
+
+    def add_response(self, response):
+        """Add a neighbor's InternalQueryResponse as one sorted run"""
+        self.extend(response.measurements, nbytes=response.ByteSize())
+
+    def iter_batches(self, batch_size: int) -> Iterator[List]:
+        """
+        Iterate the merged runs in order
+
+        Args:
+            batch_size: Measurements per yielded list
+
+        Returns:
+            Iterator of lists of FireMeasurement messages
+        """
+        batch_size = max(1, batch_size)
+        sources = [itertools.chain.from_iterable(run.iter_batches(batch_size)) for run in self.runs]
+        merged = heapq.merge(*sources, key=self.sort_key, reverse=self.descending)
+        if self.limit > 0:
+            merged = itertools.islice(merged, self.limit)
+        while True:
+            batch = list(itertools.islice(merged, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def close(self):
+        """Release all runs"""
+        for run in self.runs:
+            run.close()
+        self.runs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def create_result_buffer(request, budget: Optional[MemoryBudget] = None,
+                         spill_directory: Optional[str] = None, name: str = "unknown"):
+    """
+    Create the buffer matching a query's ordering
+
+    Args:
+        request: QueryRequest or InternalQueryRequest (uses order_by, order_descending, limit)
+        budget: Process memory budget (default: unbounded)
+        spill_directory: Directory for spill files (default: system temp directory)
+        name: Name identifier for logging (default: "unknown")
+
+    Returns:
+        SortedRunBuffer for ordered queries, SpillableResultBuffer otherwise
+    """
+    if request.order_by:
+        return SortedRunBuffer(request.order_by, request.order_descending, request.limit,
+                               budget, spill_directory, name)
+    return SpillableResultBuffer(budget, spill_directory, name)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Retained results for resumable streams
+Keeps each streamed request's aggregated result buffer, with the first row of
+every chunk sent, for a retention window so a client whose stream broke can
+resume from a chunk_number without rerunning the distributed scan
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+
+class ResumeUnavailableError(Exception):
+    """A stream cannot be resumed (reason: 'not_found', 'out_of_range' or 'busy')"""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class RetainedResult:
+    """One request's result buffer and chunk boundaries"""
+
+    def __init__(self, request_id: int, client_id: str, results, unavailable_processes: List[str]):
+        self.request_id = request_id
+        self.client_id = client_id
+        self.results = results
+        self.total_results = len(results)
+        self.unavailable_processes = list(unavailable_processes)
+        # chunk_offsets[i] = first row of chunk i (one past the last chunk sent at the end)
+        self.chunk_offsets: List[int] = [0]
+        self.streaming = True
+        self.expires_at: Optional[float] = None
+        self.resumes = 0
+
+
+class ResultStore:
+    """
+    Result buffers of recent streams, keyed by request_id
+
+    A buffer is retained while its stream runs and for retention_seconds
+    after the stream last ended, then closed. Chunk boundaries are recorded
+    as the stream goes, so a resumed stream replays exactly the chunks the
+    client is missing even when chunk sizes were adapted. Only one stream
+    per request runs at a time. Beyond max_requests the least recently
+    used idle entry is dropped; retained in-memory buffers keep their memory
+    budget reservation until then.
+    """
+
+    def __init__(self, enabled: bool = False, retention_seconds: float = 300.0, max_requests: int = 16,
+                 name: str = "unknown"):
+        """
+        Initialize result store
+
+        Args:
+            enabled: Whether results are retained at all (default: False)
+            retention_seconds: How long an idle result stays resumable (default: 300.0)
+            max_requests: Most results retained at once (default: 16)
+            name: Name identifier for logging (default: "unknown")
+        """
+        self.enabled = enabled
+        self.retention_seconds = retention_seconds
+        self.max_requests = max(1, max_requests)
+        self.name = name
+
+        self.lock = threading.Lock()
+        self.stream_ended = threading.Condition(self.lock)
+        self.entries: 'OrderedDict[int, RetainedResult]' = OrderedDict()
+        self.retained = 0
+        self.resumed = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def retain(self, request_id: int, client_id: str, results, unavailable_processes: List[str]) -> RetainedResult:
+        """
+        Take ownership of a request's results before streaming them
+
+        Args:
+            request_id: Request the results belong to
+            client_id: Client allowed to resume the stream
+            results: Filled result buffer (closed by the store when dropped)
+            unavailable_processes: Processes missing from the results
+
+        Returns:
+            RetainedResult in streaming state (pass to release() when the stream ends)
+        """
+        entry = RetainedResult(request_id, client_id, results, unavailable_processes)
+        with self.lock:
+            dropped = self._expire()
+            previous = self.entries.pop(request_id, None)
+            if previous is not None and not previous.streaming:
+                dropped.append(previous)
+            self.entries[request_id] = entry
+            self.retained += 1
+            while len(self.entries) > self.max_requests:
+                idle = next((rid for rid, e in self.entries.items() if not e.streaming), None)
+                if idle is None:
+                    break
+                dropped.append(self.entries.pop(idle))
+                self.evicted += 1
+        self._close(dropped)
+        return entry
+
+    def acquire(self, request_id: int, client_id: str, from_chunk: int, wait: float = 0.0) -> RetainedResult:
+        """
+        Claim a retained result to resume its stream
+
+        Args:
+            request_id: Request to resume
+            client_id: Client asking to resume (must be the original client)
+            from_chunk: First chunk_number to resend
+            wait: Seconds to wait for a still-running stream of the request to end (default: 0.0)
+
+        Returns:
+            RetainedResult in streaming state (pass to release() when the stream ends)
+
+        Raises:
+            ResumeUnavailableError: Unknown or expired request, chunk beyond those
+                sent, or the request is still streaming
+        """
+        self.expire()
+        deadline = time.time() + wait
+        with self.lock:
+            entry = self.entries.get(request_id)
+            while entry is not None and entry.streaming and time.time() < deadline:
+                self.stream_ended.wait(deadline - time.time())
+                entry = self.entries.get(request_id)
+            if entry is None or entry.client_id != client_id:
+                raise ResumeUnavailableError(
+                    f"No retained results for request {request_id} (expired or never streamed)", 'not_found')
+            if entry.streaming:
+                raise ResumeUnavailableError(f"Request {request_id} is still streaming", 'busy')
+            if from_chunk < 0 or from_chunk >= len(entry.chunk_offsets) or (
+                    from_chunk > 0 and entry.chunk_offsets[from_chunk] >= entry.total_results):
+                raise ResumeUnavailableError(
+                    f"Request {request_id} has no chunk {from_chunk} "
+                    f"({len(entry.chunk_offsets) - 1} chunks sent)", 'out_of_range')
+            entry.streaming = True
+            entry.expires_at = None
+            entry.resumes += 1
+            self.entries.move_to_end(request_id)
+            self.resumed += 1
+            return entry
+
+    def release(self, entry: RetainedResult):
+        """The entry's stream ended: keep it resumable for the retention window"""
+        with self.lock:
+            entry.streaming = False
+            entry.expires_at = time.time() + self.retention_seconds
+            self.stream_ended.notify_all()
+            if self.entries.get(entry.request_id) is not entry:
+                dropped = [entry]  # replaced by a newer request with the same id
+            else:
+                dropped = []
+        self._close(dropped)
+        timer = threading.Timer(self.retention_seconds, self.expire)
+        timer.daemon = True
+        timer.start()
+
+    def expire(self):
+        """Close the results of idle entries past their retention window"""
+        with self.lock:
+            dropped = self._expire()
+        self._close(dropped)
+
+    def _expire(self) -> List[RetainedResult]:
+        """Remove idle entries past their retention window (caller holds the lock)"""
+        now = time.time()
+        expired = [rid for rid, e in self.entries.items()
+                   if not e.streaming and e.expires_at is not None and e.expires_at <= now]
+        self.expired += len(expired)
+        return [self.entries.pop(rid) for rid in expired]
+
+    def _close(self, entries: List[RetainedResult]):
+        """Close dropped result buffers (outside the lock; may delete spill files)"""
+        for entry in entries:
+            entry.results.close()
+            print(f"[ResultStore-{self.name}] Released results of request {entry.request_id}")
+
+    def get_stats(self) -> dict:
+        """
+        Get retention statistics
+
+        Returns:
+            Dictionary with retained entries and retain/resume/expiry counters
+        """
+        self.expire()
+        with self.lock:
+            return {
+                'enabled': self.enabled,
+                'retention_seconds': self.retention_seconds,
+                'retained_requests': len(self.entries),
+                'retained_rows': sum(e.total_results for e in self.entries.values()),
+                'streams_retained': self.retained,
+                'streams_resumed': self.resumed,
+                'expired': self.expired,
+                'evicted': self.evicted
+            }
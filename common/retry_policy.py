@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Retry policy with jittered exponential backoff and a per-process retry budget
+Only used for idempotent, read-only calls (InternalQuery)
+"""
+
+import random
+import threading
+import time
+from typing import Iterable, Optional
+
+import grpc
+
+
+class RetryBudget:
+    """
+    Token bucket that limits retries to a fraction of successful traffic
+
+    Every successful call deposits `ratio` tokens (up to max_tokens) and every
+    retry withdraws one, so retries can add at most ~ratio extra load on top
+    of the traffic that is actually succeeding. A small time-based refill
+    (min_retries_per_second) lets an idle process still retry a rare blip.
+    When neighbors are overloaded and calls mostly fail, the bucket drains and
+    retries stop instead of amplifying the overload.
+    """
+
+    def __init__(self, ratio: float = 0.1, max_tokens: float = 10.0,
+                 min_retries_per_second: float = 1.0, name: str = "unknown"):
+        """
+        Initialize retry budget
+
+        Args:
+            ratio: Tokens deposited per successful call (default: 0.1)
+            max_tokens: Bucket capacity (default: 10.0)
+            min_retries_per_second: Tokens refilled per second regardless of traffic (default: 1.0)
+            name: Name identifier for logging (default: "unknown")
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.min_retries_per_second = min_retries_per_second
+        self.name = name
+
+        self.tokens = max_tokens
+        self.last_refill_time = time.time()
+        self.retries_allowed = 0
+        self.retries_denied = 0
+
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        """Apply time-based refill (lock held)"""
+        now = time.time()
+        elapsed = now - self.last_refill_time
+        self.last_refill_time = now
+        self.tokens = min(self.max_tokens, self.tokens + elapsed * self.min_retries_per_second)
+
+    def record_success(self):
+        """Deposit tokens for a successful call"""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        """
+        Withdraw one token for a retry
+
+        Returns:
+            True if the retry is allowed, False if the budget is exhausted
+        """
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                self.retries_allowed += 1
+                return True
+            self.retries_denied += 1
+            return False
+
+    def get_stats(self) -> dict:
+        """
+        Get retry budget statistics
+
+        Returns:
+            Dictionary with available tokens and allowed/denied retry counts
+        """
+        with self.lock:
+            self._refill()
+            return {
+                'tokens': self.tokens,
+                'max_tokens': self.max_tokens,
+                'retries_allowed': self.retries_allowed,
+                'retries_denied': self.retries_denied
+            }
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed idempotent call is retried
+
+    Backoff uses "full jitter": attempt n sleeps a uniform random time in
+    [0, min(max_backoff, initial_backoff * multiplier^n)], which spreads out
+    retries from many callers hitting the same blip.
+    """
+
+    def __init__(self, max_attempts: int = 3, initial_backoff: float = 0.05,
+                 max_backoff: float = 1.0, backoff_multiplier: float = 2.0,
+                 retryable_codes: Optional[Iterable[str]] = None,
+                 budget: Optional[RetryBudget] = None):
+        """
+        Initialize retry policy
+
+        Args:
+            max_attempts: Total attempts including the first call (default: 3)
+            initial_backoff: Backoff cap for the first retry in seconds (default: 0.05)
+            max_backoff: Maximum backoff cap in seconds (default: 1.0)
+            backoff_multiplier: Growth of the backoff cap per attempt (default: 2.0)
+            retryable_codes: gRPC status code names to retry (default: ["UNAVAILABLE"])
+            budget: Shared RetryBudget limiting retries (default: unlimited)
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.backoff_multiplier = backoff_multiplier
+        codes = retryable_codes if retryable_codes is not None else ["UNAVAILABLE"]
+        self.retryable_codes = {getattr(grpc.StatusCode, code) for code in codes}
+        self.budget = budget
+
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        Check whether an error is worth retrying
+
+        Args:
+            error: Exception raised by the call
+
+        Returns:
+            True for gRPC errors with a retryable status code
+        """
+        return isinstance(error, grpc.RpcError) and error.code() in self.retryable_codes
+
+    def should_retry(self, error: Exception, attempt: int) -> bool:
+        """
+        Decide whether to retry after a failed attempt
+
+        Args:
+            error: Exception raised by the attempt
+            attempt: Number of attempts made so far (1 after the first call)
+
+        Returns:
+            True if another attempt should be made (a budget token is consumed)
+        """
+        if attempt >= self.max_attempts or not self.is_retryable(error):
+            return False
+        if self.budget is not None and not self.budget.try_acquire():
+            return False
+        return True
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Get jittered sleep before the next attempt
+
+        Args:
+            attempt: Number of attempts made so far (1 after the first call)
+
+        Returns:
+            Seconds to sleep
+        """
+        cap = min(self.max_backoff, self.initial_backoff * self.backoff_multiplier ** (attempt - 1))
+        return random.uniform(0, cap)
+
+    def record_success(self):
+        """Report a successful call to the budget"""
+        if self.budget is not None:
+            self.budget.record_success()
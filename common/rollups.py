@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Pre-computed rollups over immutable measurement partitions
+Count/min/max/sum of AQI and concentration per site x parameter x hour, built
+while loading and persisted to a snapshot file so "summary" queries whose
+filter aligns with the buckets never touch raw rows
+"""
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import fire_service_pb2
+
+# Fields a summary query may group by
+GROUP_BY_FIELDS = ('site_name', 'parameter', 'day', 'hour')
+
+# Bucket stats layout
+COUNT, AQI_MIN, AQI_MAX, AQI_SUM, CONC_MIN, CONC_MAX, CONC_SUM = range(7)
+
+SNAPSHOT_VERSION = 1
+
+
+def _new_stats(aqi: int, concentration: float) -> list:
+    return [1, aqi, aqi, aqi, concentration, concentration, concentration]
+
+
+def _merge_stats(target: list, stats) -> None:
+    """Fold one bucket's stats into another (in place)"""
+    target[COUNT] += stats[COUNT]
+    target[AQI_MIN] = min(target[AQI_MIN], stats[AQI_MIN])
+    target[AQI_MAX] = max(target[AQI_MAX], stats[AQI_MAX])
+    target[AQI_SUM] += stats[AQI_SUM]
+    target[CONC_MIN] = min(target[CONC_MIN], stats[CONC_MIN])
+    target[CONC_MAX] = max(target[CONC_MAX], stats[CONC_MAX])
+    target[CONC_SUM] += stats[CONC_SUM]
+
+
+def _hour(datetime: str) -> str:
+    """Hour bucket of an ISO datetime ("YYYY-MM-DDTHH")"""
+    return datetime[:13]
+
+
+def filter_aligned(filter_obj) -> bool:
+    """
+    Whether a filter can be answered from hourly rollups
+
+    Only parameter, site and datetime filters can be: the other columns
+    are not part of the bucket key. A datetime bound aligns when no hour
+    bucket straddles it: bounds down to the hour ("2020-08-10",
+    "2020-08-10T05"), minimums at ":00" and maximums at ":59".
+    """
+    if (filter_obj.min_aqi or filter_obj.max_aqi or
+            filter_obj.min_concentration or filter_obj.max_concentration or
+            filter_obj.min_latitude or filter_obj.max_latitude or
+            filter_obj.min_longitude or filter_obj.max_longitude or
+            filter_obj.aqs_codes or filter_obj.agency_names):
+        return False
+    min_datetime, max_datetime = filter_obj.min_datetime, filter_obj.max_datetime
+    if len(min_datetime) > 13 and min_datetime[13:] != ':00':
+        return False
+    if len(max_datetime) > 13 and max_datetime[13:] != ':59':
+        return False
+    return True
+
+
+class SummaryAccumulator:
+    """
+    Stats grouped by a summary query's group_by key
+
+    Filled from rollup buckets, raw rows or neighbors' SummaryRow messages;
+    all three merge the same way, so leaders and the gateway combine partial
+    summaries exactly. Accepts neighbor responses through add_response(),
+    like the result buffers.
+    """
+
+    def __init__(self, group_by: Iterable[str] = ()):
+        """
+        Initialize accumulator
+
+        Args:
+            group_by: Subset of GROUP_BY_FIELDS (default: one overall group)
+        """
+        group_by = set(group_by)
+        self.by_site = 'site_name' in group_by
+        self.by_parameter = 'parameter' in group_by
+        # Hour wins over day if both are given
+        self.period_length = 13 if 'hour' in group_by else (10 if 'day' in group_by else 0)
+        self.groups: Dict[Tuple[str, str, str], list] = {}
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    @property
+    def spilled(self) -> bool:
+        """Summaries are small and never spill"""
+        return False
+
+    def add(self, site_name: str, parameter: str, period: str, stats):
+        """Fold stats for a site/parameter/period (hour or finer) into its group"""
+        key = (site_name if self.by_site else '',
+               parameter if self.by_parameter else '',
+               period[:self.period_length])
+        group = self.groups.get(key)
+        if group is None:
+            self.groups[key] = list(stats)
+        else:
+            _merge_stats(group, stats)
+
+    def add_rows(self, rows):
+        """Fold SummaryRow messages (already grouped the same way) into the groups"""
+        for row in rows:
+            self.add(row.site_name, row.parameter, row.period,
+                     (row.count, row.aqi_min, row.aqi_max, row.aqi_sum,
+                      row.concentration_min, row.concentration_max, row.concentration_sum))
+
+    def add_response(self, response):
+        """Merge a neighbor's InternalQueryResponse summaries"""
+        self.add_rows(response.summaries)
+
+    def to_rows(self) -> List:
+        """
+        Build SummaryRow messages
+
+        Returns:
+            List of SummaryRow proto messages ordered by site, parameter, period
+        """
+        return [
+            fire_service_pb2.SummaryRow(
+                site_name=site_name, parameter=parameter, period=period,
+                count=stats[COUNT],
+                aqi_min=stats[AQI_MIN], aqi_max=stats[AQI_MAX], aqi_sum=stats[AQI_SUM],
+                concentration_min=stats[CONC_MIN], concentration_max=stats[CONC_MAX],
+                concentration_sum=stats[CONC_SUM]
+            )
+            for (site_name, parameter, period), stats in sorted(self.groups.items())
+        ]
+
+    def close(self):
+        """Nothing to release (result buffer interface)"""
+
+
+class RollupTable:
+    """
+    Count/min/max/sum of AQI and concentration per site x parameter x hour
+
+    Buckets are nested by (site, parameter) so parameter and site filters
+    only visit the matching series.
+    """
+
+    def __init__(self):
+        self.series: Dict[Tuple[str, str], Dict[str, list]] = {}
+
+    def bucket_count(self) -> int:
+        """Number of site x parameter x hour buckets"""
+        return sum(len(hours) for hours in self.series.values())
+
+    def add(self, site_name: str, parameter: str, datetime: str, aqi: int, concentration: float):
+        """Add one measurement to its bucket"""
+        hours = self.series.setdefault((site_name, parameter), {})
+        hour = _hour(datetime)
+        stats = hours.get(hour)
+        if stats is None:
+            hours[hour] = _new_stats(aqi, concentration)
+        else:
+            _merge_stats(stats, _new_stats(aqi, concentration))
+
+    def summarize(self, filter_obj, group_by: Iterable[str]) -> SummaryAccumulator:
+        """
+        Answer a summary query from the buckets (filter must be filter_aligned())
+
+        Like the raw scan, a bucket matches if its parameter is any of the
+        listed parameters and its site any of the listed sites.
+
+        Args:
+            filter_obj: QueryFilter
+            group_by: Subset of GROUP_BY_FIELDS
+
+        Returns:
+            SummaryAccumulator with the grouped stats
+        """
+        summary = SummaryAccumulator(group_by)
+        parameters = set(filter_obj.parameters)
+        sites = set(filter_obj.site_names)
+        min_datetime, max_datetime = filter_obj.min_datetime, filter_obj.max_datetime
+
+        for (site_name, parameter), hours in self.series.items():
+            if parameters and parameter not in parameters:
+                continue
+            if sites and site_name not in sites:
+                continue
+            for hour, stats in hours.items():
+                # Aligned bounds give the same answer for every row in the hour
+                start = hour + ':00'
+                if (min_datetime and start < min_datetime) or (max_datetime and start > max_datetime):
+                    continue
+                summary.add(site_name, parameter, hour, stats)
+        return summary
+
+    def save(self, path: str, source_signature: str):
+        """
+        Persist the buckets to a snapshot file
+
+        Args:
+            path: Snapshot file path
+            source_signature: Signature of the source files the buckets were built from
+        """
+        buckets = [[site_name, parameter, hour] + stats
+                   for (site_name, parameter), hours in self.series.items()
+                   for hour, stats in hours.items()]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'version': SNAPSHOT_VERSION, 'source_signature': source_signature,
+                       'buckets': buckets}, f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str, source_signature: str) -> Optional['RollupTable']:
+        """
+        Load buckets persisted by save()
+
+        Args:
+            path: Snapshot file path
+            source_signature: Signature of the current source files
+
+        Returns:
+            RollupTable, or None if the snapshot is missing, unreadable or stale
+        """
+        try:
+            with open(path, 'r') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('source_signature') != source_signature:
+            return None
+
+        table = cls()
+        for site_name, parameter, hour, *stats in snapshot['buckets']:
+            table.series.setdefault((site_name, parameter), {})[hour] = stats
+        return table
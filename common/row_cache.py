@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Cache of pre-serialized FireMeasurement rows
+Each row's FireMeasurement is serialized once; results are assembled by
+joining the cached bytes into the wire encoding of a repeated measurements
+field, which protobuf parses in C instead of building every message in Python
+"""
+
+import threading
+from typing import Callable, Iterable, List, Optional
+
+# Wire tag of InternalQueryResponse.measurements (field 3, length-delimited)
+MEASUREMENTS_TAG = bytes([(3 << 3) | 2])
+
+
+def _varint(value: int) -> bytes:
+    """Protobuf base-128 varint encoding"""
+    out = bytearray()
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+class SerializedRowCache:
+    """
+    Row index -> length-prefixed serialized FireMeasurement
+
+    Entries are built on first use (or all at once with preload()) and never
+    change, since rows are immutable once loaded. Concurrent queries may
+    build the same entry twice; both results are identical.
+    """
+
+    def __init__(self, row_count: Callable[[], int], build_row: Callable[[int], object]):
+        """
+        Initialize cache
+
+        Args:
+            row_count: Returns the number of rows in the data model
+            build_row: Builds the FireMeasurement message for a row index
+        """
+        self.row_count = row_count
+        self.build_row = build_row
+        self.entries: List[Optional[bytes]] = []
+        self.lock = threading.Lock()
+
+    def _grow(self):
+        """Make room for rows inserted since the last call"""
+        missing = self.row_count() - len(self.entries)
+        if missing > 0:
+            with self.lock:
+                missing = self.row_count() - len(self.entries)
+                if missing > 0:
+                    self.entries.extend([None] * missing)
+
+    def _entry(self, idx: int) -> bytes:
+        """Length-prefixed serialized row (built on first use)"""
+        entry = self.entries[idx]
+        if entry is None:
+            payload = self.build_row(idx).SerializeToString()
+            entry = _varint(len(payload)) + payload
+            self.entries[idx] = entry
+        return entry
+
+    def preload(self) -> int:
+        """
+        Serialize every row up front
+
+        Returns:
+            Total size of the cached entries in bytes
+        """
+        self._grow()
+        return sum(len(self._entry(idx)) for idx in range(len(self.entries)))
+
+    def encode(self, rows: Iterable[int]) -> bytes:
+        """
+        Wire encoding of InternalQueryResponse.measurements holding the rows
+
+        Args:
+            rows: Row indices, in result order
+
+        Returns:
+            Bytes that parse as an InternalQueryResponse with just those measurements
+        """
+        self._grow()
+        entries = [self._entry(idx) for idx in rows]
+        if not entries:
+            return b''
+        return MEASUREMENTS_TAG + MEASUREMENTS_TAG.join(entries)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Mergeable sketches for approximate aggregates
+HyperLogLog (distinct counts) and KLL (quantiles) are built per process over
+FireColumnModel columns, shipped as bytes in InternalQueryResponse.sketch and
+merged at the leaders and the gateway
+"""
+
+import hashlib
+import math
+import random
+import struct
+from typing import List, Optional
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-count sketch
+
+    Uses 2^precision one-byte registers (4KB at the default precision 12)
+    and a 64-bit blake2b hash, which is stable across processes (unlike the
+    built-in hash()), so sketches from different workers can be merged.
+    Standard error is about 1.04 / sqrt(2^precision), i.e. ~1.6% at 12.
+    """
+
+    def __init__(self, precision: int = 12):
+        """
+        Initialize HyperLogLog
+
+        Args:
+            precision: Number of index bits, 4-16 (default: 12)
+        """
+        self.precision = min(max(precision, 4), 16)
+        self.num_registers = 1 << self.precision
+        self.registers = bytearray(self.num_registers)
+
+    def add(self, value):
+        """Add a value (hashed via its string form)"""
+        digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+        index = hashed >> (64 - self.precision)
+        remaining = (hashed << self.precision) & 0xFFFFFFFFFFFFFFFF
+        # Position of the first 1-bit in the remaining bits (1-based)
+        rank = min(64 - remaining.bit_length() + 1, 64 - self.precision + 1)
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog'):
+        """Merge another sketch of the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError(f"cannot merge HyperLogLog precision {other.precision} into {self.precision}")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def estimate(self) -> float:
+        """Estimated number of distinct values"""
+        m = self.num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            return m * math.log(m / zeros)
+        return raw
+
+    @property
+    def relative_error(self) -> float:
+        """Standard error of the estimate"""
+        return 1.04 / math.sqrt(self.num_registers)
+
+    def to_bytes(self) -> bytes:
+        """Serialize: precision byte followed by the registers"""
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HyperLogLog':
+        """Deserialize a sketch produced by to_bytes()"""
+        sketch = cls(data[0])
+        sketch.registers = bytearray(data[1:])
+        return sketch
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch
+
+    Items live in levels of compactors; an item at level h stands for 2^h
+    input values. When the sketch exceeds its capacity, the lowest full
+    level is sorted and every other item (random offset) is promoted to the
+    next level. Rank error is roughly 1.7 / k (~0.85% at k=200) with
+    O(k log(n/k)) memory, and merging is concatenation plus compaction.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        """
+        Initialize KLL sketch
+
+        Args:
+            k: Accuracy parameter (capacity of the top level) (default: 200)
+            seed: Seed for the compaction coin flips (default: random)
+        """
+        self.k = max(k, 8)
+        self.levels: List[List[float]] = [[]]
+        self.count = 0
+        self.random = random.Random(seed)
+
+    def _capacity(self, level: int) -> int:
+        """Capacity of a level: k at the top, shrinking by 2/3 per level below"""
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _size(self) -> int:
+        return sum(len(level) for level in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def _compress(self):
+        """Compact levels until the sketch fits its capacity"""
+        while self._size() >= self._max_size():
+            for level in range(len(self.levels)):
+                if len(self.levels[level]) >= self._capacity(level):
+                    if level + 1 == len(self.levels):
+                        self.levels.append([])
+                    items = sorted(self.levels[level])
+                    offset = self.random.randint(0, 1)
+                    self.levels[level + 1].extend(items[offset::2])
+                    self.levels[level] = []
+                    break
+
+    def add(self, value: float):
+        """Add a value"""
+        self.levels[0].append(float(value))
+        self.count += 1
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other: 'KLLSketch'):
+        """Merge another sketch into this one"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.count += other.count
+        self._compress()
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile
+
+        Args:
+            q: Quantile in [0, 1]
+
+        Returns:
+            Estimated value, or None if the sketch is empty
+        """
+        weighted = sorted((value, 1 << level) for level, items in enumerate(self.levels) for value in items)
+        if not weighted:
+            return None
+        total = sum(weight for _, weight in weighted)
+        target = min(max(q, 0.0), 1.0) * total
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+    @property
+    def relative_error(self) -> float:
+        """Approximate normalized rank error"""
+        return 1.7 / self.k
+
+    def to_bytes(self) -> bytes:
+        """Serialize: k, count, level count, then each level's size and doubles"""
+        parts = [struct.pack('<IQI', self.k, self.count, len(self.levels))]
+        for items in self.levels:
+            parts.append(struct.pack('<I', len(items)))
+            parts.append(struct.pack(f'<{len(items)}d', *items))
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'KLLSketch':
+        """Deserialize a sketch produced by to_bytes()"""
+        k, count, num_levels = struct.unpack_from('<IQI', data, 0)
+        offset = struct.calcsize('<IQI')
+        sketch = cls(k)
+        sketch.count = count
+        sketch.levels = []
+        for _ in range(num_levels):
+            (size,) = struct.unpack_from('<I', data, offset)
+            offset += 4
+            sketch.levels.append(list(struct.unpack_from(f'<{size}d', data, offset)))
+            offset += 8 * size
+        return sketch
+
+
+# Sketch-backed query types: query_type -> (sketch class, default field)
+SKETCH_QUERY_TYPES = {
+    'distinct_count': (HyperLogLog, 'site_name'),
+    'quantiles': (KLLSketch, 'concentration')
+}
+
+# Quantiles reported when a quantiles query does not list its own
+DEFAULT_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+class SketchAggregator:
+    """
+    Accumulates the sketch for one sketch query across the local scan and
+    neighbor responses
+
+    Stands in for the result buffer on the sketch query path, so it accepts
+    neighbor responses through the same add_response() call.
+    """
+
+    def __init__(self, query_type: str, sketch=None, rows: int = 0):
+        """
+        Initialize aggregator
+
+        Args:
+            query_type: Key of SKETCH_QUERY_TYPES
+            sketch: Local sketch to start from (default: empty sketch)
+            rows: Rows that fed the local sketch (default: 0)
+        """
+        self.query_type = query_type
+        self.sketch_class = SKETCH_QUERY_TYPES[query_type][0]
+        self.sketch = sketch if sketch is not None else self.sketch_class()
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @property
+    def spilled(self) -> bool:
+        """Sketches are small and never spill"""
+        return False
+
+    def add_response(self, response):
+        """Merge a neighbor's InternalQueryResponse sketch"""
+        if response.sketch:
+            self.sketch.merge(self.sketch_class.from_bytes(response.sketch))
+        self.rows += response.aggregated_rows
+
+    def close(self):
+        """Nothing to release (result buffer interface)"""
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Zone maps over row blocks
+Min/max of the numeric columns per block of consecutive rows (one loaded file,
+split at a maximum block size), so range filters skip whole blocks whose
+values cannot match
+"""
+
+from typing import List, Tuple
+
+# Columns tracked per block, in block stats order
+ZONE_COLUMNS = ('datetime', 'aqi', 'concentration', 'latitude', 'longitude')
+
+
+class ZoneMap:
+    """
+    Per-block min/max of datetime, AQI, concentration, latitude and longitude
+
+    Rows are appended in load order; a block ends at a file boundary
+    (seal()) or when it reaches block_rows rows. Files cover narrow time
+    windows, so datetime ranges in particular skip most blocks.
+    """
+
+    def __init__(self, block_rows: int = 4096):
+        """
+        Initialize zone map
+
+        Args:
+            block_rows: Maximum rows per block (default: 4096)
+        """
+        self.block_rows = max(1, block_rows)
+        # [start_row, end_row, (min, max) per ZONE_COLUMNS]
+        self.blocks: List[list] = []
+        self._open = False
+
+    def block_count(self) -> int:
+        """Number of blocks"""
+        return len(self.blocks)
+
+    def add(self, row: int, datetime: str, aqi: int, concentration: float,
+            latitude: float, longitude: float):
+        """Add the next row (rows must arrive in order)"""
+        values = (datetime, aqi, concentration, latitude, longitude)
+        if not self._open or self.blocks[-1][1] - self.blocks[-1][0] >= self.block_rows:
+            self.blocks.append([row, row + 1] + [[value, value] for value in values])
+            self._open = True
+            return
+
+        block = self.blocks[-1]
+        block[1] = row + 1
+        for bounds, value in zip(block[2:], values):
+            if value < bounds[0]:
+                bounds[0] = value
+            elif value > bounds[1]:
+                bounds[1] = value
+
+    def seal(self):
+        """End the current block (the next row starts a new one)"""
+        self._open = False
+
+    def matching_ranges(self, filter_obj) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        Row ranges of the blocks that may hold rows matching a filter's ranges
+
+        Args:
+            filter_obj: QueryFilter (0 / empty bounds are open)
+
+        Returns:
+            Tuple of (merged [start, end) row ranges, number of blocks skipped)
+        """
+        bounds = [
+            (index, low, high) for index, (low, high) in enumerate((
+                (filter_obj.min_datetime, filter_obj.max_datetime),
+                (filter_obj.min_aqi, filter_obj.max_aqi),
+                (filter_obj.min_concentration, filter_obj.max_concentration),
+                (filter_obj.min_latitude, filter_obj.max_latitude),
+                (filter_obj.min_longitude, filter_obj.max_longitude)
+            )) if low or high
+        ]
+
+        ranges = []
+        skipped = 0
+        for block in self.blocks:
+            if any((low and block[2 + index][1] < low) or (high and block[2 + index][0] > high)
+                   for index, low, high in bounds):
+                skipped += 1
+                continue
+            if ranges and ranges[-1][1] == block[0]:
+                ranges[-1] = (ranges[-1][0], block[1])
+            else:
+                ranges.append((block[0], block[1]))
+        return ranges, skipped
@@ -11,6 +11,7 @@ import sys
 import os
 import time
 import threading
+import itertools
 
 # Add proto directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'proto'))
@@ -19,8 +20,27 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'common'))
 
 import fire_service_pb2
 import fire_service_pb2_grpc
-from health_monitor import HealthMonitor, ServerStatus
-from circuit_breaker import CircuitBreaker, CircuitBreakerOpenError
+from health_monitor import HealthBroadcaster, ServerStatus
+from neighbor_fan_out import NeighborFanOut
+from partition_handoff import PartitionHandoff
+from admission_control import AdmissionController, AdmissionRejectedError, PRIORITY_CLASSES, priority_class
+from chunk_scheduler import ChunkScheduler
+from chunk_sizer import ChunkSizer
+from client_quota import ClientQuotaManager, QuotaExceededError
+from compression_policy import CompressionPolicy
+from result_buffer import MemoryBudget, create_result_buffer
+from result_store import ResultStore, ResumeUnavailableError
+from query_engine import SORT_COLUMNS, TOP_K_FIELDS, SKETCH_COLUMNS
+from sketches import DEFAULT_QUANTILES, SKETCH_QUERY_TYPES, SketchAggregator
+from rollups import GROUP_BY_FIELDS, SummaryAccumulator
+from query_profile import QueryProfiler
+
+# Status codes for streams that cannot be resumed
+RESUME_STATUS_CODES = {
+    'not_found': grpc.StatusCode.NOT_FOUND,
+    'out_of_range': grpc.StatusCode.OUT_OF_RANGE,
+    'busy': grpc.StatusCode.FAILED_PRECONDITION
+}
 
 
 class FireQueryServiceImpl(fire_service_pb2_grpc.FireQueryServiceServicer):
@@ -36,38 +56,102 @@ class FireQueryServiceImpl(fire_service_pb2_grpc.FireQueryServiceServicer):
         self.active_requests = {}  # request_id -> {status, start_time, chunks_sent, cancelled}
         self.request_lock = threading.Lock()
         
-        # Initialize health monitor
+        # Own health state pushed to callers' WatchHealth streams
         health_config = config.get('health_monitoring', {})
-        health_check_interval = health_config.get('interval_seconds', 5.0)
-        self.health_monitor = HealthMonitor(self.process_id, health_check_interval)
-        
-        # Register all neighbors for monitoring
-        for neighbor in self.neighbors:
-            self.health_monitor.register_neighbor(neighbor['process_id'])
-        
-        # Initialize circuit breakers
-        self.circuit_breakers = {}
-        cb_config = config.get('circuit_breakers', {})
-        failure_threshold = cb_config.get('failure_threshold', 3)
-        open_timeout = cb_config.get('open_timeout_seconds', 30.0)
-        success_threshold = cb_config.get('success_threshold', 1)
-        
-        for neighbor in self.neighbors:
-            neighbor_id = neighbor['process_id']
-            self.circuit_breakers[neighbor_id] = CircuitBreaker(
-                failure_threshold=failure_threshold,
-                open_timeout=open_timeout,
-                success_threshold=success_threshold,
-                name=f"{self.process_id}->{neighbor_id}"
-            )
+        self.heartbeat_interval = health_config.get('heartbeat_interval_seconds', 0.25)
+        self.health_broadcaster = HealthBroadcaster(self.process_id)
+        
+        # Fan-out to the team leaders: pooled channels, health monitoring, circuit
+        # breakers, retry budget and adaptive deadlines (shared with the leaders)
+        self.fan_out = NeighborFanOut(self.process_id, config, neighbor_label="Team Leader")
+        
+        # Partition assignment versions: queries are stamped with the current epoch and
+        # routed to the leaders whose partitions can match; ReassignPartitions changes them
+        self.partition_handoff = PartitionHandoff(self.process_id, None, self.fan_out, config)
+        self.reassign_lock = threading.Lock()
+        
+        # Admission control: bounded, adaptive concurrency for client queries
+        admission_config = config.get('admission_control', {})
+        self.admission_enabled = admission_config.get('enabled', False)
+        self.admission_controller = AdmissionController(
+            initial_limit=admission_config.get('initial_limit', 8),
+            min_limit=admission_config.get('min_limit', 1),
+            max_limit=admission_config.get('max_limit', 32),
+            max_queue=admission_config.get('max_queue', 16),
+            queue_timeout=admission_config.get('queue_timeout_seconds', 2.0),
+            latency_target=admission_config.get('latency_target_seconds', 5.0),
+            backoff_ratio=admission_config.get('backoff_ratio', 0.9),
+            priority_shares=admission_config.get('priority_shares'),
+            max_preempt_pause=admission_config.get('max_preempt_pause_seconds', 1.0),
+            name=self.process_id
+        )
+        
+        # Fair chunk scheduling across concurrent streams (weighted by client)
+        scheduler_config = config.get('chunk_scheduler', {})
+        self.scheduler_enabled = scheduler_config.get('enabled', False)
+        self.chunk_scheduler = ChunkScheduler(
+            max_concurrent_sends=scheduler_config.get('max_concurrent_sends', 2),
+            client_weights=scheduler_config.get('client_weights', {}),
+            default_weight=scheduler_config.get('default_weight', 1.0),
+            max_hold_seconds=scheduler_config.get('max_hold_seconds', 1.0),
+            name=self.process_id
+        )
+        self._flow_sequence = itertools.count()
+        
+        # Rows per chunk from byte/time targets when the client sets no chunk size
+        chunking_config = config.get('adaptive_chunking', {})
+        self.chunk_sizer = ChunkSizer(
+            enabled=chunking_config.get('enabled', False),
+            target_bytes=chunking_config.get('target_chunk_bytes', 1024 * 1024),
+            target_seconds=chunking_config.get('target_chunk_seconds', 0.2),
+            max_bytes=chunking_config.get('max_chunk_bytes', 3 * 1024 * 1024),
+            min_rows=chunking_config.get('min_rows', 100),
+            max_rows=chunking_config.get('max_rows', 50000),
+            initial_rows=chunking_config.get('initial_rows', 1000),
+            growth_factor=chunking_config.get('growth_factor', 4.0),
+            name=self.process_id
+        )
+        
+        # Streamed results kept for a while so broken streams resume from a chunk
+        resume_config = config.get('resumable_streams', {})
+        self.result_store = ResultStore(
+            enabled=resume_config.get('enabled', False),
+            retention_seconds=resume_config.get('retention_seconds', 300.0),
+            max_requests=resume_config.get('max_retained_requests', 16),
+            name=self.process_id
+        )
+        self.resume_takeover_seconds = resume_config.get('takeover_seconds', 5.0)
+        
+        # Per-message compression of large chunks streamed to clients on other hosts
+        self.compression = CompressionPolicy(self.process_id, config.get('compression'), [config['hostname']])
+        
+        # Memory budget for buffered results (requests over their share spill to disk)
+        memory_config = config.get('memory_budget', {})
+        self.memory_budget = MemoryBudget(
+            max_bytes=memory_config.get('max_buffered_bytes', 256 * 1024 * 1024),
+            max_request_fraction=memory_config.get('max_request_fraction', 0.5),
+            name=self.process_id
+        ) if memory_config.get('enabled', False) else None
+        self.spill_directory = memory_config.get('spill_directory')
+        
+        # Per-client quotas (requests/s, concurrent streams, result bytes/s)
+        quota_config = config.get('client_quotas', {})
+        self.quotas_enabled = quota_config.get('enabled', False)
+        self.client_quotas = ClientQuotaManager(
+            default_limits=quota_config.get('default', {}),
+            client_limits=quota_config.get('clients', {}),
+            name=self.process_id,
+            max_clients=quota_config.get('max_tracked_clients', 10000),
+            idle_seconds=quota_config.get('idle_seconds', 300.0)
+        )
         
         print(f"[{self.process_id}] Initialized as {self.role}")
         print(f"[{self.process_id}] Neighbors: {[n['process_id'] for n in self.neighbors]}")
-        print(f"[{self.process_id}] Health monitoring initialized for {len(self.neighbors)} neighbors")
-        print(f"[{self.process_id}] Circuit breakers initialized for {len(self.circuit_breakers)} neighbors")
+        print(f"[{self.process_id}] Health monitoring initialized for {len(self.fan_out.neighbors)} neighbors")
+        print(f"[{self.process_id}] Circuit breakers initialized for {len(self.fan_out.circuit_breakers)} neighbors")
         
         # Start health monitoring
-        self._start_health_monitoring()
+        self.fan_out.start_health_monitoring()
     
     def Query(self, request, context):
         """
@@ -76,88 +160,237 @@ class FireQueryServiceImpl(fire_service_pb2_grpc.FireQueryServiceServicer):
         """
         request_id = request.request_id
         start_time = time.time()
+        client_id = self._get_client_id(context)
+        profiler = QueryProfiler(self.process_id, self.role)
         
-        print(f"[{self.process_id}] Received query request_id={request_id}")
+        print(f"[{self.process_id}] Received query request_id={request_id} from client {client_id}")
+        if request.resume:
+            yield from self._resume_stream(request, context, client_id)
+            return
         print(f"  Query type: {request.query_type}")
         print(f"  Parameters: {list(request.filter.parameters)}")
-        print(f"  Chunk size: {request.max_results_per_chunk}")
+        print(f"  Chunk size: {request.max_results_per_chunk or ('adaptive' if self.chunk_sizer.enabled else 'default')}")
+        print(f"  Priority: {priority_class(request.priority)}")
+        if request.limit > 0:
+            print(f"  Limit: {request.limit}")
+        if request.order_by:
+            print(f"  Order by: {request.order_by} {'desc' if request.order_descending else 'asc'}")
+        if request.profile or request.profile_only:
+            print(f"  Profile: {'only (results discarded)' if request.profile_only else 'with results'}")
         
-        # Register request
-        with self.request_lock:
-            self.active_requests[request_id] = {
-                'status': 'processing',
-                'start_time': start_time,
-                'chunks_sent': 0,
-                'total_chunks': 0,
-                'cancelled': False
-            }
+        if request.order_by and request.order_by not in SORT_COLUMNS:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT,
+                          f"order_by must be one of {sorted(SORT_COLUMNS)}, got '{request.order_by}'")
+        
+        if request.query_type == 'top_k':
+            # Top-k: the k largest values of order_by (default aqi). Workers keep a
+            # local heap; leaders and gateway merge the sorted partial results.
+            if request.limit <= 0:
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT, "top_k queries need limit > 0 (k)")
+            if request.order_by and request.order_by not in TOP_K_FIELDS:
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT,
+                              f"top_k ranks by one of {list(TOP_K_FIELDS)}, got '{request.order_by}'")
+            normalized = fire_service_pb2.QueryRequest()
+            normalized.CopyFrom(request)
+            normalized.order_by = request.order_by or 'aqi'
+            normalized.order_descending = True
+            request = normalized
+        elif request.query_type in SKETCH_QUERY_TYPES:
+            # Approximate aggregates: each process sketches one column of its matching
+            # rows, leaders and gateway merge the sketches, the client gets one chunk
+            fields = SKETCH_COLUMNS[request.query_type]
+            if request.aggregate_field and request.aggregate_field not in fields:
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT,
+                              f"{request.query_type} aggregates one of {sorted(fields)}, "
+                              f"got '{request.aggregate_field}'")
+            if any(q < 0.0 or q > 1.0 for q in request.quantiles):
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT, "quantiles must be within [0, 1]")
+            normalized = fire_service_pb2.QueryRequest()
+            normalized.CopyFrom(request)
+            normalized.aggregate_field = request.aggregate_field or SKETCH_QUERY_TYPES[request.query_type][1]
+            if request.query_type == 'quantiles' and not request.quantiles:
+                normalized.quantiles.extend(DEFAULT_QUANTILES)
+            normalized.limit = 0
+            normalized.order_by = ''
+            request = normalized
+            print(f"  Aggregate: {request.query_type}({request.aggregate_field})")
+        elif request.query_type == 'summary':
+            # Exact grouped count/min/max/sum, answered from rollups where the filter aligns
+            invalid = [field for field in request.group_by if field not in GROUP_BY_FIELDS]
+            if invalid:
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT,
+                              f"summary groups by {list(GROUP_BY_FIELDS)}, got {invalid}")
+            normalized = fire_service_pb2.QueryRequest()
+            normalized.CopyFrom(request)
+            normalized.limit = 0
+            normalized.order_by = ''
+            request = normalized
+            print(f"  Group by: {list(request.group_by)}")
         
+        # Per-client quota: checked before admission so an abusive client
+        # cannot occupy the shared queue
+        if self.quotas_enabled:
+            try:
+                self.client_quotas.start_stream(client_id)
+            except QuotaExceededError as e:
+                retry_after_ms = int(e.retry_after * 1000)
+                print(f"[{self.process_id}] 🚫 Quota exceeded for request {request_id}: {e} (retry after {retry_after_ms}ms)")
+                context.set_trailing_metadata((('retry-after-ms', str(retry_after_ms)),))
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, f"Quota exceeded: {e}")
+        
+        # Admission control: wait for a slot in the request's priority class or
+        # reject fast with a retry-after hint
+        queue_wait = self._admit(request, context, client_id)
+        admitted_time = time.time()
+        processing_time = None
+        failed = False
+        retained = None
+        results = None
+        
+        # Everything after admission runs inside the try so its finally always
+        # returns the admission slot and the quota stream
         try:
+            if queue_wait is not None:
+                if queue_wait > 0:
+                    print(f"[{self.process_id}] Request {request_id} admitted after {queue_wait:.2f}s in queue")
+                profiler.add('queue_wait', queue_wait * 1000)
+            
+            # Register request
+            with self.request_lock:
+                self.active_requests[request_id] = {
+                    'status': 'processing',
+                    'start_time': start_time,
+                    'chunks_sent': 0,
+                    'total_chunks': 0,
+                    'cancelled': False
+                }
+            
+            # Aggregated results (spill to disk beyond this request's memory share;
+            # sorted queries keep one run per leader and merge them while streaming;
+            # sketch and summary queries only merge the leaders' partial aggregates)
+            sketch_query = request.query_type in SKETCH_QUERY_TYPES
+            summary_query = request.query_type == 'summary'
+            if sketch_query:
+                results = SketchAggregator(request.query_type)
+            elif summary_query:
+                results = SummaryAccumulator(request.group_by)
+            else:
+                results = create_result_buffer(request, self.memory_budget, self.spill_directory,
+                                               name=f"{self.process_id}-{request_id}")
+            
             # Forward query to Team Leaders (B and E) and aggregate results
-            all_measurements = self.forward_to_team_leaders(request)
+            unavailable_processes = self.forward_to_team_leaders(request, results, profiler)
+            # Fan-out latency drives the adaptive limit (streaming time depends on the client)
+            processing_time = time.time() - admitted_time
+            if unavailable_processes:
+                print(f"[{self.process_id}] ⚠️ Partial result for {request_id}: missing data from {unavailable_processes}")
             
             # Check if cancelled before streaming
             if self._is_cancelled(request_id):
                 print(f"[{self.process_id}] Request {request_id} cancelled before streaming")
                 return
             
-            print(f"[{self.process_id}] Aggregated {len(all_measurements)} total measurements")
+            print(f"[{self.process_id}] Aggregated {len(results)} total measurements"
+                  f"{' (spilled to disk)' if results.spilled else ''}")
             
-            # Split results into chunks
-            max_per_chunk = request.max_results_per_chunk if request.max_results_per_chunk > 0 else 1000
-            total_results = len(all_measurements)
+            # Split results into chunks (adaptive streams re-estimate total_chunks as they go)
+            chunk_stream = self.chunk_sizer.start_stream(request.max_results_per_chunk)
+            total_results = len(results)
+            max_per_chunk = chunk_stream.next_rows()
             total_chunks = (total_results + max_per_chunk - 1) // max_per_chunk if total_results > 0 else 1
+            if sketch_query or summary_query or request.profile_only:
+                total_chunks = 1
+            profiler.rows_returned = total_results
             
             # Update total chunks
             with self.request_lock:
                 if request_id in self.active_requests:
                     self.active_requests[request_id]['total_chunks'] = total_chunks
             
-            if total_results == 0:
+            if request.profile_only:
+                # EXPLAIN ANALYZE: the query ran everywhere, return only the timing tree
+                chunk = fire_service_pb2.QueryResponseChunk(
+                    request_id=request_id,
+                    chunk_number=0,
+                    is_last_chunk=True,
+                    total_chunks=1,
+                    total_results=total_results,
+                    is_partial=bool(unavailable_processes),
+                    unavailable_processes=unavailable_processes,
+                    profile=profiler.to_proto()
+                )
+                print(f"[{self.process_id}] Sending profile for {total_results} results ({chunk.ByteSize()} bytes)")
+                yield chunk
+                self._update_chunks_sent(request_id, 1)
+            elif sketch_query:
+                # Approximate aggregate: one small chunk instead of the matching rows
+                chunk = fire_service_pb2.QueryResponseChunk(
+                    request_id=request_id,
+                    chunk_number=0,
+                    is_last_chunk=True,
+                    total_chunks=1,
+                    total_results=total_results,
+                    is_partial=bool(unavailable_processes),
+                    unavailable_processes=unavailable_processes,
+                    aggregate=self._aggregate_result(request, results)
+                )
+                if request.profile:
+                    chunk.profile.CopyFrom(profiler.to_proto())
+                print(f"[{self.process_id}] Sending {request.query_type} result over {total_results} rows "
+                      f"({chunk.ByteSize()} bytes)")
+                yield chunk
+                self._update_chunks_sent(request_id, 1)
+            elif summary_query:
+                # Grouped summaries are small: send them in one chunk
+                chunk = fire_service_pb2.QueryResponseChunk(
+                    request_id=request_id,
+                    chunk_number=0,
+                    is_last_chunk=True,
+                    total_chunks=1,
+                    total_results=total_results,
+                    is_partial=bool(unavailable_processes),
+                    unavailable_processes=unavailable_processes,
+                    summaries=results.to_rows()
+                )
+                if request.profile:
+                    chunk.profile.CopyFrom(profiler.to_proto())
+                print(f"[{self.process_id}] Sending {total_results} summary groups ({chunk.ByteSize()} bytes)")
+                yield chunk
+                self._update_chunks_sent(request_id, 1)
+            elif total_results == 0:
                 # Return empty result
                 chunk = fire_service_pb2.QueryResponseChunk(
                     request_id=request_id,
                     chunk_number=0,
                     is_last_chunk=True,
                     total_chunks=1,
-                    total_results=0
+                    total_results=0,
+                    is_partial=bool(unavailable_processes),
+                    unavailable_processes=unavailable_processes
                 )
+                if request.profile:
+                    chunk.profile.CopyFrom(profiler.to_proto())
                 print(f"[{self.process_id}] Sending chunk 0/1 (empty result)")
                 yield chunk
                 self._update_chunks_sent(request_id, 1)
             else:
-                # Send results in chunks
-                for chunk_idx in range(total_chunks):
-                    # Check for cancellation before each chunk
-                    if self._is_cancelled(request_id):
-                        print(f"[{self.process_id}] Request {request_id} cancelled at chunk {chunk_idx}/{total_chunks}")
-                        break
-                    
-                    # Check if client disconnected
-                    if context.is_active() == False:
-                        print(f"[{self.process_id}] Client disconnected for request {request_id}")
-                        self._mark_cancelled(request_id)
-                        break
-                    
-                    start_idx = chunk_idx * max_per_chunk
-                    end_idx = min(start_idx + max_per_chunk, total_results)
-                    chunk_measurements = all_measurements[start_idx:end_idx]
-                    
-                    chunk = fire_service_pb2.QueryResponseChunk(
-                        request_id=request_id,
-                        chunk_number=chunk_idx,
-                        is_last_chunk=(chunk_idx == total_chunks - 1),
-                        total_chunks=total_chunks,
-                        total_results=total_results
-                    )
-                    chunk.measurements.extend(chunk_measurements)
-                    
-                    print(f"[{self.process_id}] Sending chunk {chunk_idx + 1}/{total_chunks} with {len(chunk_measurements)} measurements")
-                    yield chunk
-                    self._update_chunks_sent(request_id, chunk_idx + 1)
-                    
-                    # Small delay to simulate progressive streaming
-                    time.sleep(0.01)
+                # Send results in chunks, interleaved fairly with other active streams
+                flow_id = f"{request_id}-{next(self._flow_sequence)}"
+                if self.scheduler_enabled:
+                    weight = self.chunk_scheduler.register(flow_id, client_id)
+                    print(f"[{self.process_id}] Stream {flow_id} scheduled with weight {weight}")
+                
+                # Keep the results (and chunk boundaries) so the stream can be resumed
+                if self.result_store.enabled:
+                    retained = self.result_store.retain(request_id, client_id, results, unavailable_processes)
+                chunk_offsets = retained.chunk_offsets if retained is not None else [0]
+                
+                try:
+                    yield from self._stream_chunks(request, context, client_id, flow_id, results,
+                                                   chunk_stream, unavailable_processes, profiler, chunk_offsets)
+                finally:
+                    if self.scheduler_enabled:
+                        self.chunk_scheduler.unregister(flow_id)
             
             # Mark as completed
             elapsed = time.time() - start_time
@@ -167,80 +400,286 @@ class FireQueryServiceImpl(fire_service_pb2_grpc.FireQueryServiceServicer):
         except Exception as e:
             print(f"[{self.process_id}] Error processing request {request_id}: {e}")
             self._mark_failed(request_id)
+            failed = True
             raise
         finally:
+            # Retained results stay open for resumes (released only after the status is final)
+            if retained is not None:
+                self.result_store.release(retained)
+            elif results is not None:
+                results.close()
+            # Client cancellation/disconnect is not a server failure
+            self._release_admission(request, client_id, admitted_time, processing_time, failed)
             # Cleanup after delay
-            threading.Timer(60.0, lambda: self._cleanup_request(request_id)).start()
+            threading.Timer(60.0, lambda: self._cleanup_request(request_id, start_time)).start()
     
-    def forward_to_team_leaders(self, request):
+    def _resume_stream(self, request, context, client_id):
         """
-        Forward query to Team Leaders (B and E) and aggregate results
-        Returns list of all measurements from both teams
+        Resend a retained result stream from request.resume_from_chunk
+        
+        The results were kept by an earlier Query with the same request_id
+        from the same client, so no team leader is queried again. Chunks
+        already sent keep their boundaries and numbers; the remaining ones
+        are sized for this stream (max_results_per_chunk or adaptive).
         """
-        all_measurements = []
+        request_id = request.request_id
+        start_time = time.time()
+        print(f"[{self.process_id}] Resuming request {request_id} from chunk {request.resume_from_chunk}")
+        if not self.result_store.enabled:
+            context.abort(grpc.StatusCode.FAILED_PRECONDITION, "Resumable streams are disabled")
         
-        # Create internal query request
-        internal_request = fire_service_pb2.InternalQueryRequest(
-            request_id=request.request_id,
-            original_request_id=str(request.request_id),
-            filter=request.filter,
+        if self.quotas_enabled:
+            try:
+                self.client_quotas.start_stream(client_id)
+            except QuotaExceededError as e:
+                retry_after_ms = int(e.retry_after * 1000)
+                print(f"[{self.process_id}] 🚫 Quota exceeded for resumed request {request_id}: {e} (retry after {retry_after_ms}ms)")
+                context.set_trailing_metadata((('retry-after-ms', str(retry_after_ms)),))
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, f"Quota exceeded: {e}")
+        
+        # Resumed streams hold a slot like any other query
+        queue_wait = self._admit(request, context, client_id)
+        admitted_time = time.time()
+        processing_time = None
+        failed = False
+        retained = None
+        
+        try:
+            if queue_wait:
+                print(f"[{self.process_id}] Resumed request {request_id} admitted after {queue_wait:.2f}s in queue")
+            
+            # A client resumes once it gave up on its stream: stop the old one if it still runs
+            with self.request_lock:
+                previous = self.active_requests.get(request_id)
+                if previous is not None and previous['status'] == 'processing':
+                    previous['cancelled'] = True
+                    previous['status'] = 'cancelled'
+            
+            try:
+                retained = self.result_store.acquire(request_id, client_id, request.resume_from_chunk,
+                                                     wait=self.resume_takeover_seconds)
+            except ResumeUnavailableError as e:
+                print(f"[{self.process_id}] Cannot resume request {request_id}: {e}")
+                context.abort(RESUME_STATUS_CODES[e.reason], str(e))
+            # No fan-out: the time to take over the retained results drives the adaptive limit
+            processing_time = time.time() - admitted_time
+            
+            with self.request_lock:
+                self.active_requests[request_id] = {
+                    'status': 'processing',
+                    'start_time': start_time,
+                    'chunks_sent': request.resume_from_chunk,
+                    'total_chunks': 0,
+                    'cancelled': False
+                }
+            
+            flow_id = f"{request_id}-{next(self._flow_sequence)}"
+            if self.scheduler_enabled:
+                self.chunk_scheduler.register(flow_id, client_id)
+            try:
+                print(f"[{self.process_id}] Resending rows {retained.chunk_offsets[request.resume_from_chunk]}"
+                      f"-{retained.total_results} of request {request_id}")
+                chunk_stream = self.chunk_sizer.start_stream(request.max_results_per_chunk)
+                yield from self._stream_chunks(request, context, client_id, flow_id, retained.results,
+                                               chunk_stream, retained.unavailable_processes,
+                                               QueryProfiler(self.process_id, self.role),
+                                               retained.chunk_offsets, request.resume_from_chunk)
+                print(f"[{self.process_id}] Resumed request {request_id} completed in {time.time() - start_time:.2f}s")
+                self._mark_completed(request_id)
+            except Exception as e:
+                print(f"[{self.process_id}] Error resuming request {request_id}: {e}")
+                self._mark_failed(request_id)
+                failed = True
+                raise
+            finally:
+                if self.scheduler_enabled:
+                    self.chunk_scheduler.unregister(flow_id)
+                threading.Timer(60.0, lambda: self._cleanup_request(request_id, start_time)).start()
+        finally:
+            if retained is not None:
+                self.result_store.release(retained)
+            self._release_admission(request, client_id, admitted_time, processing_time, failed)
+    
+    def _admit(self, request, context, client_id):
+        """
+        Wait for an admission slot in the request's priority class
+        Aborts with RESOURCE_EXHAUSTED and a retry-after hint (ending the
+        client's quota stream) when the controller rejects the request
+        Returns seconds spent queued, or None when admission control is disabled
+        """
+        if not self.admission_enabled:
+            return None
+        try:
+            return self.admission_controller.acquire(request.priority)
+        except AdmissionRejectedError as e:
+            if self.quotas_enabled:
+                self.client_quotas.end_stream(client_id)
+            retry_after_ms = int(e.retry_after * 1000)
+            print(f"[{self.process_id}] 🚫 Rejected request {request.request_id}: {e} (retry after {retry_after_ms}ms)")
+            context.set_trailing_metadata((('retry-after-ms', str(retry_after_ms)),))
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, f"Gateway overloaded: {e}")
+    
+    def _release_admission(self, request, client_id, admitted_time, processing_time, failed):
+        """
+        Return the admission slot and quota stream taken for a request
+        processing_time (fan-out latency, None if it never finished) adapts the
+        concurrency limit; failed marks server-side failures
+        """
+        if self.admission_enabled:
+            if processing_time is None:
+                processing_time = time.time() - admitted_time
+            self.admission_controller.release(processing_time, not failed, request.priority)
+        if self.quotas_enabled:
+            self.client_quotas.end_stream(client_id)
+    
+    def _aggregate_result(self, request, aggregator):
+        """Build the AggregateResult for a sketch query from the merged sketch"""
+        sketch = aggregator.sketch
+        result = fire_service_pb2.AggregateResult(
             query_type=request.query_type,
-            requesting_process=self.process_id
+            field=request.aggregate_field,
+            relative_error=sketch.relative_error,
+            input_rows=aggregator.rows
         )
+        if request.query_type == 'distinct_count':
+            result.estimate = round(sketch.estimate()) if aggregator.rows else 0
+        else:
+            result.quantiles.extend(request.quantiles)
+            if aggregator.rows:
+                result.values.extend(sketch.quantile(q) for q in request.quantiles)
+        return result
+    
+    def _stream_chunks(self, request, context, client_id, flow_id, results, chunk_stream,
+                       unavailable_processes, profiler, chunk_offsets, first_chunk=0):
+        """
+        Yield result chunks for one request
         
-        # Forward to each team leader
-        for neighbor in self.neighbors:
-            neighbor_id = neighbor['process_id']
-            neighbor_address = f"{neighbor['hostname']}:{neighbor['port']}"
+        Each chunk's row count comes from the chunk stream (the client's
+        max_results_per_chunk, or adapted to the byte and time targets from
+        the chunks sent so far, capped at max_chunk_bytes). Streaming starts
+        at chunk first_chunk, whose first row is chunk_offsets[first_chunk];
+        the first row of the next chunk is appended to chunk_offsets as each
+        chunk is built, so a later resume can find it. The chunk is then
+        paced to the client's bytes/s quota and waits for its turn in the
+        chunk scheduler before it is handed to gRPC, giving the send slot back
+        once gRPC has taken it. Adaptive streams report an estimated
+        total_chunks that is exact on the last chunk. Profiled queries get the
+        timing tree on the last chunk. Chunks to clients on other hosts are
+        compressed when they are large enough.
+        """
+        request_id = request.request_id
+        total_results = len(results)
+        rows_sent = chunk_offsets[first_chunk]
+        del chunk_offsets[first_chunk + 1:]
+        rows = itertools.chain.from_iterable(results.iter_batches(self.chunk_sizer.default_rows))
+        rows = itertools.islice(rows, rows_sent, None)
+        stream_start = time.time()
+        compressing = self.compression.start_stream(context)
+        chunk_idx = first_chunk
+        
+        while rows_sent < total_results:
+            # Check for cancellation before each chunk
+            if self._is_cancelled(request_id):
+                print(f"[{self.process_id}] Request {request_id} cancelled at chunk {chunk_idx}")
+                break
             
-            print(f"[{self.process_id}] 📤 Forwarding query to Team Leader {neighbor_id} at {neighbor_address}")
+            # Check if client disconnected
+            if context.is_active() == False:
+                print(f"[{self.process_id}] Client disconnected for request {request_id}")
+                self._mark_cancelled(request_id)
+                break
             
-            # Check circuit breaker state before attempting call
-            cb_state = self.circuit_breakers[neighbor_id].get_state()
-            if cb_state.value == "open":
-                stats = self.circuit_breakers[neighbor_id].get_stats()
-                time_since_failure = stats.get('time_since_last_failure', 0)
-                print(f"[{self.process_id}] ⏭️ Circuit breaker OPEN for {neighbor_id}, skipping call (fail-fast)")
-                if time_since_failure:
-                    print(f"[{self.process_id}]    Circuit opened {time_since_failure:.1f}s ago (needs {self.circuit_breakers[neighbor_id].open_timeout}s to recover)")
-                continue
+            build_start = time.perf_counter()
+            chunk_rows = chunk_stream.next_rows()
+            with profiler.stage('merge'):
+                chunk_measurements = list(itertools.islice(rows, chunk_rows))
+            is_last_chunk = not chunk_measurements or rows_sent + len(chunk_measurements) >= total_results
             
-            try:
-                # Wrap gRPC call with circuit breaker
-                start_time = time.time()
-                response = self.circuit_breakers[neighbor_id].call(
-                    lambda: self._make_grpc_call(neighbor_address, internal_request)
+            # Estimate of the chunks still to come at the current size
+            remaining = total_results - rows_sent - len(chunk_measurements)
+            total_chunks = chunk_idx + 1 + (0 if is_last_chunk else -(-remaining // chunk_rows))
+            
+            with profiler.stage('proto_build'):
+                chunk = fire_service_pb2.QueryResponseChunk(
+                    request_id=request_id,
+                    chunk_number=chunk_idx,
+                    is_last_chunk=is_last_chunk,
+                    total_chunks=total_chunks,
+                    total_results=total_results,
+                    is_partial=bool(unavailable_processes),
+                    unavailable_processes=unavailable_processes
                 )
-                elapsed = time.time() - start_time
-                
-                # Collect measurements
-                measurements_count = len(response.measurements)
-                all_measurements.extend(response.measurements)
-                print(f"[{self.process_id}] ✅ Received {measurements_count} measurements from {neighbor_id} in {elapsed:.2f}s")
-                
-            except CircuitBreakerOpenError:
-                # Circuit is OPEN - fail fast, skip call
-                print(f"[{self.process_id}] Circuit breaker OPEN for {neighbor_id}, skipping call (fail-fast)")
-            except grpc.RpcError as e:
-                # gRPC error - circuit breaker records failure automatically
-                error_code = e.code()
-                error_details = e.details()
-                # Get failure count after circuit breaker records it
-                stats = self.circuit_breakers[neighbor_id].get_stats()
-                failure_count = stats.get('failure_count', 0)
-                print(f"[{self.process_id}] ❌ Error contacting {neighbor_id}: {error_code}: {error_details}")
-                print(f"[{self.process_id}]    Circuit breaker {neighbor_id} failure count: {failure_count}/3")
-                if error_code == grpc.StatusCode.DEADLINE_EXCEEDED:
-                    print(f"[{self.process_id}] ⚠️ TIMEOUT detected for {neighbor_id} - this may cause cascading failure")
-                elif error_code == grpc.StatusCode.UNAVAILABLE:
-                    print(f"[{self.process_id}] ⚠️ UNAVAILABLE for {neighbor_id} - server may be down")
-            except Exception as e:
-                # Other errors - circuit breaker records failure automatically
-                failure_count = self.circuit_breakers[neighbor_id].failure_count
-                print(f"[{self.process_id}] Unexpected error contacting {neighbor_id}: {type(e).__name__}: {e}")
-                print(f"[{self.process_id}] Circuit breaker {neighbor_id} failure count: {failure_count + 1}/3")
+                chunk.measurements.extend(chunk_measurements)
+            
+            if chunk.is_last_chunk and request.profile:
+                profiler.add('stream', (time.time() - stream_start) * 1000)
+                chunk.profile.CopyFrom(profiler.to_proto())
+            
+            chunk_bytes = chunk.ByteSize()
+            build_seconds = time.perf_counter() - build_start
+            # Record where the next chunk starts before this one can reach the client
+            chunk_offsets.append(rows_sent + len(chunk_measurements))
+            
+            # Pace to the client's byte quota (without holding a send slot)
+            if self.quotas_enabled:
+                throttled = self.client_quotas.throttle_bytes(client_id, chunk_bytes)
+                if throttled > 0.5:
+                    print(f"[{self.process_id}] Throttled {client_id} for {throttled:.2f}s (bytes/s quota)")
+            
+            # Wait for this stream's turn to emit (fair across concurrent streams)
+            if self.scheduler_enabled:
+                self.chunk_scheduler.acquire(flow_id, chunk_bytes)
+            try:
+                print(f"[{self.process_id}] Sending chunk {chunk_idx + 1}/{total_chunks} with "
+                      f"{len(chunk_measurements)} measurements ({chunk_bytes / 1024:.0f} KiB)")
+                self.compression.stream_message(context, chunk, compressing, chunk_bytes)
+                send_start = time.perf_counter()
+                yield chunk
+                send_seconds = time.perf_counter() - send_start
+            finally:
+                if self.scheduler_enabled:
+                    self.chunk_scheduler.release(flow_id)
+            chunk_stream.record(len(chunk_measurements), chunk_bytes, build_seconds, send_seconds)
+            rows_sent += len(chunk_measurements)
+            chunk_idx += 1
+            self._update_chunks_sent(request_id, chunk_idx, total_chunks)
+            if is_last_chunk:
+                break
+            
+            # Small delay to simulate progressive streaming
+            time.sleep(0.01)
+    
+    def forward_to_team_leaders(self, request, results, profiler):
+        """
+        Forward query to Team Leaders (B and E) and aggregate results into
+        the given result buffer (or SketchAggregator / SummaryAccumulator)
+        Records each leader's call in the profiler (its QueryProfile when requested)
+        Returns list of processes whose data is missing because they or their
+        workers could not be reached
+        """
+        # Plan against the current partition assignment (every process answers from it)
+        version = self.partition_handoff.current()
         
-        return all_measurements
+        # Create internal query request
+        internal_request = fire_service_pb2.InternalQueryRequest(
+            request_id=request.request_id,
+            original_request_id=str(request.request_id),
+            filter=request.filter,
+            query_type=request.query_type,
+            requesting_process=self.process_id,
+            priority=request.priority,
+            limit=request.limit,
+            order_by=request.order_by,
+            order_descending=request.order_descending,
+            aggregate_field=request.aggregate_field,
+            quantiles=request.quantiles,
+            group_by=request.group_by,
+            profile=request.profile or request.profile_only,
+            partition_epoch=version.epoch
+        )
+        
+        # Forward to each team leader (partition routing, LIMIT pushdown, circuit breakers, retries)
+        return self.fan_out.forward(internal_request, results, profiler, version.routes)
     
     def CancelRequest(self, request, context):
         """Handle request cancellation"""
@@ -300,68 +739,84 @@ class FireQueryServiceImpl(fire_service_pb2_grpc.FireQueryServiceServicer):
                     total_chunks=0
                 )
     
+    def GetStats(self, request, context):
+        """
+        Report per-client quota counters plus admission, scheduler and neighbor stats
+        """
+        response = fire_service_pb2.StatsResponse(
+            process_id=self.process_id,
+            timestamp=int(time.time())
+        )
+        for client_id, stats in self.client_quotas.get_stats(request.client_id or None).items():
+            response.clients.add(
+                client_id=client_id,
+                active_streams=stats['active_streams'],
+                requests_allowed=stats['requests_allowed'],
+                rejected_rate=stats['rejected_rate'],
+                rejected_concurrency=stats['rejected_concurrency'],
+                bytes_sent=stats['bytes_sent'],
+                throttled_seconds=stats['throttled_seconds']
+            )
+        
+        details = {
+            'admission': self.admission_controller.get_stats(),
+            'memory_budget': self.memory_budget.get_stats() if self.memory_budget is not None else None,
+            'chunk_scheduler': self.chunk_scheduler.get_stats(),
+            'chunk_sizer': self.chunk_sizer.get_stats(),
+            'result_store': self.result_store.get_stats(),
+            'compression': self.compression.get_stats(),
+            'partitions': self.partition_handoff.get_stats(),
+            **self.fan_out.get_stats()
+        }
+        response.details_json = json.dumps(details, default=str)
+        return response
+    
+    def ReassignPartitions(self, request, context):
+        """
+        Move or split partitions between processes and relink them without restarts
+        Prepared on every process, then committed (or aborted everywhere); one at a time
+        """
+        print(f"[{self.process_id}] Partition reassignment from {self._get_client_id(context)}: "
+              f"{len(request.moves)} moves, {len(request.add_links)} new links, "
+              f"{len(request.remove_links)} removed links")
+        
+        if not self.reassign_lock.acquire(blocking=False):
+            context.abort(grpc.StatusCode.ABORTED, "Another partition reassignment is in progress")
+        try:
+            return self.partition_handoff.coordinate(request)
+        finally:
+            self.reassign_lock.release()
+    
     def HealthCheck(self, request, context):
         """
         Handle health check requests from other servers
         Returns current health status of this server
         """
+        return self._health_response(self.health_broadcaster.get_status())
+    
+    def WatchHealth(self, request, context):
+        """
+        Stream this server's health: state changes immediately, heartbeats otherwise
+        """
+        interval = self.heartbeat_interval
+        if request.heartbeat_interval_ms > 0:
+            interval = max(request.heartbeat_interval_ms / 1000.0, 0.05)
+        
+        version = -1
+        while context.is_active():
+            version, status = self.health_broadcaster.wait_for_change(version, interval)
+            yield self._health_response(status)
+    
+    def _health_response(self, status):
+        """Build HealthResponse for the given own ServerStatus"""
         return fire_service_pb2.HealthResponse(
-            healthy=True,
-            status="healthy",
+            healthy=(status != ServerStatus.UNAVAILABLE),
+            status=status.value,
             timestamp=int(time.time()),
             process_id=self.process_id,
             role=self.role
         )
     
-    def _start_health_monitoring(self):
-        """Start background health check thread"""
-        def health_check_loop(monitor):
-            """Periodically check health of neighbors"""
-            while monitor.running:
-                for neighbor in self.neighbors:
-                    neighbor_id = neighbor['process_id']
-                    neighbor_address = f"{neighbor['hostname']}:{neighbor['port']}"
-                    
-                    try:
-                        # Create channel with short timeout for health checks
-                        channel = grpc.insecure_channel(neighbor_address)
-                        stub = fire_service_pb2_grpc.FireQueryServiceStub(channel)
-                        
-                        health_request = fire_service_pb2.HealthRequest(
-                            requester_id=self.process_id,
-                            timestamp=int(time.time())
-                        )
-                        
-                        # Health check with 2 second timeout
-                        health_config = self.config.get('health_monitoring', {})
-                        timeout = health_config.get('timeout_seconds', 2.0)
-                        response = stub.HealthCheck(health_request, timeout=timeout)
-                        
-                        # Update health status
-                        monitor.update_health(neighbor_id, response.healthy)
-                        
-                        channel.close()
-                        
-                    except grpc.RpcError as e:
-                        # Health check failed
-                        monitor.update_health(neighbor_id, False)
-                        # Only log if status changed (to reduce log spam)
-                        status = monitor.get_status(neighbor_id)
-                        if status == ServerStatus.UNAVAILABLE:
-                            # UNIMPLEMENTED can occur when server is dead/unreachable
-                            # UNAVAILABLE means server is down
-                            # DEADLINE_EXCEEDED means timeout
-                            error_msg = f"{e.code()}"
-                            if e.code() == grpc.StatusCode.UNIMPLEMENTED:
-                                error_msg += " (server may be down or unreachable)"
-                            print(f"[{self.process_id}] Health check failed for {neighbor_id}: {error_msg}")
-                    except Exception as e:
-                        monitor.update_health(neighbor_id, False)
-                        print(f"[{self.process_id}] Health check error for {neighbor_id}: {e}")
-        
-        self.health_monitor.start_monitoring(health_check_loop)
-        print(f"[{self.process_id}] Background health monitoring started")
-    
     def InternalQuery(self, request, context):
         """Handle internal queries from other processes"""
         print(f"[{self.process_id}] Internal query from {request.requesting_process}")
@@ -385,32 +840,23 @@ class FireQueryServiceImpl(fire_service_pb2_grpc.FireQueryServiceServicer):
             status="acknowledged"
         )
     
-    def _make_grpc_call(self, neighbor_address, internal_request):
+    # Helper methods for request tracking
+    def _get_client_id(self, context):
         """
-        Helper method to make gRPC call (used by circuit breaker)
-        
-        Args:
-            neighbor_address: Address of the neighbor server
-            internal_request: InternalQueryRequest to send
-            
-        Returns:
-            InternalQueryResponse from the server
+        Identify the calling client for per-client policies
+        Uses the 'client-id' request metadata, falling back to the peer host
+        (also when the quota manager tracks as many client ids as it may)
         """
-        # Create channel to team leader with increased message size limits
-        options = [
-            ('grpc.max_receive_message_length', 100 * 1024 * 1024),  # 100MB
-            ('grpc.max_send_message_length', 100 * 1024 * 1024),     # 100MB
-        ]
-        channel = grpc.insecure_channel(neighbor_address, options=options)
-        try:
-            stub = fire_service_pb2_grpc.FireQueryServiceStub(channel)
-            # Forward the query
-            response = stub.InternalQuery(internal_request)
-            return response
-        finally:
-            channel.close()
+        # Peer looks like "ipv4:127.0.0.1:54321" or "ipv6:[::1]:54321"
+        peer = context.peer() or 'unknown'
+        peer_host = peer.rsplit(':', 1)[0]
+        for key, value in context.invocation_metadata():
+            if key == 'client-id' and value:
+                if self.quotas_enabled:
+                    return self.client_quotas.resolve_client(value, peer_host)
+                return value
+        return peer_host
     
-    # Helper methods for request tracking
     def _is_cancelled(self, request_id):
         """Check if a request has been cancelled"""
         with self.request_lock:
@@ -437,16 +883,19 @@ class FireQueryServiceImpl(fire_service_pb2_grpc.FireQueryServiceServicer):
             if request_id in self.active_requests:
                 self.active_requests[request_id]['status'] = 'failed'
     
-    def _update_chunks_sent(self, request_id, chunks_sent):
-        """Update the number of chunks sent"""
+    def _update_chunks_sent(self, request_id, chunks_sent, total_chunks=None):
+        """Update the number of chunks sent (and the total, when re-estimated)"""
         with self.request_lock:
             if request_id in self.active_requests:
                 self.active_requests[request_id]['chunks_sent'] = chunks_sent
+                if total_chunks is not None:
+                    self.active_requests[request_id]['total_chunks'] = total_chunks
     
-    def _cleanup_request(self, request_id):
-        """Remove request from tracking after delay"""
+    def _cleanup_request(self, request_id, start_time=None):
+        """Remove request from tracking after delay (unless a resumed stream took its place)"""
         with self.request_lock:
-            if request_id in self.active_requests:
+            if request_id in self.active_requests and (
+                    start_time is None or self.active_requests[request_id]['start_time'] == start_time):
                 print(f"[{self.process_id}] Cleaning up request {request_id}")
                 del self.active_requests[request_id]
 
@@ -465,8 +914,25 @@ def serve(config_path):
     hostname = config['hostname']
     port = config['port']
     
-    # Create server
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    # Create server: with admission control, one thread for every query it can
+    # hold (max_limit in flight plus max_queue waiting per priority class) plus
+    # control_workers for control RPCs and fast rejections, so the controller
+    # (with its retry-after hints and priorities) is what sheds load and gRPC
+    # only refuses what lies beyond it instead of queueing invisibly
+    server_config = config.get('server', {})
+    admission_config = config.get('admission_control', {})
+    if admission_config.get('enabled', False):
+        max_workers = (admission_config.get('max_limit', 32)
+                       + len(PRIORITY_CLASSES) * admission_config.get('max_queue', 16)
+                       + server_config.get('control_workers', 16))
+        maximum_concurrent_rpcs = max_workers
+    else:
+        max_workers = server_config.get('max_workers', 10)
+        maximum_concurrent_rpcs = server_config.get('maximum_concurrent_rpcs')
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=max_workers),
+        maximum_concurrent_rpcs=maximum_concurrent_rpcs
+    )
     
     # Add service implementation
     service_impl = FireQueryServiceImpl(config)
@@ -478,7 +944,7 @@ def serve(config_path):
     
     # Start server
     server.start()
-    print(f"[{process_id}] Server started on {server_address}")
+    print(f"[{process_id}] Server started on {server_address} ({max_workers} workers)")
     print(f"[{process_id}] Press Ctrl+C to stop")
     
     # Keep server running
@@ -486,7 +952,11 @@ def serve(config_path):
         server.wait_for_termination()
     except KeyboardInterrupt:
         print(f"\n[{process_id}] Shutting down...")
-        server.stop(0)
+        # Tell watchers we are going away before the streams are torn down
+        service_impl.health_broadcaster.set_status(ServerStatus.UNAVAILABLE)
+        service_impl.fan_out.health_monitor.stop_monitoring()
+        server.stop(0.5)
+        service_impl.fan_out.channel_pool.close()
 
 
 if __name__ == '__main__':
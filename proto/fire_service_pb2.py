@@ -24,33 +24,57 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x18proto/fire_service.proto\x12\x0c\x66ire_service\"\x8b\x02\n\x0f\x46ireMeasurement\x12\x10\n\x08latitude\x18\x01 \x01(\x01\x12\x11\n\tlongitude\x18\x02 \x01(\x01\x12\x10\n\x08\x64\x61tetime\x18\x03 \x01(\t\x12\x11\n\tparameter\x18\x04 \x01(\t\x12\x15\n\rconcentration\x18\x05 \x01(\x01\x12\x0c\n\x04unit\x18\x06 \x01(\t\x12\x19\n\x11raw_concentration\x18\x07 \x01(\x01\x12\x0b\n\x03\x61qi\x18\x08 \x01(\x05\x12\x10\n\x08\x63\x61tegory\x18\t \x01(\x05\x12\x11\n\tsite_name\x18\n \x01(\t\x12\x13\n\x0b\x61gency_name\x18\x0b \x01(\t\x12\x10\n\x08\x61qs_code\x18\x0c \x01(\t\x12\x15\n\rfull_aqs_code\x18\r \x01(\t\"\xbc\x02\n\x0bQueryFilter\x12\x12\n\nsite_names\x18\x01 \x03(\t\x12\x11\n\taqs_codes\x18\x02 \x03(\t\x12\x14\n\x0c\x61gency_names\x18\x03 \x03(\t\x12\x12\n\nparameters\x18\x04 \x03(\t\x12\x14\n\x0cmin_latitude\x18\x05 \x01(\x01\x12\x14\n\x0cmax_latitude\x18\x06 \x01(\x01\x12\x15\n\rmin_longitude\x18\x07 \x01(\x01\x12\x15\n\rmax_longitude\x18\x08 \x01(\x01\x12\x14\n\x0cmin_datetime\x18\t \x01(\t\x12\x14\n\x0cmax_datetime\x18\n \x01(\t\x12\x19\n\x11min_concentration\x18\x0b \x01(\x01\x12\x19\n\x11max_concentration\x18\x0c \x01(\x01\x12\x0f\n\x07min_aqi\x18\r \x01(\x05\x12\x0f\n\x07max_aqi\x18\x0e \x01(\x05\"\x99\x01\n\x0cQueryRequest\x12\x12\n\nrequest_id\x18\x01 \x01(\x03\x12)\n\x06\x66ilter\x18\x02 \x01(\x0b\x32\x19.fire_service.QueryFilter\x12\x12\n\nquery_type\x18\x03 \x01(\t\x12\x17\n\x0frequire_chunked\x18\x04 \x01(\x08\x12\x1d\n\x15max_results_per_chunk\x18\x05 \x01(\x05\"\xb7\x01\n\x12QueryResponseChunk\x12\x12\n\nrequest_id\x18\x01 \x01(\x03\x12\x14\n\x0c\x63hunk_number\x18\x02 \x01(\x05\x12\x15\n\ris_last_chunk\x18\x03 \x01(\x08\x12\x33\n\x0cmeasurements\x18\x04 \x03(\x0b\x32\x1d.fire_service.FireMeasurement\x12\x14\n\x0ctotal_chunks\x18\x05 \x01(\x05\x12\x15\n\rtotal_results\x18\x06 \x01(\x03\"\xa2\x01\n\x14InternalQueryRequest\x12\x12\n\nrequest_id\x18\x01 \x01(\x03\x12\x1b\n\x13original_request_id\x18\x02 \x01(\t\x12)\n\x06\x66ilter\x18\x03 \x01(\x0b\x32\x19.fire_service.QueryFilter\x12\x12\n\nquery_type\x18\x04 \x01(\t\x12\x1a\n\x12requesting_process\x18\x05 \x01(\t\"\xae\x01\n\x15InternalQueryResponse\x12\x12\n\nrequest_id\x18\x01 \x01(\x03\x12\x1b\n\x13original_request_id\x18\x02 \x01(\t\x12\x33\n\x0cmeasurements\x18\x03 \x03(\x0b\x32\x1d.fire_service.FireMeasurement\x12\x13\n\x0bis_complete\x18\x04 \x01(\x08\x12\x1a\n\x12responding_process\x18\x05 \x01(\t\"3\n\rStatusRequest\x12\x12\n\nrequest_id\x18\x01 \x01(\x03\x12\x0e\n\x06\x61\x63tion\x18\x02 \x01(\t\"d\n\x0eStatusResponse\x12\x12\n\nrequest_id\x18\x01 \x01(\x03\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x18\n\x10\x63hunks_delivered\x18\x03 \x01(\x05\x12\x14\n\x0ctotal_chunks\x18\x04 \x01(\x05\"8\n\rHealthRequest\x12\x14\n\x0crequester_id\x18\x01 \x01(\t\x12\x11\n\ttimestamp\x18\x02 \x01(\x03\"f\n\x0eHealthResponse\x12\x0f\n\x07healthy\x18\x01 \x01(\x08\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\x12\x12\n\nprocess_id\x18\x04 \x01(\t\x12\x0c\n\x04role\x18\x05 \x01(\t2\xdf\x03\n\x10\x46ireQueryService\x12G\n\x05Query\x12\x1a.fire_service.QueryRequest\x1a .fire_service.QueryResponseChunk0\x01\x12J\n\rCancelRequest\x12\x1b.fire_service.StatusRequest\x1a\x1c.fire_service.StatusResponse\x12\x46\n\tGetStatus\x12\x1b.fire_service.StatusRequest\x1a\x1c.fire_service.StatusResponse\x12X\n\rInternalQuery\x12\".fire_service.InternalQueryRequest\x1a#.fire_service.InternalQueryResponse\x12J\n\x06Notify\x12\".fire_service.InternalQueryRequest\x1a\x1c.fire_service.StatusResponse\x12H\n\x0bHealthCheck\x12\x1b.fire_service.HealthRequest\x1a\x1c.fire_service.HealthResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x18proto/fire_service.proto\x12\x0c\x66ire_service\"\x8b\x02\n\x0f\x46ireMeasurement\x12\x10\n\x08latitude\x18\x01 \x01(\x01\x12\x11\n\tlongitude\x18\x02 \x01(\x01\x12\x10\n\x08\x64\x61tetime\x18\x03 \x01(\t\x12\x11\n\tparameter\x18\x04 \x01(\t\x12\x15\n\rconcentration\x18\x05 \x01(\x01\x12\x0c\n\x04unit\x18\x06 \x01(\t\x12\x19\n\x11raw_concentration\x18\x07 \x01(\x01\x12\x0b\n\x03\x61qi\x18\x08 \x01(\x05\x12\x10\n\x08\x63\x61tegory\x18\t \x01(\x05\x12\x11\n\tsite_name\x18\n \x01(\t\x12\x13\n\x0b\x61gency_name\x18\x0b \x01(\t\x12\x10\n\x08\x61qs_code\x18\x0c \x01(\t\x12\x15\n\rfull_aqs_code\x18\r \x01(\t\"\xbc\x02\n\x0bQueryFilter\x12\x12\n\nsite_names\x18\x01 \x03(\t\x12\x11\n\taqs_codes\x18\x02 \x03(\t\x12\x14\n\x0c\x61gency_names\x18\x03 \x03(\t\x12\x12\n\nparameters\x18\x04 \x03(\t\x12\x14\n\x0cmin_latitude\x18\x05 \x01(\x01\x12\x14\n\x0cmax_latitude\x18\x06 \x01(\x01\x12\x15\n\rmin_longitude\x18\x07 \x01(\x01\x12\x15\n\rmax_longitude\x18\x08 \x01(\x01\x12\x14\n\x0cmin_datetime\x18\t \x01(\t\x12\x14\n\x0cmax_datetime\x18\n \x01(\t\x12\x19\n\x11min_concentration\x18\x0b \x01(\x01\x12\x19\n\x11max_concentration\x18\x0c \x01(\x01\x12\x0f\n\x07min_aqi\x18\r \x01(\x05\x12\x0f\n\x07max_aqi\x18\x0e \x01(\x05\"\x93\x03\n\x0cQueryRequest\x12\x12\n\nrequest_id\x18\x01 \x01(\x03\x12)\n\x06\x66ilter\x18\x02 \x01(\x0b\x32\x19.fire_service.QueryFilter\x12\x12\n\nquery_type\x18\x03 \x01(\t\x12\x17\n\x0frequire_chunked\x18\x04 \x01(\x08\x12\x1d\n\x15max_results_per_chunk\x18\x05 \x01(\x05\x12-\n\x08priority\x18\x06 \x01(\x0e\x32\x1b.fire_service.QueryPriority\x12\r\n\x05limit\x18\x07 \x01(\x03\x12\x10\n\x08order_by\x18\x08 \x01(\t\x12\x18\n\x10order_descending\x18\t \x01(\x08\x12\x17\n\x0f\x61ggregate_field\x18\n \x01(\t\x12\x11\n\tquantiles\x18\x0b \x03(\x01\x12\x10\n\x08group_by\x18\x0c \x03(\t\x12\x0f\n\x07profile\x18\r \x01(\x08\x12\x14\n\x0cprofile_only\x18\x0e \x01(\x08\x12\x0e\n\x06resume\x18\x0f \x01(\x08\x12\x19\n\x11resume_from_chunk\x18\x10 \x01(\x05\"\x9c\x03\n\x0cQueryProfile\x12\x12\n\nprocess_id\x18\x01 \x01(\t\x12\x0c\n\x04role\x18\x02 \x01(\t\x12\x0e\n\x06status\x18\x03 \x01(\t\x12\x13\n\x0b\x61\x63\x63\x65ss_path\x18\x04 \x01(\t\x12\x0c\n\x04plan\x18\x05 \x01(\t\x12\x14\n\x0crows_scanned\x18\x06 \x01(\x03\x12\x15\n\rrows_returned\x18\x07 \x01(\x03\x12\x10\n\x08total_ms\x18\x08 \x01(\x01\x12\x15\n\rqueue_wait_ms\x18\t \x01(\x01\x12\x17\n\x0findex_lookup_ms\x18\n \x01(\x01\x12\x19\n\x11predicate_eval_ms\x18\x0b \x01(\x01\x12\x14\n\x0cpreempted_ms\x18\x0c \x01(\x01\x12\x16\n\x0eproto_build_ms\x18\r \x01(\x01\x12\x18\n\x10serialization_ms\x18\x0e \x01(\x01\x12\x12\n\nnetwork_ms\x18\x0f \x01(\x01\x12\x10\n\x08merge_ms\x18\x10 \x01(\x01\x12\x11\n\tstream_ms\x18\x11 \x01(\x01\x12,\n\x08\x63hildren\x18\x12 \x03(\x0b\x32\x1a.fire_service.QueryProfile\"\xd5\x01\n\nSummaryRow\x12\x11\n\tsite_name\x18\x01 \x01(\t\x12\x11\n\tparameter\x18\x02 \x01(\t\x12\x0e\n\x06period\x18\x03 \x01(\t\x12\r\n\x05\x63ount\x18\x04 \x01(\x03\x12\x0f\n\x07\x61qi_min\x18\x05 \x01(\x05\x12\x0f\n\x07\x61qi_max\x18\x06 \x01(\x05\x12\x0f\n\x07\x61qi_sum\x18\x07 \x01(\x03\x12\x19\n\x11\x63oncentration_min\x18\x08 \x01(\x01\x12\x19\n\x11\x63oncentration_max\x18\t \x01(\x01\x12\x19\n\x11\x63oncentration_sum\x18\n \x01(\x01\"\x95\x01\n\x0f\x41ggregateResult\x12\x12\n\nquery_type\x18\x01 \x01(\t\x12\r\n\x05\x66ield\x18\x02 \x01(\t\x12\x10\n\x08\x65stimate\x18\x03 \x01(\x01\x12\x11\n\tquantiles\x18\x04 \x03(\x01\x12\x0e\n\x06values\x18\x05 \x03(\x01\x12\x16\n\x0erelative_error\x18\x06 \x01(\x01\x12\x12\n\ninput_rows\x18\x07 \x01(\x03\"\xf6\x02\n\x12QueryResponseChunk\x12\x12\n\nrequest_id\x18\x01 \x01(\x03\x12\x14\n\x0c\x63hunk_number\x18\x02 \x01(\x05\x12\x15\n\ris_last_chunk\x18\x03 \x01(\x08\x12\x33\n\x0cmeasurements\x18\x04 \x03(\x0b\x32\x1d.fire_service.FireMeasurement\x12\x14\n\x0ctotal_chunks\x18\x05 \x01(\x05\x12\x15\n\rtotal_results\x18\x06 \x01(\x03\x12\x12\n\nis_partial\x18\x07 \x01(\x08\x12\x1d\n\x15unavailable_processes\x18\x08 \x03(\t\x12\x30\n\taggregate\x18\t \x01(\x0b\x32\x1d.fire_service.AggregateResult\x12+\n\tsummaries\x18\n \x03(\x0b\x32\x18.fire_service.SummaryRow\x12+\n\x07profile\x18\x0b \x01(\x0b\x32\x1a.fire_service.QueryProfile\"\xf4\x02\n\x14InternalQueryRequest\x12\x12\n\nrequest_id\x18\x01 \x01(\x03\x12\x1b\n\x13original_request_id\x18\x02 \x01(\t\x12)\n\x06\x66ilter\x18\x03 \x01(\x0b\x32\x19.fire_service.QueryFilter\x12\x12\n\nquery_type\x18\x04 \x01(\t\x12\x1a\n\x12requesting_process\x18\x05 \x01(\t\x12-\n\x08priority\x18\x06 \x01(\x0e\x32\x1b.fire_service.QueryPriority\x12\r\n\x05limit\x18\x07 \x01(\x03\x12\x10\n\x08order_by\x18\x08 \x01(\t\x12\x18\n\x10order_descending\x18\t \x01(\x08\x12\x17\n\x0f\x61ggregate_field\x18\n \x01(\t\x12\x11\n\tquantiles\x18\x0b \x03(\x01\x12\x10\n\x08group_by\x18\x0c \x03(\t\x12\x0f\n\x07profile\x18\r \x01(\x08\x12\x17\n\x0fpartition_epoch\x18\x0e \x01(\x03\"\xd0\x02\n\x15InternalQueryResponse\x12\x12\n\nrequest_id\x18\x01 \x01(\x03\x12\x1b\n\x13original_request_id\x18\x02 \x01(\t\x12\x33\n\x0cmeasurements\x18\x03 \x03(\x0b\x32\x1d.fire_service.FireMeasurement\x12\x13\n\x0bis_complete\x18\x04 \x01(\x08\x12\x1a\n\x12responding_process\x18\x05 \x01(\t\x12\x1d\n\x15unavailable_processes\x18\x06 \x03(\t\x12\x0e\n\x06sketch\x18\x07 \x01(\x0c\x12\x17\n\x0f\x61ggregated_rows\x18\x08 \x01(\x03\x12+\n\tsummaries\x18\t \x03(\x0b\x32\x18.fire_service.SummaryRow\x12+\n\x07profile\x18\n \x01(\x0b\x32\x1a.fire_service.QueryProfile\"3\n\rStatusRequest\x12\x12\n\nrequest_id\x18\x01 \x01(\x03\x12\x0e\n\x06\x61\x63tion\x18\x02 \x01(\t\"d\n\x0eStatusResponse\x12\x12\n\nrequest_id\x18\x01 \x01(\x03\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x18\n\x10\x63hunks_delivered\x18\x03 \x01(\x05\x12\x14\n\x0ctotal_chunks\x18\x04 \x01(\x05\"W\n\rHealthRequest\x12\x14\n\x0crequester_id\x18\x01 \x01(\t\x12\x11\n\ttimestamp\x18\x02 \x01(\x03\x12\x1d\n\x15heartbeat_interval_ms\x18\x03 \x01(\x05\"f\n\x0eHealthResponse\x12\x0f\n\x07healthy\x18\x01 \x01(\x08\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\x12\x12\n\nprocess_id\x18\x04 \x01(\t\x12\x0c\n\x04role\x18\x05 \x01(\t\"7\n\x0cStatsRequest\x12\x14\n\x0crequester_id\x18\x01 \x01(\t\x12\x11\n\tclient_id\x18\x02 \x01(\t\"\xbb\x01\n\x10\x43lientQuotaStats\x12\x11\n\tclient_id\x18\x01 \x01(\t\x12\x16\n\x0e\x61\x63tive_streams\x18\x02 \x01(\x05\x12\x18\n\x10requests_allowed\x18\x03 \x01(\x03\x12\x15\n\rrejected_rate\x18\x04 \x01(\x03\x12\x1c\n\x14rejected_concurrency\x18\x05 \x01(\x03\x12\x12\n\nbytes_sent\x18\x06 \x01(\x03\x12\x19\n\x11throttled_seconds\x18\x07 \x01(\x01\"}\n\rStatsResponse\x12\x12\n\nprocess_id\x18\x01 \x01(\t\x12\x11\n\ttimestamp\x18\x02 \x01(\x03\x12/\n\x07\x63lients\x18\x03 \x03(\x0b\x32\x1e.fire_service.ClientQuotaStats\x12\x14\n\x0c\x64\x65tails_json\x18\x04 \x01(\t\"L\n\rPartitionMove\x12\x11\n\tpartition\x18\x01 \x01(\t\x12\x14\n\x0c\x66rom_process\x18\x02 \x01(\t\x12\x12\n\nto_process\x18\x03 \x01(\t\"Z\n\x0cNeighborLink\x12\x16\n\x0eparent_process\x18\x01 \x01(\t\x12\x12\n\nprocess_id\x18\x02 \x01(\t\x12\x10\n\x08hostname\x18\x03 \x01(\t\x12\x0c\n\x04port\x18\x04 \x01(\x05\"g\n\x13PartitionAssignment\x12\x12\n\nprocess_id\x18\x01 \x01(\t\x12\x12\n\npartitions\x18\x02 \x03(\t\x12\r\n\x05\x65poch\x18\x03 \x01(\x03\x12\x19\n\x11measurement_count\x18\x04 \x01(\x03\"\xdf\x01\n\x16PartitionChangeRequest\x12\x1a\n\x12requesting_process\x18\x01 \x01(\t\x12*\n\x05moves\x18\x02 \x03(\x0b\x32\x1b.fire_service.PartitionMove\x12-\n\tadd_links\x18\x03 \x03(\x0b\x32\x1a.fire_service.NeighborLink\x12\x30\n\x0cremove_links\x18\x04 \x03(\x0b\x32\x1a.fire_service.NeighborLink\x12\r\n\x05\x65poch\x18\x05 \x01(\x03\x12\r\n\x05phase\x18\x06 \x01(\t\"\xa1\x01\n\x17PartitionChangeResponse\x12\r\n\x05\x65poch\x18\x01 \x01(\x03\x12\x0f\n\x07success\x18\x02 \x01(\x08\x12\x0f\n\x07message\x18\x03 \x01(\t\x12\x36\n\x0b\x61ssignments\x18\x04 \x03(\x0b\x32!.fire_service.PartitionAssignment\x12\x1d\n\x15unavailable_processes\x18\x05 \x03(\t*;\n\rQueryPriority\x12\x0f\n\x0bINTERACTIVE\x10\x00\x12\t\n\x05\x42\x41TCH\x10\x01\x12\x0e\n\nBACKGROUND\x10\x02\x32\xb4\x06\n\x10\x46ireQueryService\x12G\n\x05Query\x12\x1a.fire_service.QueryRequest\x1a .fire_service.QueryResponseChunk0\x01\x12J\n\rCancelRequest\x12\x1b.fire_service.StatusRequest\x1a\x1c.fire_service.StatusResponse\x12\x46\n\tGetStatus\x12\x1b.fire_service.StatusRequest\x1a\x1c.fire_service.StatusResponse\x12X\n\rInternalQuery\x12\".fire_service.InternalQueryRequest\x1a#.fire_service.InternalQueryResponse\x12J\n\x06Notify\x12\".fire_service.InternalQueryRequest\x1a\x1c.fire_service.StatusResponse\x12H\n\x0bHealthCheck\x12\x1b.fire_service.HealthRequest\x1a\x1c.fire_service.HealthResponse\x12J\n\x0bWatchHealth\x12\x1b.fire_service.HealthRequest\x1a\x1c.fire_service.HealthResponse0\x01\x12\x43\n\x08GetStats\x12\x1a.fire_service.StatsRequest\x1a\x1b.fire_service.StatsResponse\x12\x61\n\x12ReassignPartitions\x12$.fire_service.PartitionChangeRequest\x1a%.fire_service.PartitionChangeResponse\x12_\n\x10\x41ssignPartitions\x12$.fire_service.PartitionChangeRequest\x1a%.fire_service.PartitionChangeResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'proto.fire_service_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
+  _globals['_QUERYPRIORITY']._serialized_start=4298
+  _globals['_QUERYPRIORITY']._serialized_end=4357
   _globals['_FIREMEASUREMENT']._serialized_start=43
   _globals['_FIREMEASUREMENT']._serialized_end=310
   _globals['_QUERYFILTER']._serialized_start=313
   _globals['_QUERYFILTER']._serialized_end=629
   _globals['_QUERYREQUEST']._serialized_start=632
-  _globals['_QUERYREQUEST']._serialized_end=785
-  _globals['_QUERYRESPONSECHUNK']._serialized_start=788
-  _globals['_QUERYRESPONSECHUNK']._serialized_end=971
-  _globals['_INTERNALQUERYREQUEST']._serialized_start=974
-  _globals['_INTERNALQUERYREQUEST']._serialized_end=1136
-  _globals['_INTERNALQUERYRESPONSE']._serialized_start=1139
-  _globals['_INTERNALQUERYRESPONSE']._serialized_end=1313
-  _globals['_STATUSREQUEST']._serialized_start=1315
-  _globals['_STATUSREQUEST']._serialized_end=1366
-  _globals['_STATUSRESPONSE']._serialized_start=1368
-  _globals['_STATUSRESPONSE']._serialized_end=1468
-  _globals['_HEALTHREQUEST']._serialized_start=1470
-  _globals['_HEALTHREQUEST']._serialized_end=1526
-  _globals['_HEALTHRESPONSE']._serialized_start=1528
-  _globals['_HEALTHRESPONSE']._serialized_end=1630
-  _globals['_FIREQUERYSERVICE']._serialized_start=1633
-  _globals['_FIREQUERYSERVICE']._serialized_end=2112
+  _globals['_QUERYREQUEST']._serialized_end=1035
+  _globals['_QUERYPROFILE']._serialized_start=1038
+  _globals['_QUERYPROFILE']._serialized_end=1450
+  _globals['_SUMMARYROW']._serialized_start=1453
+  _globals['_SUMMARYROW']._serialized_end=1666
+  _globals['_AGGREGATERESULT']._serialized_start=1669
+  _globals['_AGGREGATERESULT']._serialized_end=1818
+  _globals['_QUERYRESPONSECHUNK']._serialized_start=1821
+  _globals['_QUERYRESPONSECHUNK']._serialized_end=2195
+  _globals['_INTERNALQUERYREQUEST']._serialized_start=2198
+  _globals['_INTERNALQUERYREQUEST']._serialized_end=2570
+  _globals['_INTERNALQUERYRESPONSE']._serialized_start=2573
+  _globals['_INTERNALQUERYRESPONSE']._serialized_end=2909
+  _globals['_STATUSREQUEST']._serialized_start=2911
+  _globals['_STATUSREQUEST']._serialized_end=2962
+  _globals['_STATUSRESPONSE']._serialized_start=2964
+  _globals['_STATUSRESPONSE']._serialized_end=3064
+  _globals['_HEALTHREQUEST']._serialized_start=3066
+  _globals['_HEALTHREQUEST']._serialized_end=3153
+  _globals['_HEALTHRESPONSE']._serialized_start=3155
+  _globals['_HEALTHRESPONSE']._serialized_end=3257
+  _globals['_STATSREQUEST']._serialized_start=3259
+  _globals['_STATSREQUEST']._serialized_end=3314
+  _globals['_CLIENTQUOTASTATS']._serialized_start=3317
+  _globals['_CLIENTQUOTASTATS']._serialized_end=3504
+  _globals['_STATSRESPONSE']._serialized_start=3506
+  _globals['_STATSRESPONSE']._serialized_end=3631
+  _globals['_PARTITIONMOVE']._serialized_start=3633
+  _globals['_PARTITIONMOVE']._serialized_end=3709
+  _globals['_NEIGHBORLINK']._serialized_start=3711
+  _globals['_NEIGHBORLINK']._serialized_end=3801
+  _globals['_PARTITIONASSIGNMENT']._serialized_start=3803
+  _globals['_PARTITIONASSIGNMENT']._serialized_end=3906
+  _globals['_PARTITIONCHANGEREQUEST']._serialized_start=3909
+  _globals['_PARTITIONCHANGEREQUEST']._serialized_end=4132
+  _globals['_PARTITIONCHANGERESPONSE']._serialized_start=4135
+  _globals['_PARTITIONCHANGERESPONSE']._serialized_end=4296
+  _globals['_FIREQUERYSERVICE']._serialized_start=4360
+  _globals['_FIREQUERYSERVICE']._serialized_end=5180
 # @@protoc_insertion_point(module_scope)
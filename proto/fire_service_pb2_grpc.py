@@ -68,6 +68,26 @@ class FireQueryServiceStub(object):
                 request_serializer=proto_dot_fire__service__pb2.HealthRequest.SerializeToString,
                 response_deserializer=proto_dot_fire__service__pb2.HealthResponse.FromString,
                 _registered_method=True)
+        self.WatchHealth = channel.unary_stream(
+                '/fire_service.FireQueryService/WatchHealth',
+                request_serializer=proto_dot_fire__service__pb2.HealthRequest.SerializeToString,
+                response_deserializer=proto_dot_fire__service__pb2.HealthResponse.FromString,
+                _registered_method=True)
+        self.GetStats = channel.unary_unary(
+                '/fire_service.FireQueryService/GetStats',
+                request_serializer=proto_dot_fire__service__pb2.StatsRequest.SerializeToString,
+                response_deserializer=proto_dot_fire__service__pb2.StatsResponse.FromString,
+                _registered_method=True)
+        self.ReassignPartitions = channel.unary_unary(
+                '/fire_service.FireQueryService/ReassignPartitions',
+                request_serializer=proto_dot_fire__service__pb2.PartitionChangeRequest.SerializeToString,
+                response_deserializer=proto_dot_fire__service__pb2.PartitionChangeResponse.FromString,
+                _registered_method=True)
+        self.AssignPartitions = channel.unary_unary(
+                '/fire_service.FireQueryService/AssignPartitions',
+                request_serializer=proto_dot_fire__service__pb2.PartitionChangeRequest.SerializeToString,
+                response_deserializer=proto_dot_fire__service__pb2.PartitionChangeResponse.FromString,
+                _registered_method=True)
 
 
 class FireQueryServiceServicer(object):
@@ -116,6 +136,34 @@ class FireQueryServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def WatchHealth(self, request, context):
+        """Health watch: pushes state changes immediately plus periodic heartbeats
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetStats(self, request, context):
+        """Operational counters (per-client quotas, admission, scheduling)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReassignPartitions(self, request, context):
+        """Operator -> Gateway: move or split partitions and relink processes without restarts
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def AssignPartitions(self, request, context):
+        """Internal: one phase of a reassignment (relayed by team leaders to their workers)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_FireQueryServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -149,6 +197,26 @@ def add_FireQueryServiceServicer_to_server(servicer, server):
                     request_deserializer=proto_dot_fire__service__pb2.HealthRequest.FromString,
                     response_serializer=proto_dot_fire__service__pb2.HealthResponse.SerializeToString,
             ),
+            'WatchHealth': grpc.unary_stream_rpc_method_handler(
+                    servicer.WatchHealth,
+                    request_deserializer=proto_dot_fire__service__pb2.HealthRequest.FromString,
+                    response_serializer=proto_dot_fire__service__pb2.HealthResponse.SerializeToString,
+            ),
+            'GetStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetStats,
+                    request_deserializer=proto_dot_fire__service__pb2.StatsRequest.FromString,
+                    response_serializer=proto_dot_fire__service__pb2.StatsResponse.SerializeToString,
+            ),
+            'ReassignPartitions': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReassignPartitions,
+                    request_deserializer=proto_dot_fire__service__pb2.PartitionChangeRequest.FromString,
+                    response_serializer=proto_dot_fire__service__pb2.PartitionChangeResponse.SerializeToString,
+            ),
+            'AssignPartitions': grpc.unary_unary_rpc_method_handler(
+                    servicer.AssignPartitions,
+                    request_deserializer=proto_dot_fire__service__pb2.PartitionChangeRequest.FromString,
+                    response_serializer=proto_dot_fire__service__pb2.PartitionChangeResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'fire_service.FireQueryService', rpc_method_handlers)
@@ -322,3 +390,111 @@ class FireQueryService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def WatchHealth(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/fire_service.FireQueryService/WatchHealth',
+            proto_dot_fire__service__pb2.HealthRequest.SerializeToString,
+            proto_dot_fire__service__pb2.HealthResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/fire_service.FireQueryService/GetStats',
+            proto_dot_fire__service__pb2.StatsRequest.SerializeToString,
+            proto_dot_fire__service__pb2.StatsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ReassignPartitions(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/fire_service.FireQueryService/ReassignPartitions',
+            proto_dot_fire__service__pb2.PartitionChangeRequest.SerializeToString,
+            proto_dot_fire__service__pb2.PartitionChangeResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def AssignPartitions(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/fire_service.FireQueryService/AssignPartitions',
+            proto_dot_fire__service__pb2.PartitionChangeRequest.SerializeToString,
+            proto_dot_fire__service__pb2.PartitionChangeResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -2,240 +2,19 @@
 """
 Process D - Team Pink Worker Server
 Worker process that handles queries for Team Pink data subset
+Runs the shared config-driven node (common/fire_node.py); role, data
+partition and neighbors come from the config file
 """
 
-import json
-import grpc
-from concurrent import futures
 import sys
 import os
-import time
 
 # Add proto and common directories to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'proto'))
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'common'))
 
-import fire_service_pb2
-import fire_service_pb2_grpc
-from fire_column_model import FireColumnModel
-
-
-class FireQueryServiceImpl(fire_service_pb2_grpc.FireQueryServiceServicer):
-    """Implementation of FireQueryService for Process D (Worker)"""
-    
-    def __init__(self, config):
-        self.config = config
-        self.process_id = config['identity']
-        self.role = config['role']
-        self.team = config['team']
-        print(f"[{self.process_id}] Initialized as {self.role} for Team {self.team}")
-        
-        # Initialize FireColumnModel with Team Pink data subset
-        self.data_model = FireColumnModel()
-        data_path = os.path.join(os.path.dirname(__file__), '..', 'data')
-        if os.path.exists(data_path):
-            # Check if partition is configured
-            allowed_dirs = None
-            if 'data_partition' in config and config['data_partition'].get('enabled'):
-                allowed_dirs = config['data_partition'].get('directories', [])
-                print(f"[{self.process_id}] Loading partitioned data from {len(allowed_dirs)} subdirectories...")
-            
-            self.data_model.read_from_directory(data_path, allowed_dirs)
-            print(f"[{self.process_id}] Data model initialized with {self.data_model.measurement_count()} measurements")
-        else:
-            print(f"[{self.process_id}] Data directory not found: {data_path}")
-            print(f"[{self.process_id}] Data model initialized with 0 measurements")
-    
-    def Query(self, request, context):
-        """
-        Handle client query request (if called directly)
-        Workers typically don't receive direct client queries
-        """
-        print(f"[{self.process_id}] Received direct query request_id={request.request_id}")
-        
-        # Workers don't typically receive direct client queries
-        chunk = fire_service_pb2.QueryResponseChunk(
-            request_id=request.request_id,
-            chunk_number=0,
-            is_last_chunk=True,
-            total_chunks=1,
-            total_results=0
-        )
-        yield chunk
-    
-    def InternalQuery(self, request, context):
-        """
-        Handle internal queries from team leader (Process E)
-        This is the main method for workers
-        """
-        print(f"[{self.process_id}] Internal query from {request.requesting_process}")
-        print(f"  Request ID: {request.request_id}")
-        print(f"  Original request: {request.original_request_id}")
-        print(f"  Query type: {request.query_type}")
-        
-        # Query local FireColumnModel data
-        local_measurements = self._query_local_data(request)
-        print(f"[{self.process_id}] Found {len(local_measurements)} local measurements")
-        
-        # Return response with local results (workers don't forward to anyone)
-        response = fire_service_pb2.InternalQueryResponse(
-            request_id=request.request_id,
-            original_request_id=request.original_request_id,
-            is_complete=True,
-            responding_process=self.process_id
-        )
-        response.measurements.extend(local_measurements)
-        
-        print(f"[{self.process_id}] Returning response with {len(response.measurements)} measurements")
-        return response
-    
-    def _query_local_data(self, request):
-        """
-        Query local FireColumnModel data
-        Returns list of FireMeasurement proto messages
-        """
-        matching_indices = []
-        
-        if request.HasField('filter'):
-            filter_obj = request.filter
-            
-            # Start with parameter or site filtering (OR logic for multiple parameters)
-            if len(filter_obj.parameters) > 0:
-                # Handle multiple parameters (OR logic - match any parameter)
-                all_param_indices = set()
-                for param in filter_obj.parameters:
-                    param_indices = self.data_model.get_indices_by_parameter(param)
-                    all_param_indices.update(param_indices)
-                matching_indices = list(all_param_indices)
-            elif len(filter_obj.site_names) > 0:
-                # Filter by site name
-                site = filter_obj.site_names[0]
-                matching_indices = self.data_model.get_indices_by_site(site)
-            else:
-                # No parameter/site filter - start with all measurements
-                matching_indices = list(range(self.data_model.measurement_count()))
-            
-            # Apply AQI range filter (AND logic - must also match AQI range)
-            if filter_obj.min_aqi > 0 or filter_obj.max_aqi > 0:
-                filtered_indices = []
-                for idx in matching_indices:
-                    aqi = self.data_model.aqis[idx]
-                    if ((filter_obj.min_aqi == 0 or aqi >= filter_obj.min_aqi) and
-                        (filter_obj.max_aqi == 0 or aqi <= filter_obj.max_aqi)):
-                        filtered_indices.append(idx)
-                matching_indices = filtered_indices
-        else:
-            # No filter - return all measurements
-            matching_indices = list(range(self.data_model.measurement_count()))
-        
-        # Convert to proto messages
-        measurements = []
-        for idx in matching_indices:
-            measurement = fire_service_pb2.FireMeasurement(
-                latitude=self.data_model.latitudes[idx],
-                longitude=self.data_model.longitudes[idx],
-                datetime=self.data_model.datetimes[idx],
-                parameter=self.data_model.parameters[idx],
-                concentration=self.data_model.concentrations[idx],
-                unit=self.data_model.units[idx],
-                raw_concentration=self.data_model.raw_concentrations[idx],
-                aqi=self.data_model.aqis[idx],
-                category=self.data_model.categories[idx],
-                site_name=self.data_model.site_names[idx],
-                agency_name=self.data_model.agency_names[idx],
-                aqs_code=self.data_model.aqs_codes[idx],
-                full_aqs_code=self.data_model.full_aqs_codes[idx]
-            )
-            measurements.append(measurement)
-        
-        return measurements
-    
-    def CancelRequest(self, request, context):
-        """Handle request cancellation"""
-        print(f"[{self.process_id}] Cancel request_id={request.request_id}")
-        
-        return fire_service_pb2.StatusResponse(
-            request_id=request.request_id,
-            status="cancelled",
-            chunks_delivered=0,
-            total_chunks=0
-        )
-    
-    def GetStatus(self, request, context):
-        """Handle status check"""
-        print(f"[{self.process_id}] Status request_id={request.request_id}")
-        
-        return fire_service_pb2.StatusResponse(
-            request_id=request.request_id,
-            status="pending",
-            chunks_delivered=0,
-            total_chunks=0
-        )
-    
-    def HealthCheck(self, request, context):
-        """Handle health check requests"""
-        return fire_service_pb2.HealthResponse(
-            healthy=True,
-            status="healthy",
-            timestamp=int(time.time()),
-            process_id=self.process_id,
-            role=self.role
-        )
-    
-    def Notify(self, request, context):
-        """Handle notifications from other processes"""
-        print(f"[{self.process_id}] Notification from {request.requesting_process}")
-        
-        return fire_service_pb2.StatusResponse(
-            request_id=request.request_id,
-            status="acknowledged"
-        )
-
-
-def load_config(config_path):
-    """Load configuration from JSON file"""
-    with open(config_path, 'r') as f:
-        return json.load(f)
-
-
-def serve(config_path):
-    """Start the gRPC server"""
-    # Load configuration
-    config = load_config(config_path)
-    process_id = config['identity']
-    hostname = config['hostname']
-    port = config['port']
-    
-    # Create server
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    
-    # Add service implementation
-    service_impl = FireQueryServiceImpl(config)
-    fire_service_pb2_grpc.add_FireQueryServiceServicer_to_server(service_impl, server)
-    
-    # Bind to address
-    server_address = f"{hostname}:{port}"
-    server.add_insecure_port(server_address)
-    
-    # Start server
-    server.start()
-    print(f"[{process_id}] Server started on {server_address}")
-    print(f"[{process_id}] Press Ctrl+C to stop")
-    
-    # Keep server running
-    try:
-        server.wait_for_termination()
-    except KeyboardInterrupt:
-        print(f"\n[{process_id}] Shutting down...")
-        server.stop(0)
+from fire_node import main
 
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python server_d.py <config_file>")
-        print("Example: python server_d.py ../configs/process_d.json")
-        sys.exit(1)
-    
-    config_path = sys.argv[1]
-    serve(config_path)
-
+    main(example_config="../configs/process_d.json")
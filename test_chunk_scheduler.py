@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for the fair chunk scheduler: send slots go out by finish tag and
+streams whose clients stop reading cannot keep the slots
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add common to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'common'))
+
+from chunk_scheduler import ChunkScheduler
+
+
+def test_stalled_streams_do_not_starve_others():
+    """Two streams holding both slots lose them after max_hold_seconds"""
+    scheduler = ChunkScheduler(max_concurrent_sends=2, max_hold_seconds=0.2, name="test")
+    for flow_id in ("stalled-1", "stalled-2", "interactive"):
+        scheduler.register(flow_id, flow_id)
+
+    # Both slots taken and never released (clients stopped reading)
+    scheduler.acquire("stalled-1", 1000)
+    scheduler.acquire("stalled-2", 1000)
+
+    granted = threading.Event()
+    start = time.time()
+
+    def interactive():
+        scheduler.acquire("interactive", 1000)
+        granted.set()
+
+    threading.Thread(target=interactive, daemon=True).start()
+    assert granted.wait(2.0), "interactive stream never got a send slot"
+    assert time.time() - start < 1.0
+    assert scheduler.get_stats()['revoked'] >= 1
+
+    # A late release from a revoked stream does not free a slot twice
+    scheduler.release("stalled-1")
+    scheduler.release("stalled-2")
+    scheduler.release("interactive")
+    assert scheduler.get_stats()['in_flight'] == 0
+
+
+def test_prompt_release_is_not_revoked():
+    """Streams that release their slot in time are never revoked"""
+    scheduler = ChunkScheduler(max_concurrent_sends=1, max_hold_seconds=0.5, name="test")
+    scheduler.register("a", "a")
+    scheduler.register("b", "b")
+
+    def send(flow_id):
+        for _ in range(5):
+            scheduler.acquire(flow_id, 1000)
+            time.sleep(0.01)
+            scheduler.release(flow_id)
+
+    threads = [threading.Thread(target=send, args=(flow_id,)) for flow_id in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5.0)
+
+    stats = scheduler.get_stats()
+    assert stats['revoked'] == 0
+    assert stats['streams']['a']['chunks_sent'] == 5
+    assert stats['streams']['b']['chunks_sent'] == 5
+
+
+def test_weighted_order():
+    """With one slot, the pending chunk with the smallest finish tag goes first"""
+    scheduler = ChunkScheduler(max_concurrent_sends=1, client_weights={"heavy": 4.0}, name="test")
+    scheduler.register("holder", "light")
+    scheduler.register("light", "light")
+    scheduler.register("heavy", "heavy")
+    scheduler.acquire("holder", 1)
+
+    order = []
+
+    def send(flow_id):
+        scheduler.acquire(flow_id, 4000)
+        order.append(flow_id)
+        scheduler.release(flow_id)
+
+    threads = [threading.Thread(target=send, args=(flow_id,)) for flow_id in ("light", "heavy")]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    scheduler.release("holder")
+    for thread in threads:
+        thread.join(5.0)
+    assert order == ["heavy", "light"], order
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+    print(f"\nAll {len(tests)} chunk scheduler tests passed")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for chunk sizing: client-set chunk sizes are honoured, adaptive
+streams probe with initial_rows and every chunk stays under max_bytes
+"""
+
+import sys
+import os
+
+# Add common to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'common'))
+
+from chunk_sizer import ChunkSizer
+
+
+def test_requested_rows_on_first_chunk():
+    """max_results_per_chunk is used as is before any row size is known"""
+    for enabled in (False, True):
+        sizer = ChunkSizer(enabled=enabled, initial_rows=1000)
+        stream = sizer.start_stream(5000)
+        assert not stream.adaptive
+        assert stream.next_rows() == 5000, f"enabled={enabled}: {stream.next_rows()}"
+
+
+def test_requested_rows_capped_by_bytes():
+    """Once rows have been measured, fixed chunks are capped at max_bytes"""
+    sizer = ChunkSizer(enabled=False, max_bytes=100000)
+    stream = sizer.start_stream(5000)
+    stream.record(rows=5000, nbytes=500000, build_seconds=0.01, send_seconds=0.01)
+    assert stream.next_rows() == 1000
+    # New streams start from the shared estimate
+    assert sizer.start_stream(5000).next_rows() == 1000
+
+
+def test_default_rows_without_request():
+    """Without max_results_per_chunk and adaptation off, default_rows is used"""
+    sizer = ChunkSizer(enabled=False, default_rows=750)
+    assert sizer.start_stream(0).next_rows() == 750
+
+
+def test_adaptive_first_chunk_is_probe():
+    """An adaptive stream with nothing measured probes with initial_rows, then grows"""
+    sizer = ChunkSizer(enabled=True, initial_rows=1000, target_bytes=1000000, growth_factor=4.0)
+    stream = sizer.start_stream(0)
+    assert stream.adaptive
+    assert stream.next_rows() == 1000
+    stream.record(rows=1000, nbytes=100000, build_seconds=0.001, send_seconds=0.001)
+    assert stream.next_rows() == 4000
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+    print(f"\nAll {len(tests)} chunk sizing tests passed")
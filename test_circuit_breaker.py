@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for which errors the circuit breaker counts: unavailability codes
+open the circuit, errors caused by the request do not
+"""
+
+import sys
+import os
+
+import grpc
+
+# Add common to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'common'))
+
+from circuit_breaker import CircuitBreaker, CircuitState
+
+
+class FakeRpcError(grpc.RpcError):
+    """RpcError with a fixed status code"""
+
+    def __init__(self, code: grpc.StatusCode):
+        super().__init__(code.name)
+        self._code = code
+
+    def code(self):
+        return self._code
+
+
+def fail_with(breaker, code, times):
+    """Make `times` calls through the breaker that fail with `code`"""
+    def call():
+        raise FakeRpcError(code)
+
+    for _ in range(times):
+        try:
+            breaker.call(call)
+        except grpc.RpcError:
+            pass
+
+
+def test_unavailability_codes_open_circuit():
+    """UNAVAILABLE, DEADLINE_EXCEEDED and INTERNAL count as failures"""
+    for code in (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED, grpc.StatusCode.INTERNAL):
+        breaker = CircuitBreaker(failure_threshold=3, name="test")
+        fail_with(breaker, code, 3)
+        assert breaker.get_state() == CircuitState.OPEN, code
+
+
+def test_request_errors_pass_through():
+    """Client-caused codes are raised but not recorded"""
+    breaker = CircuitBreaker(failure_threshold=3, minimum_calls=2, name="test")
+    for code in (grpc.StatusCode.INVALID_ARGUMENT, grpc.StatusCode.RESOURCE_EXHAUSTED,
+                 grpc.StatusCode.NOT_FOUND):
+        fail_with(breaker, code, 5)
+    assert breaker.get_state() == CircuitState.CLOSED
+    assert breaker.failure_count == 0
+    assert len(breaker.window) == 0
+
+
+def test_failure_codes_configurable():
+    """failure_codes replaces the default set"""
+    breaker = CircuitBreaker(failure_threshold=2, name="test", failure_codes=["RESOURCE_EXHAUSTED"])
+    fail_with(breaker, grpc.StatusCode.UNAVAILABLE, 2)
+    assert breaker.get_state() == CircuitState.CLOSED
+    fail_with(breaker, grpc.StatusCode.RESOURCE_EXHAUSTED, 2)
+    assert breaker.get_state() == CircuitState.OPEN
+
+
+def test_other_exceptions_count():
+    """Exceptions that are not gRPC errors still count as failures"""
+    breaker = CircuitBreaker(failure_threshold=2, name="test")
+
+    def call():
+        raise ConnectionError("reset")
+
+    for _ in range(2):
+        try:
+            breaker.call(call)
+        except ConnectionError:
+            pass
+    assert breaker.get_state() == CircuitState.OPEN
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+    print(f"\nAll {len(tests)} circuit breaker tests passed")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for per-client quota state: idle states are evicted, the number of
+tracked clients is capped and rotating client ids cannot mint fresh quotas
+"""
+
+import sys
+import os
+import time
+
+# Add common to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'common'))
+
+from client_quota import ClientQuotaManager, QuotaExceededError
+
+PEER = "ipv4:10.0.0.7"
+
+
+def admitted(manager, client_id):
+    """Whether one stream for client_id is admitted (and then ended)"""
+    try:
+        manager.start_stream(client_id)
+    except QuotaExceededError:
+        return False
+    manager.end_stream(client_id)
+    return True
+
+
+def test_rotating_ids_charged_to_peer_beyond_cap():
+    """Past max_clients, unknown ids share the peer host's bucket"""
+    manager = ClientQuotaManager({'requests_per_second': 1, 'request_burst': 1}, name="test", max_clients=3)
+    ids = [manager.resolve_client(f"rotating-{i}", PEER) for i in range(10)]
+    assert ids[:3] == ["rotating-0", "rotating-1", "rotating-2"]
+    assert set(ids[3:]) == {PEER}
+    # The seven overflowing ids get one request between them
+    assert sum(admitted(manager, client_id) for client_id in ids[3:]) == 1
+    assert len(manager.clients) <= 3
+    assert manager.overflowed == 7
+
+
+def test_configured_and_known_clients_keep_their_state():
+    """Configured ids and already tracked ids are never redirected"""
+    manager = ClientQuotaManager({}, {'bulk-export': {'requests_per_second': 1}}, name="test", max_clients=1)
+    assert manager.resolve_client("first", PEER) == "first"
+    assert manager.resolve_client("first", PEER) == "first"
+    assert manager.resolve_client("bulk-export", PEER) == "bulk-export"
+    assert manager.resolve_client("second", PEER) == PEER
+
+
+def test_idle_states_evicted_after_ttl():
+    """States without open streams are dropped after idle_seconds, making room again"""
+    manager = ClientQuotaManager({}, name="test", max_clients=2, idle_seconds=0.1)
+    manager.resolve_client("a", PEER)
+    manager.resolve_client("b", PEER)
+    manager.start_stream("b")
+    assert manager.resolve_client("c", PEER) == PEER
+
+    time.sleep(0.15)
+    assert manager.resolve_client("c", PEER) == "c"
+    # "b" has an open stream and is kept
+    assert "a" not in manager.clients
+    assert "b" in manager.clients
+    assert manager.evicted >= 1
+
+
+def test_rotating_ids_do_not_evict_recent_clients():
+    """Overflowing ids never push out recently used clients' buckets"""
+    manager = ClientQuotaManager({'requests_per_second': 1, 'request_burst': 1}, name="test",
+                                 max_clients=2, idle_seconds=60.0)
+    manager.resolve_client("victim", PEER)
+    assert admitted(manager, "victim")
+    for i in range(20):
+        manager.resolve_client(f"rotating-{i}", "ipv4:10.0.0.8")
+    assert "victim" in manager.clients
+    assert not admitted(manager, "victim")
+
+
+def test_throttle_bytes_does_not_recreate_evicted_state():
+    """Byte accounting for an unknown client neither creates state nor grants a fresh burst"""
+    manager = ClientQuotaManager({'bytes_per_second': 1000, 'bytes_burst': 1000}, name="test")
+    assert manager.throttle_bytes("gone", 10 ** 6) == 0.0
+    assert "gone" not in manager.clients
+
+    manager.start_stream("live")
+    assert manager.throttle_bytes("live", 1000) == 0.0
+    assert manager.get_stats("live")["live"]["bytes_sent"] == 1000
+    manager.end_stream("live")
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+    print(f"\nAll {len(tests)} client quota tests passed")
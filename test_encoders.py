@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Tests that the batch encoder and the serialized row cache produce exactly
+the bytes of building one FireMeasurement per row
+"""
+
+import sys
+import os
+
+# Add proto and common to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'proto'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'common'))
+
+import fire_service_pb2
+from fire_column_model import FireColumnModel
+from measurement_encoder import MeasurementEncoder
+from row_cache import SerializedRowCache
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+DAYS = ['20200810', '20200814', '20200815']
+
+NAN = float('nan')
+
+
+def build_measurement(data_model: FireColumnModel, idx: int):
+    """One FireMeasurement with 13 keyword arguments (the per-row worker path)"""
+    return fire_service_pb2.FireMeasurement(
+        latitude=data_model.latitudes[idx],
+        longitude=data_model.longitudes[idx],
+        datetime=data_model.datetimes[idx],
+        parameter=data_model.parameters[idx],
+        concentration=data_model.concentrations[idx],
+        unit=data_model.units[idx],
+        raw_concentration=data_model.raw_concentrations[idx],
+        aqi=data_model.aqis[idx],
+        category=data_model.categories[idx],
+        site_name=data_model.site_names[idx],
+        agency_name=data_model.agency_names[idx],
+        aqs_code=data_model.aqs_codes[idx],
+        full_aqs_code=data_model.full_aqs_codes[idx]
+    )
+
+
+def per_row_response(data_model: FireColumnModel, rows) -> bytes:
+    """Reference: one constructor per row, extended into the response"""
+    response = fire_service_pb2.InternalQueryResponse(responding_process="C", is_complete=True)
+    response.measurements.extend(build_measurement(data_model, idx) for idx in rows)
+    return response.SerializeToString()
+
+
+def encoded_response(encode, rows) -> bytes:
+    """Encoded rows merged into the response in one call"""
+    response = fire_service_pb2.InternalQueryResponse(responding_process="C", is_complete=True)
+    response.MergeFromString(encode(rows))
+    return response.SerializeToString()
+
+
+def encoders(data_model: FireColumnModel):
+    """(name, encode) for the batch encoder and the row cache over data_model"""
+    encoder = MeasurementEncoder(data_model)
+    row_cache = SerializedRowCache(data_model.measurement_count, lambda idx: build_measurement(data_model, idx))
+    return [("batch", encoder.encode), ("row cache", row_cache.encode)]
+
+
+def assert_matches(data_model: FireColumnModel, encoders, rows):
+    """Every encoder reproduces the per-row serialization of rows"""
+    reference = per_row_response(data_model, rows)
+    for name, encode in encoders:
+        assert encoded_response(encode, rows) == reference, (name, rows[:5])
+
+
+def nan_model() -> FireColumnModel:
+    """Rows with NaN, zero and empty values, some sharing a site"""
+    model = FireColumnModel()
+    rows = [
+        (37.5, -122.1, "2020-08-10T01:00", "PM2.5", NAN, "UG/M3", NAN, 0, 0,
+         "Site A", "Agency A", "060010007", "840060010007"),
+        (37.5, -122.1, "2020-08-10T02:00", "PM2.5", 12.5, "UG/M3", NAN, 52, 2,
+         "Site A", "Agency A", "060010007", "840060010007"),
+        (38.0, -121.0, "2020-08-10T01:00", "OZONE", NAN, "PPB", 31.0, -999, 1,
+         "Site B", "", "060670006", "840060670006"),
+        (0.0, 0.0, "", "", 0.0, "", 0.0, 0, 0, "", "", "", ""),
+        (38.0, -121.0, "2020-08-10T03:00", "OZONE", NAN, "PPB", NAN, 40, 1,
+         "Site B", "", "060670006", "840060670006"),
+    ]
+    for row in rows:
+        model.insert_measurement(*row)
+    return model
+
+
+_partition = []
+
+
+def partition() -> FireColumnModel:
+    """A few days of real data (loaded once)"""
+    if not _partition:
+        model = FireColumnModel()
+        model.read_from_directory(DATA_DIR, DAYS)
+        _partition.append(model)
+    return _partition[0]
+
+
+def test_all_rows_match():
+    """A whole partition encodes identically"""
+    model = partition()
+    rows = list(range(model.measurement_count()))
+    assert rows
+    assert_matches(model, encoders(model), rows)
+
+
+def test_subset_in_result_order():
+    """Filtered rows, reordered and repeated, encode identically"""
+    model = partition()
+    rows = model.get_indices_by_parameter("PM2.5")[:500]
+    assert_matches(model, encoders(model), rows[::-1] + rows[:3])
+
+
+def test_empty_rows():
+    """No rows encode to nothing"""
+    model = partition()
+    for name, encode in encoders(model):
+        assert encode([]) == b'', name
+    assert_matches(model, encoders(model), [])
+
+
+def test_single_row():
+    """One row (not gathered through itemgetter) encodes identically"""
+    model = partition()
+    active = encoders(model)
+    for idx in (0, model.measurement_count() - 1):
+        assert_matches(model, active, [idx])
+
+
+def test_nan_rows():
+    """NaN concentrations, zeros and empty strings encode identically"""
+    model = nan_model()
+    active = encoders(model)
+    assert_matches(model, active, list(range(model.measurement_count())))
+    assert_matches(model, active, [4])
+    assert_matches(model, active, [0, 4, 0, 2])
+
+
+def test_signed_zero_rows():
+    """-0.0 is serialized (unlike 0.0), whichever of the two is seen first"""
+    model = FireColumnModel()
+    for latitude, concentration in ((0.0, -0.0), (-0.0, 0.0), (0.0, 0.0), (-0.0, -0.0)):
+        model.insert_measurement(latitude, -120.0, "2020-08-10T01:00", "PM2.5", concentration, "UG/M3",
+                                 -concentration, 10, 1, "Site A", "Agency A", "060010007", "840060010007")
+    active = encoders(model)
+    assert_matches(model, active, list(range(model.measurement_count())))
+    assert_matches(model, active, [3, 2, 1, 0])
+
+
+def test_rows_inserted_after_encoding():
+    """Rows added after the first encode are picked up"""
+    model = nan_model()
+    active = encoders(model)
+    assert_matches(model, active, [0, 1])
+    model.insert_measurement(36.0, -120.0, "2020-08-10T04:00", "PM2.5", NAN, "UG/M3", 7.0, 30, 1,
+                             "Site A", "Agency C", "060010008", "840060010008")
+    assert_matches(model, active, list(range(model.measurement_count())))
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+    print(f"\nAll {len(tests)} encoder tests passed")
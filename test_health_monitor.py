@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for health stream failure detection: a neighbor whose heartbeats
+stop is UNAVAILABLE within the detection budget
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add common to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'common'))
+
+from health_monitor import HealthMonitor, ServerStatus
+
+
+class FakeHealthStream:
+    """WatchHealth call stand-in: heartbeats every interval until hung, then silent until cancelled"""
+
+    def __init__(self, hung: threading.Event, interval: float = 0.05):
+        self.hung = hung
+        self.interval = interval
+        self.cancelled = threading.Event()
+
+    def __iter__(self):
+        while not self.cancelled.is_set():
+            if self.hung.is_set():
+                self.cancelled.wait()
+                break
+            yield type('HealthResponse', (), {'healthy': True})()
+            time.sleep(self.interval)
+        raise RuntimeError("cancelled")
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+def wait_for_status(monitor, neighbor_id, status, timeout):
+    """Seconds until the neighbor reaches status, or None"""
+    start = time.time()
+    while time.time() - start < timeout:
+        if monitor.get_status(neighbor_id) == status:
+            return time.time() - start
+        time.sleep(0.01)
+    return None
+
+
+def test_hung_neighbor_detected_within_budget():
+    """One missed heartbeat deadline marks a watched neighbor UNAVAILABLE"""
+    monitor = HealthMonitor("test", heartbeat_timeout=0.3, failure_threshold=3, detection_budget=0.5)
+    assert monitor.watch_failure_threshold == 1
+    hung = threading.Event()
+    monitor.start_watching("N", lambda: FakeHealthStream(hung))
+    try:
+        assert wait_for_status(monitor, "N", ServerStatus.HEALTHY, 2.0) is not None
+        hung.set()
+        detected = wait_for_status(monitor, "N", ServerStatus.UNAVAILABLE, 3.0)
+        assert detected is not None, "hung neighbor never marked UNAVAILABLE"
+        # Heartbeat timeout plus one watchdog tick
+        assert detected < 0.5, f"took {detected:.2f}s"
+
+        # Recovers on the first heartbeat after reconnecting
+        hung.clear()
+        assert wait_for_status(monitor, "N", ServerStatus.HEALTHY, 3.0) is not None
+    finally:
+        monitor.stop_monitoring()
+
+
+def test_polled_checks_use_failure_threshold():
+    """Periodic checks still need failure_threshold consecutive failures"""
+    monitor = HealthMonitor("test", failure_threshold=2, detection_budget=0.5)
+    monitor.update_health("N", True)
+    monitor.update_health("N", False)
+    assert monitor.get_status("N") == ServerStatus.DEGRADED
+    monitor.update_health("N", False)
+    assert monitor.get_status("N") == ServerStatus.UNAVAILABLE
+
+
+def test_detection_budget_allows_more_stream_failures():
+    """A larger budget tolerates as many failed streams as fit in it"""
+    monitor = HealthMonitor("test", heartbeat_timeout=0.25, detection_budget=1.0)
+    assert monitor.watch_failure_threshold == 4
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+    print(f"\nAll {len(tests)} health monitor tests passed")